@@ -3,7 +3,7 @@ const path = require("path");
 
 exports.predictCrop = async (req, res) => {
   try {
-    const { N, P, K, temperature, humidity, ph, rainfall } = req.body;
+    const { N, P, K, temperature, humidity, ph, rainfall, explain } = req.body;
 
     // Validate required fields
     if ([N, P, K, temperature, humidity, ph, rainfall].some(v => v === undefined || v === null)) {
@@ -13,7 +13,7 @@ exports.predictCrop = async (req, res) => {
     }
 
     // Prepare input data for Python script
-    const inputData = JSON.stringify({ N, P, K, temperature, humidity, ph, rainfall });
+    const inputData = JSON.stringify({ N, P, K, temperature, humidity, ph, rainfall, explain: Boolean(explain) });
     
     // Path to Python script
     const scriptPath = path.join(__dirname, "../ml/predict.py");
@@ -66,3 +66,68 @@ exports.predictCrop = async (req, res) => {
     res.status(500).json({ message: err.message });
   }
 };
+
+// Combined season plan: crop -> yield -> labour in one Python process
+exports.planFarm = async (req, res) => {
+  try {
+    const { N, P, K, temperature, humidity, ph, rainfall, State, Year, Season, Area } = req.body;
+
+    // Validate required fields
+    if ([N, P, K, temperature, humidity, ph, rainfall, State, Year, Area].some(v => v === undefined || v === null)) {
+      return res.status(400).json({ 
+        message: "Please provide N, P, K, temperature, humidity, ph, rainfall, State, Year and Area" 
+      });
+    }
+
+    const inputData = JSON.stringify({
+      N, P, K, temperature, humidity, ph, rainfall,
+      State, Year, Area,
+      Season: Season || "Kharif",
+      Rainfall: req.body.Rainfall ?? rainfall,
+      Temperature: req.body.Temperature ?? temperature,
+      Fertilizer: req.body.Fertilizer || 150,
+      Pesticide: req.body.Pesticide || 3,
+      top_n: req.body.topN || 1
+    });
+
+    const scriptPath = path.join(__dirname, "../ml/farm_plan.py");
+    const python = spawn("python", [scriptPath]);
+
+    let result = "";
+    let error = "";
+
+    python.stdin.write(inputData);
+    python.stdin.end();
+
+    python.stdout.on("data", (data) => {
+      result += data.toString();
+    });
+
+    python.stderr.on("data", (data) => {
+      error += data.toString();
+    });
+
+    python.on("close", (code) => {
+      if (code !== 0 || error) {
+        console.error("Python script error:", error);
+        return res.status(500).json({ 
+          message: "Error running farm plan pipeline",
+          error: error
+        });
+      }
+
+      try {
+        res.json(JSON.parse(result.trim()));
+      } catch (parseError) {
+        console.error("Failed to parse Python output:", result);
+        res.status(500).json({ 
+          message: "Error parsing farm plan result",
+          rawOutput: result
+        });
+      }
+    });
+
+  } catch (err) {
+    res.status(500).json({ message: err.message });
+  }
+};
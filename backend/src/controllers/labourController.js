@@ -119,7 +119,8 @@ const recommendLabour = async (req, res) => {
       // Advanced ML parameters
       Crop, Season, Region, Soil_Type, Irrigation_Type,
       Mechanization_Level, Labour_Availability, Gender_Split,
-      Farm_Size_Acre, Prev_Yield_q_per_acre, Weather_Index
+      Farm_Size_Acre, Prev_Yield_q_per_acre, Weather_Index,
+      explain
     } = req.body;
 
     // Get all labour users from database
@@ -153,7 +154,8 @@ const recommendLabour = async (req, res) => {
           Farm_Size_Acre: parseFloat(Farm_Size_Acre),
           Task: 'General',
           Prev_Yield_q_per_acre: parseFloat(Prev_Yield_q_per_acre || 20),
-          Weather_Index: parseFloat(Weather_Index || 0.8)
+          Weather_Index: parseFloat(Weather_Index || 0.8),
+          explain: Boolean(explain)
         }]);
         
         python.stdin.write(inputData);
@@ -387,6 +389,9 @@ const recommendLabour = async (req, res) => {
             `Farm size: ${Farm_Size_Acre} acres`
           ]
         };
+        if (mlPrediction.explanations) {
+          response.mlPrediction.explanations = mlPrediction.explanations;
+        }
       }
     }
 
@@ -398,6 +403,83 @@ const recommendLabour = async (req, res) => {
   }
 };
 
+// Propose labourers for all of the calling farmer's open jobs at once (global optimizer, read-only)
+const assignLabourBatch = async (req, res) => {
+  try {
+    const { topK } = req.body || {};
+    const User = require('../models/user.model');
+
+    // Only the caller's own jobs: other farmers' jobs and their assignments are not theirs to see
+    const [jobs, labourUsers] = await Promise.all([
+      Job.find({ status: 'open', createdBy: req.user._id }),
+      User.find({ role: 'labour' }).select('-password')
+    ]);
+
+    // Jobs have no area of their own, so a job's labour requirement is sized
+    // on the farmer's whole farm (stored in acres; the model uses hectares).
+    // This overstates jobs that cover part of the farm; jobs without a crop
+    // type keep their workersNeeded.
+    const farmHectares = req.user.farmSize ? req.user.farmSize * 0.4047 : undefined;
+
+    const inputData = JSON.stringify({
+      jobs: jobs.map(job => ({
+        id: String(job._id),
+        date: job.date,
+        type: job.type,
+        workersNeeded: job.workersNeeded,
+        location: job.location,
+        cropType: job.cropType,
+        area: farmHectares
+      })),
+      labourers: labourUsers.map(labour => ({
+        id: String(labour._id),
+        // Passed as stored: the scorer treats a missing skills list like recommendLabour does
+        skills: labour.skills,
+        experience: labour.experience || 0,
+        rating: labour.rating || 4.0,
+        availability: labour.availability || 'Available',
+        location: labour.location
+      })),
+      options: topK ? { top_k: parseInt(topK) } : {}
+    });
+
+    const { spawn } = require('child_process');
+    const path = require('path');
+    const scriptPath = path.join(__dirname, '../ml/labour_assignment.py');
+    const python = spawn('python', [scriptPath]);
+    python.stdin.write(inputData);
+    python.stdin.end();
+
+    let result = '';
+    let errorOutput = '';
+    python.stdout.on('data', (data) => { result += data.toString(); });
+    python.stderr.on('data', (data) => { errorOutput += data.toString(); });
+
+    const assignment = await new Promise((resolve, reject) => {
+      python.on('close', (code) => {
+        if (errorOutput) {
+          console.error('Python stderr:', errorOutput);
+        }
+        try {
+          const parsed = JSON.parse(result.trim());
+          if (code !== 0 || !parsed.success) {
+            return reject(new Error(parsed.error || 'Labour assignment failed'));
+          }
+          resolve(parsed);
+        } catch (e) {
+          reject(new Error('Failed to parse labour assignment output'));
+        }
+      });
+    });
+
+    res.json(assignment);
+
+  } catch (err) {
+    console.error('Labour Assignment Error:', err);
+    res.status(500).json({ message: err.message });
+  }
+};
+
 // Predict labour needs (mock implementation)
 // const predictLabour = async (req, res) => {
 //   try {
@@ -417,5 +499,6 @@ module.exports = {
   assignJob,
   completeJob,
   applyJob,
-  recommendLabour
+  recommendLabour,
+  assignLabourBatch
 };
@@ -87,3 +87,79 @@ exports.predictYield = async (req, res) => {
   }
 };
 
+
+// What-if sweep: one base scenario, grid over numeric inputs, one batched prediction
+exports.sweepYield = async (req, res) => {
+  try {
+    const { State, Year, Season, Crop, Area, Rainfall, Temperature, Fertilizer, Pesticide, sweep } = req.body;
+
+    // Validate required fields
+    if ([State, Year, Season, Crop, Area, Rainfall].some(v => v === undefined || v === null)) {
+      return res.status(400).json({ 
+        message: "Please provide all required fields: State, Year, Season, Crop, Area, Rainfall" 
+      });
+    }
+    if (!sweep || typeof sweep !== "object" || Object.keys(sweep).length === 0) {
+      return res.status(400).json({ 
+        message: "Please provide a sweep, e.g. { Rainfall: { start: 400, stop: 1200, num: 50 } }" 
+      });
+    }
+
+    const inputData = JSON.stringify({ 
+      State, 
+      Year, 
+      Season, 
+      Crop, 
+      Area, 
+      Rainfall,
+      Temperature: Temperature || 25,
+      Fertilizer: Fertilizer || 150,
+      Pesticide: Pesticide || 3,
+      sweep
+    });
+    
+    const scriptPath = path.join(__dirname, "../ml/predict_yield.py");
+    const python = spawn("python", [scriptPath]);
+    
+    let result = "";
+    let error = "";
+
+    python.stdin.write(inputData);
+    python.stdin.end();
+
+    python.stdout.on("data", (data) => {
+      result += data.toString();
+    });
+
+    python.stderr.on("data", (data) => {
+      error += data.toString();
+    });
+
+    python.on("close", (code) => {
+      if (code !== 0 || error) {
+        console.error("Python script error:", error);
+        return res.status(500).json({ 
+          message: "Error running yield sweep",
+          error: error
+        });
+      }
+
+      try {
+        const surface = JSON.parse(result.trim());
+        if (surface.error) {
+          return res.status(400).json({ message: surface.error });
+        }
+        res.json(surface);
+      } catch (parseError) {
+        console.error("Failed to parse Python output:", result);
+        res.status(500).json({ 
+          message: "Error parsing sweep result",
+          rawOutput: result
+        });
+      }
+    });
+
+  } catch (err) {
+    res.status(500).json({ message: err.message });
+  }
+};
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Dense vs sparse (CSR) one-hot benchmark for the labour model
+
+For each cardinality, generates a synthetic labour dataset whose Crop,
+Region, Soil_Type and Task columns take that many values, then trains the
+labour regressor on a dense and on a CSR design matrix and reports:
+
+    one-hot width, design matrix bytes, encode / fit / batch predict time,
+    single-row predict latency through the full pipeline, peak RSS and RMSE
+
+Each (cardinality, layout) run happens in a fresh subprocess so its peak RSS
+is not inflated by earlier runs. The RMSE column should match between the two
+layouts: the forests see the same values either way.
+
+Usage:
+    python benchmark_labour_sparse.py
+    python benchmark_labour_sparse.py --cardinality 10,100,1000,5000 --rows 50000 --report sparse.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import warnings
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+import cpu_budget
+from train_labour_model_v2 import (FEATURE_COLUMNS, SPARSE_ONE_HOT_THRESHOLD, TARGET_REG,
+                                   build_preprocessor, create_labour_dataset, one_hot_width)
+
+warnings.filterwarnings("ignore")
+
+SINGLE_ROW_PREDICTIONS = 100
+
+
+def matrix_nbytes(matrix):
+    if sp.issparse(matrix):
+        return int(matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes)
+    return int(matrix.nbytes)
+
+
+def run_single(cardinality, layout, rows, n_estimators, seed):
+    """Benchmark one configuration in this process; returns the result dict"""
+    df = create_labour_dataset(rows, seed=seed, cardinality=cardinality)
+    df["Mechanization_Level"] = df["Mechanization_Level"].fillna("Unknown")
+    X = df[FEATURE_COLUMNS]
+    cat_cols = X.select_dtypes(include=["object"]).columns.tolist()
+    num_cols = X.select_dtypes(include=[np.number]).columns.tolist()
+    X_train, X_test, y_train, y_test = train_test_split(X, df[TARGET_REG], test_size=0.2, random_state=42)
+
+    preprocessor = build_preprocessor(cat_cols, num_cols, sparse=(layout == "sparse"))
+    start = time.perf_counter()
+    M_train = preprocessor.fit_transform(X_train)
+    M_test = preprocessor.transform(X_test)
+    encode_s = time.perf_counter() - start
+
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=42, max_depth=15,
+                                  min_samples_split=5, min_samples_leaf=2, n_jobs=cpu_budget.n_jobs())
+    start = time.perf_counter()
+    model.fit(M_train, y_train)
+    fit_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predictions = model.predict(M_test)
+    predict_s = time.perf_counter() - start
+
+    # What a request pays: preprocessing plus the forest for one raw row
+    pipeline = Pipeline([("preprocessor", preprocessor), ("regressor", model.set_params(n_jobs=1))])
+    single = X_test.iloc[:SINGLE_ROW_PREDICTIONS]
+    start = time.perf_counter()
+    for i in range(len(single)):
+        pipeline.predict(single.iloc[i:i + 1])
+    single_ms = (time.perf_counter() - start) * 1000 / len(single)
+
+    return {
+        "cardinality": cardinality,
+        "layout": layout,
+        "rows": rows,
+        "one_hot_width": one_hot_width(X, cat_cols),
+        "matrix_mb": round(matrix_nbytes(M_train) / 2**20, 2),
+        "encode_s": round(encode_s, 3),
+        "fit_s": round(fit_s, 3),
+        "batch_predict_s": round(predict_s, 3),
+        "single_row_ms": round(single_ms, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "rmse": round(float(np.sqrt(mean_squared_error(y_test, predictions))), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dense vs sparse one-hot benchmark for the labour model")
+    parser.add_argument("--cardinality", default="5,50,200,1000,3000",
+                        help="Comma-separated values per high-cardinality column")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--n-estimators", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--report", help="Write the JSON results to this file")
+    parser.add_argument("--single", nargs=2, metavar=("CARDINALITY", "LAYOUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        cpu_budget.configure(verbose=False)
+        result = run_single(int(args.single[0]), args.single[1], args.rows, args.n_estimators, args.seed)
+        print(json.dumps(result))
+        return
+
+    cpu_budget.configure()
+    results = []
+    print(f"{'card':>6} {'layout':>7} {'width':>6} {'matrix MB':>10} {'encode s':>9} {'fit s':>8} "
+          f"{'predict s':>10} {'1-row ms':>9} {'peak MB':>8} {'RMSE':>8}")
+    for cardinality in [int(c) for c in args.cardinality.split(",")]:
+        for layout in ("dense", "sparse"):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--single", str(cardinality), layout,
+                 "--rows", str(args.rows), "--n-estimators", str(args.n_estimators), "--seed", str(args.seed)],
+                capture_output=True, text=True)
+            if output.returncode != 0:
+                print(f"{cardinality:>6} {layout:>7} failed: {output.stderr.strip()[-300:]}", file=sys.stderr)
+                continue
+            r = json.loads(output.stdout.strip().splitlines()[-1])
+            results.append(r)
+            print(f"{r['cardinality']:>6} {r['layout']:>7} {r['one_hot_width']:>6} {r['matrix_mb']:>10.2f} "
+                  f"{r['encode_s']:>9.3f} {r['fit_s']:>8.3f} {r['batch_predict_s']:>10.3f} "
+                  f"{r['single_row_ms']:>9.3f} {r['peak_rss_mb']:>8.1f} {r['rmse']:>8.4f}")
+
+    print(f"\nThe trainer switches to CSR above a one-hot width of {SPARSE_ONE_HOT_THRESHOLD} "
+          f"(ML_LABOUR_SPARSE_THRESHOLD)")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"rows": args.rows, "n_estimators": args.n_estimators, "results": results}, f, indent=2)
+        print(f"Report written to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Training throughput benchmark: dataset-size and core-budget scaling
+
+Runs train_crop_model, train_yield_model and train_labour_model_v2 over
+increasing dataset sizes and CPU budgets and records, per run:
+
+    wall / CPU time of every stage (generate or load, encode, scale, fit,
+    evaluate, explainer, dump), the peak RSS after each stage, the peak RSS
+    over the baseline of an idle interpreter, and the size of every artifact
+
+Each (trainer, rows, cores) run happens in a fresh subprocess with
+ML_CPU_BUDGET set to the core count, a cold dataset cache and its own model
+directory, so memory peaks and thread pools do not leak between runs.
+
+For consecutive sizes the report gives the scaling exponent of each stage,
+log(t2 / t1) / log(n2 / n1): 1.0 is linear, and stages above SUPERLINEAR are
+flagged. The same is done for memory over baseline. Comparing core budgets at
+one size gives the parallel speedup of the fit.
+
+Usage:
+    python benchmark_training.py
+    python benchmark_training.py --trainers labour --sizes 5000,20000,80000 --cores 1,2,4 --report training.json
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from contextlib import redirect_stdout
+
+import cpu_budget
+
+warnings.filterwarnings("ignore")
+
+TRAINERS = ("crop", "yield", "labour")
+DEFAULT_SIZES = "2000,8000,32000"
+
+# Scaling exponent above which a stage counts as superlinear
+SUPERLINEAR = 1.15
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def artifact_sizes(model_dir, exclude=()):
+    """Bytes per file the trainer wrote to model_dir"""
+    return {name: os.path.getsize(os.path.join(model_dir, name))
+            for name in sorted(os.listdir(model_dir))
+            if name not in exclude and os.path.isfile(os.path.join(model_dir, name))}
+
+
+def run_single(trainer, rows, model_dir):
+    """Train one model in this process; returns the result dict"""
+    from stage_timer import StageTimer
+
+    import train_crop_model
+    import train_labour_model_v2
+    import train_yield_model
+
+    cores = cpu_budget.configure(verbose=False)
+    baseline_mb = peak_rss_mb()
+    timer = StageTimer(verbose=False)
+    dataset_file = "labour_dataset.csv"
+    start = time.perf_counter()
+
+    # The trainers' own progress output would be mixed into the JSON line
+    with redirect_stdout(sys.stderr):
+        if trainer == "crop":
+            n_crops = train_crop_model.create_crop_dataset(1)["crop"].nunique()
+            samples_per_crop = max(1, rows // n_crops)
+            rows = samples_per_crop * n_crops
+            train_crop_model.train_model(model_dir, samples_per_crop=samples_per_crop,
+                                         use_cache=False, timer=timer)
+        elif trainer == "yield":
+            train_yield_model.train_model(model_dir, n_samples=rows, use_cache=False, timer=timer)
+        else:
+            dataset_path = os.path.join(model_dir, dataset_file)
+            with timer.stage("generate"):
+                train_labour_model_v2.create_labour_dataset(rows).to_csv(dataset_path, index=False)
+            train_labour_model_v2.train_labour_model(
+                dataset_path, n_cores=cores, model_path=os.path.join(model_dir, "labour_model.joblib"),
+                use_cache=False, timer=timer)
+
+    total_s = time.perf_counter() - start
+    artifacts = artifact_sizes(model_dir, exclude=(dataset_file,))
+    peak_mb = peak_rss_mb()
+    return {
+        "trainer": trainer,
+        "rows": rows,
+        "cores": cores,
+        "stages": [{"stage": s["stage"], "wall_s": round(s["wall_s"], 4), "cpu_s": round(s["cpu_s"], 4),
+                    "peak_rss_mb": round(s["peak_rss_mb"], 1)} for s in timer.stages],
+        "total_wall_s": round(total_s, 4),
+        "baseline_rss_mb": round(baseline_mb, 1),
+        "peak_rss_mb": round(peak_mb, 1),
+        "peak_over_baseline_mb": round(peak_mb - baseline_mb, 1),
+        "artifacts": artifacts,
+        "artifact_mb": round(sum(artifacts.values()) / 2**20, 3),
+    }
+
+
+def child_env(cores):
+    """Environment for a run: its own CPU budget and no inherited thread caps"""
+    env = dict(os.environ)
+    env[cpu_budget.ENV_VAR] = str(cores)
+    for name in cpu_budget.THREAD_ENV_VARS:
+        env.pop(name, None)
+    return env
+
+
+def exponent(a, b, n_a, n_b):
+    if a <= 0 or b <= 0 or n_a == n_b:
+        return None
+    return round(math.log(b / a) / math.log(n_b / n_a), 3)
+
+
+def scaling(results):
+    """
+    Size-scaling exponents per (trainer, cores) between consecutive sizes
+
+    Returns:
+        list of {trainer, cores, rows_from, rows_to, stages: {stage: exp},
+        total, memory, superlinear: [stages above SUPERLINEAR]}
+    """
+    curves = []
+    groups = {}
+    for r in results:
+        groups.setdefault((r["trainer"], r["cores"]), []).append(r)
+    for (trainer, cores), runs in sorted(groups.items()):
+        runs.sort(key=lambda r: r["rows"])
+        for a, b in zip(runs, runs[1:]):
+            a_stages = {s["stage"]: s["wall_s"] for s in a["stages"]}
+            stages = {s["stage"]: exponent(a_stages.get(s["stage"], 0), s["wall_s"], a["rows"], b["rows"])
+                      for s in b["stages"]}
+            memory = exponent(a["peak_over_baseline_mb"], b["peak_over_baseline_mb"], a["rows"], b["rows"])
+            flagged = [name for name, e in stages.items() if e is not None and e > SUPERLINEAR]
+            if memory is not None and memory > SUPERLINEAR:
+                flagged.append("memory")
+            curves.append({
+                "trainer": trainer, "cores": cores, "rows_from": a["rows"], "rows_to": b["rows"],
+                "stages": stages,
+                "total": exponent(a["total_wall_s"], b["total_wall_s"], a["rows"], b["rows"]),
+                "memory": memory,
+                "superlinear": flagged,
+            })
+    return curves
+
+
+def speedups(results):
+    """Fit speedup of each core budget over the smallest one, per (trainer, rows)"""
+    fit = {}
+    for r in results:
+        fit[(r["trainer"], r["rows"], r["cores"])] = sum(s["wall_s"] for s in r["stages"] if s["stage"] == "fit")
+    out = []
+    for (trainer, rows) in sorted({(t, n) for t, n, _ in fit}):
+        cores = sorted(c for t, n, c in fit if (t, n) == (trainer, rows))
+        base = fit[(trainer, rows, cores[0])]
+        for c in cores[1:]:
+            value = fit[(trainer, rows, c)]
+            out.append({"trainer": trainer, "rows": rows, "cores_from": cores[0], "cores_to": c,
+                        "fit_speedup": round(base / value, 2) if value > 0 else None})
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Training throughput benchmark")
+    parser.add_argument("--trainers", default=",".join(TRAINERS), help="Comma-separated: crop,yield,labour")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated dataset rows")
+    parser.add_argument("--cores", help="Comma-separated core budgets (default: 1 and the full budget)")
+    parser.add_argument("--report", default="training_benchmark.json", help="JSON report path")
+    parser.add_argument("--single", nargs=3, metavar=("TRAINER", "ROWS", "MODEL_DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        result = run_single(args.single[0], int(args.single[1]), args.single[2])
+        print(json.dumps(result))
+        return
+
+    trainers = [t for t in args.trainers.split(",") if t]
+    unknown = set(trainers) - set(TRAINERS)
+    if unknown:
+        parser.error(f"unknown trainers: {', '.join(sorted(unknown))}")
+    sizes = sorted(int(n) for n in args.sizes.split(","))
+    if args.cores:
+        core_budgets = sorted({int(c) for c in args.cores.split(",")})
+    else:
+        budget, _ = cpu_budget.resolve_cpu_budget()
+        core_budgets = sorted({1, budget})
+
+    results = []
+    print(f"{'trainer':>8} {'rows':>8} {'cores':>5} {'total s':>9} {'fit s':>8} {'peak MB':>8} "
+          f"{'+base MB':>9} {'artifacts MB':>13}")
+    for trainer in trainers:
+        for cores in core_budgets:
+            for rows in sizes:
+                model_dir = tempfile.mkdtemp(prefix=f"train-bench-{trainer}-")
+                try:
+                    output = subprocess.run(
+                        [sys.executable, os.path.abspath(__file__), "--single", trainer, str(rows), model_dir],
+                        capture_output=True, text=True, env=child_env(cores),
+                        cwd=os.path.dirname(os.path.abspath(__file__)))
+                finally:
+                    shutil.rmtree(model_dir, ignore_errors=True)
+                if output.returncode != 0:
+                    print(f"{trainer:>8} {rows:>8} {cores:>5} failed: {output.stderr.strip()[-300:]}",
+                          file=sys.stderr)
+                    continue
+                r = json.loads(output.stdout.strip().splitlines()[-1])
+                results.append(r)
+                fit_s = sum(s["wall_s"] for s in r["stages"] if s["stage"] == "fit")
+                print(f"{trainer:>8} {r['rows']:>8} {r['cores']:>5} {r['total_wall_s']:>9.2f} {fit_s:>8.2f} "
+                      f"{r['peak_rss_mb']:>8.1f} {r['peak_over_baseline_mb']:>9.1f} {r['artifact_mb']:>13.2f}")
+
+    curves = scaling(results)
+    if curves:
+        print(f"\nScaling exponents (1.0 = linear; flagged above {SUPERLINEAR})")
+        for c in curves:
+            stages = ", ".join(f"{name} {e}" for name, e in c["stages"].items() if e is not None)
+            flag = f"  superlinear: {', '.join(c['superlinear'])}" if c["superlinear"] else ""
+            print(f"  {c['trainer']:>6} x{c['cores']} {c['rows_from']}->{c['rows_to']}: "
+                  f"total {c['total']}, memory {c['memory']} | {stages}{flag}")
+    parallel = speedups(results)
+    for s in parallel:
+        print(f"  {s['trainer']:>6} {s['rows']} rows: fit speedup {s['cores_from']}->{s['cores_to']} cores "
+              f"{s['fit_speedup']}x")
+
+    with open(args.report, "w") as f:
+        json.dump({"sizes": sizes, "cores": core_budgets, "superlinear_threshold": SUPERLINEAR,
+                   "results": results, "scaling": curves, "speedups": parallel}, f, indent=2)
+    print(f"\nReport written to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
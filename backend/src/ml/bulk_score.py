@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Sharded bulk scoring for district-scale input files
+
+Scores every row of a large CSV or JSON-lines file (soil cards, farm
+registries) with the crop, yield and/or labour models:
+
+    1. One sequential pass records the byte offset of every shard of
+       --shard-rows rows; nothing is copied.
+    2. A process pool scores the shards. Each worker loads the models once in
+       its initializer, seeks to its shard and scores it in vectorized chunks
+       of --chunk-rows, single-threaded, so N workers use N cores.
+    3. Each shard is written to its own part-NNNNN file (Parquet, or CSV
+       without pyarrow) and marked done in manifest.json.
+
+Rerunning the same command resumes an interrupted job: shards already marked
+done are skipped, and failed or unfinished shards are scored again.
+
+Output columns are the input columns plus:
+
+    crop     crop_recommended, crop_confidence
+    yield    yield_predicted_production, yield_per_hectare, yield_model_used,
+             yield_production_lower, yield_production_upper, yield_uncertainty,
+             yield_confidence (interval columns are empty for rule-based rows;
+             Crop defaults to the recommended crop when crop is also scored)
+    labour   labour_required, labour_demand_level
+
+Usage:
+    python bulk_score.py --input registry.csv --output scored/ --models crop,yield
+    python bulk_score.py --input cards.jsonl --output scored/ --models labour --workers 8
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import cpu_budget
+import predict
+import predict_yield
+from farm_plan import yield_crop_name
+from model_registry import ML_DIR, default_registry
+from train_labour_model_v2 import FEATURE_COLUMNS as LABOUR_COLUMNS, FILLNA as LABOUR_FILLNA
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+warnings.filterwarnings("ignore")
+
+MODELS = ("crop", "yield", "labour")
+YIELD_COLUMNS = ["State", "Year", "Season", "Area", "Rainfall"]
+MANIFEST = "manifest.json"
+
+
+def input_format(path):
+    return "jsonl" if path.endswith((".jsonl", ".json")) else "csv"
+
+
+def required_columns(models):
+    """Input columns each requested model needs"""
+    required = {}
+    if "crop" in models:
+        required["crop"] = list(predict.FEATURE_NAMES)
+    if "yield" in models:
+        required["yield"] = YIELD_COLUMNS + ([] if "crop" in models else ["Crop"])
+    if "labour" in models:
+        required["labour"] = list(LABOUR_COLUMNS)
+    return required
+
+
+def index_shards(path, fmt, shard_rows):
+    """
+    One pass over the input recording where each shard starts
+
+    CSV input is split with the csv module, so a quoted field spanning
+    several lines stays inside one record and one shard.
+
+    Returns:
+        (columns, shards) - the CSV header (None for JSON lines) and a list of
+        {"id", "offset", "rows", "first_row"}; blank lines are not counted
+    """
+    shards = []
+    with open(path, "rb") as f:
+        offset = 0
+
+        def lines():
+            # Byte offset of the end of the last line handed to the reader
+            nonlocal offset
+            for line in f:
+                offset += len(line)
+                yield line.decode("utf-8-sig" if offset == len(line) else "utf-8")
+
+        if fmt == "csv":
+            # The reader pulls exactly the lines of each record, so offset is
+            # the end of the record just returned
+            records = csv.reader(lines())
+            columns = next(records)
+        else:
+            # One record per line, shaped like a one-field CSV record
+            records = ([line] for line in lines())
+            columns = None
+        start = offset
+        rows = first_row = 0
+        for record in records:
+            if not record or (len(record) == 1 and not record[0].strip()):
+                continue
+            rows += 1
+            if rows == shard_rows:
+                shards.append({"id": len(shards), "offset": start, "rows": rows, "first_row": first_row})
+                first_row += rows
+                start, rows = offset, 0
+        if rows:
+            shards.append({"id": len(shards), "offset": start, "rows": rows, "first_row": first_row})
+    return columns, shards
+
+
+def read_shard(path, fmt, columns, offset, rows):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        if fmt == "csv":
+            return pd.read_csv(f, header=None, names=columns, nrows=rows)
+        records = []
+        while len(records) < rows:
+            line = f.readline()
+            if not line:
+                break
+            if line.strip():
+                records.append(json.loads(line))
+        return pd.DataFrame.from_records(records)
+
+
+def score_crop(frame, artifacts):
+    """Recommended crop and its probability, as in predict.predict_crop_batch"""
+    features = artifacts["scaler"].transform(frame[predict.FEATURE_NAMES].to_numpy(dtype=float))
+    probabilities = artifacts["model"].predict_proba(features)
+    best = probabilities.argmax(axis=1)
+    return {
+        "crop_recommended": artifacts["model"].classes_[best],
+        "crop_confidence": probabilities[np.arange(len(best)), best],
+    }
+
+
+def score_yield(frame, artifacts):
+    """
+    Production per row; rows with a State, Season or Crop the encoders have
+    never seen get the rule-based estimate instead of failing the chunk
+    """
+    frame = frame.fillna({name: value for name, value in predict_yield.DEFAULTS.items() if name in frame})
+    area = frame["Area"].to_numpy(dtype=float)
+    production = area * frame["Crop"].map(predict_yield.CROP_FACTORS).fillna(2.0).to_numpy()
+    model_used = np.full(len(frame), "Rule_Based_Fallback", dtype=object)
+    lower = np.full(len(frame), np.nan)
+    upper = np.full(len(frame), np.nan)
+    uncertainty = np.full(len(frame), np.nan)
+    confidence = np.full(len(frame), None, dtype=object)
+
+    model, encoders = artifacts["model"], artifacts["encoders"]
+    if model is not None:
+        known = np.ones(len(frame), dtype=bool)
+        if encoders is not None:
+            for column in ("State", "Season", "Crop"):
+                known &= frame[column].isin(encoders[column].classes_).to_numpy()
+        if known.any():
+            features = predict_yield.build_features(frame[known].to_dict("records"), encoders)
+            if artifacts["scaler"] is not None:
+                features = artifacts["scaler"].transform(features)
+            production[known], bounds = predict_yield.predict_with_intervals(
+                model, features, artifacts.get("calibration"))
+            model_used[known] = "Random_Forest_Regressor"
+            if bounds is not None:
+                lower[known], upper[known] = bounds["lower"], bounds["upper"]
+                uncertainty[known] = bounds["uncertainty"]
+                confidence[known] = bounds["confidence"]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        per_hectare = np.where(area > 0, production / area, 0.0)
+    return {
+        "yield_predicted_production": np.round(production, 2),
+        "yield_per_hectare": np.round(per_hectare, 2),
+        "yield_model_used": model_used,
+        "yield_production_lower": np.round(lower, 2),
+        "yield_production_upper": np.round(upper, 2),
+        "yield_uncertainty": np.round(uncertainty, 4),
+        "yield_confidence": confidence,
+    }
+
+
+def score_labour(frame, artifacts):
+    """Labour required and demand level from the trained labour model"""
+    model = artifacts["model"]
+    # Same missing-value handling the trainer applied before fitting
+    features = frame[model.feature_columns or LABOUR_COLUMNS].fillna(LABOUR_FILLNA)
+    return {
+        "labour_required": model.reg_model.predict(features),
+        "labour_demand_level": model.cls_model.predict(features),
+    }
+
+
+def score_frame(frame, models, artifacts):
+    """Score one chunk with every requested model, chaining crop into yield"""
+    outputs = {}
+    if "crop" in models:
+        outputs.update(score_crop(frame, artifacts["crop"]))
+    if "yield" in models:
+        yield_input = frame
+        if "crop" in models and "Crop" not in frame:
+            yield_input = frame.assign(Crop=[yield_crop_name(c) for c in outputs["crop_recommended"]])
+        outputs.update(score_yield(yield_input, artifacts["yield"]))
+    if "labour" in models:
+        outputs.update(score_labour(frame, artifacts["labour"]))
+    return frame.assign(**outputs)
+
+
+# Per-process state set up by init_worker
+_worker = {}
+
+
+def init_worker(models, model_dir):
+    """Pool initializer: one thread per worker, models loaded once"""
+    cpu_budget.configure(threads=1, verbose=False)
+    registry = default_registry(model_dir)
+    _worker["models"] = models
+    _worker["artifacts"] = {name: registry.get(name) for name in models}
+
+
+def score_shard(task):
+    """Score one shard and write its part file; never raises into the pool"""
+    start = time.perf_counter()
+    try:
+        frame = read_shard(task["input"], task["format"], task["columns"], task["offset"], task["rows"])
+        frame.insert(0, "row", np.arange(task["first_row"], task["first_row"] + len(frame)))
+        scored = pd.concat([
+            score_frame(frame.iloc[i:i + task["chunk_rows"]], _worker["models"], _worker["artifacts"])
+            for i in range(0, len(frame), task["chunk_rows"])
+        ])
+
+        path = os.path.join(task["output_dir"], task["output"])
+        tmp = f"{path}.tmp"
+        if task["output"].endswith(".parquet"):
+            scored.to_parquet(tmp, index=False)
+        else:
+            scored.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+        return {"id": task["id"], "status": "done", "rows": len(scored),
+                "seconds": round(time.perf_counter() - start, 3)}
+    except Exception as e:
+        return {"id": task["id"], "status": "failed", "error": f"{type(e).__name__}: {e}"}
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def load_or_create_manifest(args, models):
+    """
+    The job's manifest, reusing an existing one when it describes the same
+    input file, models and shard size (i.e. when resuming)
+    """
+    job = {
+        "input": os.path.abspath(args.input),
+        "input_bytes": os.path.getsize(args.input),
+        "input_mtime": os.path.getmtime(args.input),
+        "models": list(models),
+        "shard_rows": args.shard_rows,
+    }
+    path = os.path.join(args.output, MANIFEST)
+    if os.path.exists(path):
+        with open(path) as f:
+            manifest = json.load(f)
+        if all(manifest.get(key) == value for key, value in job.items()):
+            return manifest
+        if not args.restart:
+            raise SystemExit(f"{path} belongs to a different job (input, models or shard size changed); "
+                             "use --restart to discard it")
+
+    fmt = input_format(args.input)
+    print(f"Indexing {args.input}...")
+    columns, shards = index_shards(args.input, fmt, args.shard_rows)
+    extension = "parquet" if HAS_PYARROW and args.output_format != "csv" else "csv"
+    for shard in shards:
+        shard.update(status="pending", output=f"part-{shard['id']:05d}.{extension}")
+    manifest = dict(job, format=fmt, columns=columns, rows=sum(s["rows"] for s in shards), shards=shards)
+    save_manifest(args.output, manifest)
+    return manifest
+
+
+def check_columns(manifest, models):
+    """Fail before starting the pool if the input lacks a model's columns"""
+    columns = manifest["columns"]
+    if columns is None:
+        # JSON lines: check the first record
+        with open(manifest["input"]) as f:
+            columns = list(json.loads(next(line for line in f if line.strip())))
+    for model, required in required_columns(models).items():
+        missing = [c for c in required if c not in columns]
+        if missing:
+            raise SystemExit(f"Input is missing columns for the {model} model: {', '.join(missing)}")
+
+
+def run(args):
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    unknown = [m for m in models if m not in MODELS]
+    if not models or unknown:
+        raise SystemExit(f"--models must list some of {', '.join(MODELS)}; got {args.models!r}")
+
+    registry = default_registry(args.model_dir)
+    for name in ("crop", "labour"):
+        if name in models and not registry.available(name):
+            raise SystemExit(f"The {name} model has not been trained")
+
+    os.makedirs(args.output, exist_ok=True)
+    manifest = load_or_create_manifest(args, models)
+    check_columns(manifest, models)
+
+    pending = [s for s in manifest["shards"]
+               if s["status"] != "done" or not os.path.exists(os.path.join(args.output, s["output"]))]
+    done = len(manifest["shards"]) - len(pending)
+    workers = max(1, min(args.workers or cpu_budget.n_jobs(), len(pending) or 1))
+    print(f"{manifest['rows']} rows in {len(manifest['shards'])} shards; "
+          f"{done} already done, {len(pending)} to score with {workers} workers")
+
+    tasks = [dict(shard, input=manifest["input"], format=manifest["format"], columns=manifest["columns"],
+                  output_dir=args.output, chunk_rows=args.chunk_rows) for shard in pending]
+    by_id = {shard["id"]: shard for shard in manifest["shards"]}
+    failed = 0
+    scored_rows = 0
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers, initializer=init_worker, initargs=(models, args.model_dir)) as pool:
+        for result in pool.imap_unordered(score_shard, tasks):
+            shard = by_id[result["id"]]
+            shard.update(result)
+            if result["status"] == "done":
+                done += 1
+                scored_rows += result["rows"]
+                shard.pop("error", None)
+                print(f"[shard {result['id']:05d}] {result['rows']} rows in {result['seconds']:.2f}s "
+                      f"({done}/{len(manifest['shards'])} done)")
+            else:
+                failed += 1
+                print(f"[shard {result['id']:05d}] failed: {result['error']}", file=sys.stderr)
+            save_manifest(args.output, manifest)
+
+    elapsed = time.perf_counter() - start
+    print(f"\nScored {scored_rows} rows in {elapsed:.2f}s ({scored_rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    if failed:
+        print(f"{failed} shard(s) failed; rerun the same command to retry them", file=sys.stderr)
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a large CSV/JSON-lines file in parallel shards")
+    parser.add_argument("--input", required=True, help="CSV with a header row, or JSON lines (.jsonl)")
+    parser.add_argument("--output", required=True, help="Directory for part files and manifest.json")
+    parser.add_argument("--models", default="crop,yield", help="Comma-separated: crop, yield, labour")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: the CPU budget)")
+    parser.add_argument("--shard-rows", type=int, default=100_000)
+    parser.add_argument("--chunk-rows", type=int, default=10_000, help="Rows per vectorized model call")
+    parser.add_argument("--output-format", choices=["parquet", "csv"], default="parquet",
+                        help="Part file format (CSV when pyarrow is not installed)")
+    parser.add_argument("--model-dir", default=ML_DIR)
+    parser.add_argument("--restart", action="store_true", help="Discard a manifest from a different job")
+    args = parser.parse_args()
+
+    cpu_budget.configure()
+    sys.exit(1 if run(args) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Effective CPU budget for training and inference
+
+os.cpu_count() and n_jobs=-1 see every core on the host. Inside a container
+with a CPU quota (ECS/Fargate tasks, docker --cpus) that oversubscribes:
+joblib and the BLAS/OpenMP pools each start one thread per host core, and
+the kernel throttles them all against a quota of a core or two.
+
+The budget is the smallest of:
+
+    ML_CPU_BUDGET      explicit override (positive integer)
+    cgroup CPU quota   cgroup v2 cpu.max, or v1 cpu.cfs_quota_us / cpu.cfs_period_us,
+                       of this process's own cgroup (from /proc/self/cgroup) and
+                       every ancestor of it, whichever is tightest
+    CPU affinity       sched_getaffinity (taskset, cpusets)
+
+so the override can lower the budget but never raise it past the quota or
+the affinity mask; an override that gets clamped is reported in the log.
+
+configure() applies it to the BLAS/OpenMP thread pools (environment variables
+for pools not loaded yet and for child processes, threadpoolctl for pools
+already loaded) and logs the choice to stderr. joblib gets no process-wide
+default: parallel_config is thread-local, so it would not reach threads
+other than the caller's. Trainers pass n_jobs() to their estimators
+explicitly instead of -1, and loaded models predict with n_jobs=None (see
+model_registry.release_n_jobs). The stdin predict scripts call
+configure(verbose=False), since the Node controllers treat stderr output as
+a failure; the pre-fork server gives each worker an equal share of the budget.
+"""
+import math
+import os
+import sys
+
+try:
+    from threadpoolctl import threadpool_limits
+    HAS_THREADPOOLCTL = True
+except ImportError:
+    HAS_THREADPOOLCTL = False
+
+ENV_VAR = "ML_CPU_BUDGET"
+CGROUP_ROOT = "/sys/fs/cgroup"
+PROC_CGROUP = "/proc/self/cgroup"
+V1_CPU_DIRS = ("cpu", "cpu,cpuacct", "cpuacct,cpu")
+
+# Thread-count variables read by OpenMP, OpenBLAS, MKL, Accelerate and numexpr
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                   "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+# Thread variables the user set explicitly are never overridden
+_EXPLICIT_ENV = {name for name in THREAD_ENV_VARS if name in os.environ}
+
+_budget = None
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def own_cgroups(proc_cgroup=PROC_CGROUP):
+    """
+    This process's cgroup paths from /proc/self/cgroup
+
+    Returns:
+        (v2_path, v1_cpu_path) - either is None when that hierarchy is absent
+    """
+    v2_path = v1_path = None
+    for line in (_read(proc_cgroup) or "").splitlines():
+        hierarchy, _, rest = line.partition(":")
+        controllers, _, path = rest.partition(":")
+        if hierarchy == "0" and controllers == "":
+            v2_path = path
+        elif "cpu" in controllers.split(","):
+            v1_path = path
+    return v2_path, v1_path
+
+
+def _ancestors(path):
+    """'/a/b' -> ['a/b', 'a', ''], relative to the hierarchy's mount point"""
+    parts = [p for p in (path or "").split("/") if p]
+    return ["/".join(parts[:i]) for i in range(len(parts), -1, -1)]
+
+
+def _v2_quota(directory):
+    cpu_max = _read(os.path.join(directory, "cpu.max"))
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+    return None
+
+
+def _v1_quota(directory):
+    quota = _read(os.path.join(directory, "cpu.cfs_quota_us"))
+    period = _read(os.path.join(directory, "cpu.cfs_period_us"))
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def cgroup_cpu_limit(root=CGROUP_ROOT, proc_cgroup=PROC_CGROUP):
+    """
+    CPU quota of this process's cgroup in cores, or None if unlimited
+
+    Walks from the process's own cgroup up to the mount point and returns the
+    tightest quota on the way, since a parent's quota caps its children.
+    Reads cgroup v2 (cpu.max: "<quota> <period>" or "max <period>") first,
+    then cgroup v1 (cpu.cfs_quota_us, -1 when unlimited). Without a readable
+    /proc/self/cgroup only the mount point itself is checked.
+    """
+    v2_path, v1_path = own_cgroups(proc_cgroup)
+
+    quotas = [q for q in (_v2_quota(os.path.join(root, level)) for level in _ancestors(v2_path))
+              if q is not None]
+    if quotas:
+        return min(quotas)
+
+    for v1_dir in V1_CPU_DIRS:
+        mount = os.path.join(root, v1_dir)
+        if not os.path.isdir(mount):
+            continue
+        quotas = [q for q in (_v1_quota(os.path.join(mount, level)) for level in _ancestors(v1_path))
+                  if q is not None]
+        return min(quotas) if quotas else None
+    return None
+
+
+def affinity_cores():
+    """Cores this process may run on (respects CPU affinity where supported)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def resolve_cpu_budget():
+    """
+    Work out the CPU budget and where it came from
+
+    Returns:
+        (cores, details) - cores is a positive int; details records each
+        input (None when absent) and which one decided the budget
+    """
+    affinity = affinity_cores()
+    quota = cgroup_cpu_limit()
+    override = os.environ.get(ENV_VAR)
+
+    candidates = {"affinity": affinity}
+    if quota is not None:
+        # A fractional quota still gets a whole thread; 1.5 cores -> 2
+        candidates["cgroup"] = max(1, math.ceil(quota))
+    if override:
+        try:
+            candidates["override"] = max(1, int(override))
+        except ValueError:
+            print(f"[cpu] ignoring invalid {ENV_VAR}={override!r}", file=sys.stderr)
+
+    # Ties go to the override, then the cgroup quota
+    source = min(reversed(list(candidates)), key=candidates.get)
+    details = {"affinity": affinity, "cgroup_quota": quota,
+               "override": candidates.get("override"), "source": source,
+               "override_clamped": "override" in candidates and source != "override"}
+    return candidates[source], details
+
+
+def configure(threads=None, verbose=True):
+    """
+    Resolve the budget once per process and apply it
+
+    Args:
+        threads: cap for the BLAS/OpenMP pools (default: the whole budget);
+                 a pre-fork worker passes its share
+        verbose: log the chosen budget to stderr
+
+    Returns:
+        the CPU budget in cores
+    """
+    global _budget
+    if _budget is None:
+        _budget, details = resolve_cpu_budget()
+        if verbose:
+            quota = details["cgroup_quota"]
+            print(f"[cpu] budget {_budget} core(s) from {details['source']} "
+                  f"(affinity {details['affinity']}, cgroup quota {quota if quota is not None else 'none'}"
+                  f"{', override ' + str(details['override']) if details['override'] else ''})",
+                  file=sys.stderr)
+            if details["override_clamped"]:
+                print(f"[cpu] {ENV_VAR}={details['override']} exceeds the {details['source']} limit; "
+                      f"using {_budget}", file=sys.stderr)
+
+    threads = max(1, min(threads or _budget, _budget))
+    for name in THREAD_ENV_VARS:
+        # Child processes inherit these; the budget also takes effect for
+        # pools that load after this call
+        if name not in _EXPLICIT_ENV:
+            os.environ[name] = str(threads)
+    if HAS_THREADPOOLCTL:
+        threadpool_limits(threads)
+    return _budget
+
+
+def n_jobs():
+    """n_jobs for sklearn estimators and joblib, in place of -1"""
+    return configure() if _budget is None else _budget
@@ -0,0 +1,202 @@
+"""
+Content-addressed cache for generated training datasets and preprocessed matrices
+
+Each entry is keyed on a hash of everything that determines its contents
+(generator source and parameters, seed, source-file checksum, the
+preprocessing config and the source of the build function and the helpers it
+calls) and of the Python, numpy, pandas and scikit-learn versions, so editing
+the preprocessing code or upgrading a library never loads objects pickled by
+another. Arrays are stored as .npy files and memory-mapped on load; scipy CSR
+matrices are stored as their data/indices/indptr arrays and rebuilt around the
+memory-mapped buffers. Fitted preprocessing objects (scalers, encoders) are
+stored alongside them with joblib, so a rerun can skip straight to fitting.
+"""
+import hashlib
+import inspect
+import json
+import os
+import platform
+import shutil
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import sklearn
+
+CACHE_DIR = os.environ.get(
+    "ML_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+)
+CACHE_FORMAT_VERSION = 1
+ARTIFACTS_FILE = "artifacts.joblib"
+META_FILE = "meta.json"
+CSR_PARTS = ("data", "indices", "indptr")
+
+
+def cache_enabled():
+    """Caching is on unless ML_CACHE_DISABLE is set to a truthy value"""
+    return os.environ.get("ML_CACHE_DISABLE", "").lower() not in ("1", "true", "yes")
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(*funcs):
+    """Hash of the functions' source, so editing a generator or builder invalidates its entries"""
+    digest = hashlib.sha256()
+    for func in funcs:
+        digest.update(inspect.getsource(func).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def runtime_versions():
+    """Versions of the libraries whose objects and arrays an entry stores"""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def cache_key(namespace, config):
+    """
+    Build the content address for a cache entry
+
+    Args:
+        namespace: Dataset family (crop, yield, labour)
+        config: JSON-serialisable dict of everything the matrices depend on
+
+    Returns:
+        hex digest identifying the entry
+    """
+    payload = json.dumps(
+        {"namespace": namespace, "format": CACHE_FORMAT_VERSION, "config": config,
+         "runtime": runtime_versions()},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _entry_dir(namespace, key, cache_dir=None):
+    return os.path.join(cache_dir or CACHE_DIR, namespace, key)
+
+
+def _normalise(array):
+    """Convert to an ndarray that np.load can memory-map (no object dtype), or CSR"""
+    if sp.issparse(array):
+        return sp.csr_matrix(array)
+    array = np.asarray(array)
+    if array.dtype == object:
+        array = array.astype(str)
+    return np.ascontiguousarray(array)
+
+
+def load_entry(namespace, key, cache_dir=None):
+    """
+    Load a cache entry
+
+    Returns:
+        (arrays, artifacts) with arrays memory-mapped read-only, or None on a miss
+    """
+    entry = _entry_dir(namespace, key, cache_dir)
+    meta_path = os.path.join(entry, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+
+    arrays = {
+        name: np.load(os.path.join(entry, f"{name}.npy"), mmap_mode="r")
+        for name in meta["arrays"]
+    }
+    for name, shape in meta.get("sparse", {}).items():
+        parts = [np.load(os.path.join(entry, f"{name}.{part}.npy"), mmap_mode="r") for part in CSR_PARTS]
+        arrays[name] = sp.csr_matrix(tuple(parts), shape=tuple(shape), copy=False)
+    artifacts_path = os.path.join(entry, ARTIFACTS_FILE)
+    artifacts = joblib.load(artifacts_path) if os.path.exists(artifacts_path) else {}
+    return arrays, artifacts
+
+
+def save_entry(namespace, key, arrays, artifacts=None, config=None, cache_dir=None):
+    """
+    Write a cache entry atomically
+
+    The entry is assembled in a temporary directory and renamed into place, so
+    concurrent or interrupted runs never observe a partial entry.
+    """
+    entry = _entry_dir(namespace, key, cache_dir)
+    parent = os.path.dirname(entry)
+    os.makedirs(parent, exist_ok=True)
+
+    tmp_dir = tempfile.mkdtemp(prefix=f".{key}-", dir=parent)
+    try:
+        dense, sparse = [], {}
+        for name, array in arrays.items():
+            array = _normalise(array)
+            if sp.issparse(array):
+                for part in CSR_PARTS:
+                    np.save(os.path.join(tmp_dir, f"{name}.{part}.npy"), getattr(array, part))
+                sparse[name] = list(array.shape)
+            else:
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+                dense.append(name)
+        if artifacts:
+            joblib.dump(artifacts, os.path.join(tmp_dir, ARTIFACTS_FILE))
+        with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+            json.dump({"arrays": sorted(dense), "sparse": sparse, "config": config,
+                       "runtime": runtime_versions()}, f, indent=2, default=str)
+        os.replace(tmp_dir, entry)
+    except OSError:
+        # Another run published the same entry first; its contents are identical
+        if not os.path.exists(os.path.join(entry, META_FILE)):
+            raise
+    finally:
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def cached_matrices(namespace, config, build, cache_dir=None, use_cache=None):
+    """
+    Return preprocessed matrices from the cache, building them on a miss
+
+    Args:
+        namespace: Dataset family (crop, yield, labour)
+        config: Everything the matrices depend on; hashed into the key
+                together with the source of build. Helpers that build calls
+                belong in config as source_fingerprint(...) entries
+        build: Zero-argument callable returning (arrays, artifacts)
+        cache_dir: Override for the cache root
+        use_cache: Force caching on/off (defaults to cache_enabled())
+
+    Returns:
+        (arrays, artifacts) - arrays are memory-mapped whenever caching is on,
+        so cold and warm runs fit on identical inputs
+    """
+    if use_cache is None:
+        use_cache = cache_enabled()
+
+    if not use_cache:
+        arrays, artifacts = build()
+        return {name: _normalise(a) for name, a in arrays.items()}, artifacts
+
+    config = dict(config, builder=source_fingerprint(build))
+    key = cache_key(namespace, config)
+    cached = load_entry(namespace, key, cache_dir)
+    if cached is not None:
+        print(f"Dataset cache hit: {namespace}/{key}")
+        return cached
+
+    print(f"Dataset cache miss: {namespace}/{key}")
+    arrays, artifacts = build()
+    save_entry(namespace, key, arrays, artifacts, config=config, cache_dir=cache_dir)
+    return load_entry(namespace, key, cache_dir)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Streaming feature-drift monitor with constant-memory sketches
+
+At training time capture_baseline() records, for each input feature, fixed
+histogram bin edges (training quantiles) and the training distribution over
+those bins; categorical features record their category frequencies. The
+baseline is written next to the model as <model>_drift_baseline.json.
+
+At serving time a DriftMonitor keeps one fixed-size sketch per feature:
+
+    numeric      counts over the baseline bins plus under/overflow bins
+    categorical  exact counts for baseline categories, and a Misra-Gries
+                 heavy-hitter summary capped at `capacity` keys for unseen ones
+
+Each update is O(1) (amortised for Misra-Gries) and memory does not grow
+with traffic. Every `report_every` updates the monitor computes the
+population stability index (PSI) of each feature against its baseline.
+
+Offline:
+    python drift_monitor.py --model crop --log-dir /var/log/predictions
+"""
+import argparse
+import bisect
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# PSI rule of thumb: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+OTHER = "__other__"
+EPSILON = 1e-4
+
+
+def baseline_path(model, model_dir=ML_DIR):
+    return os.path.join(model_dir, f"{model}_drift_baseline.json")
+
+
+def capture_baseline(frame, numeric_cols=(), categorical_cols=(), n_bins=10):
+    """
+    Summarise the training distribution of each input feature
+
+    Args:
+        frame: DataFrame of raw (unencoded, unscaled) training inputs
+        numeric_cols: columns binned by training quantiles
+        categorical_cols: columns summarised by category frequency
+        n_bins: quantile bins per numeric feature
+
+    Returns:
+        JSON-serialisable baseline dict
+    """
+    features = {}
+    for col in numeric_cols:
+        values = frame[col].dropna().to_numpy(dtype=float)
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+        features[col] = {
+            "type": "numeric",
+            "edges": edges.tolist(),
+            "expected": (counts / max(len(values), 1)).tolist(),
+        }
+    for col in categorical_cols:
+        freqs = frame[col].astype(str).value_counts(normalize=True)
+        features[col] = {"type": "categorical", "expected": freqs.to_dict()}
+    return {"n_rows": int(len(frame)), "features": features}
+
+
+def save_baseline(model, baseline, model_dir=ML_DIR):
+    path = baseline_path(model, model_dir)
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+    return path
+
+
+def load_baseline(model, model_dir=ML_DIR):
+    path = baseline_path(model, model_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def psi(expected, observed):
+    """Population stability index between two aligned distributions"""
+    total = sum(observed)
+    if total == 0:
+        return 0.0
+    score = 0.0
+    for e, o in zip(expected, observed):
+        p = max(o / total, EPSILON)
+        q = max(e, EPSILON)
+        score += (p - q) * math.log(p / q)
+    return score
+
+
+class NumericSketch:
+    def __init__(self, spec):
+        self.edges = spec["edges"]
+        self.expected = spec["expected"]
+        self.counts = [0] * (len(self.edges) + 1)
+        self.missing = 0
+
+    def update(self, value):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            self.missing += 1
+            return
+        if math.isnan(value):
+            self.missing += 1
+            return
+        self.counts[bisect.bisect_right(self.edges, value)] += 1
+
+    def score(self):
+        return {"psi": psi(self.expected, self.counts), "observed": sum(self.counts),
+                "missing": self.missing,
+                "underflow": self.counts[0], "overflow": self.counts[-1]}
+
+    def state(self):
+        return {"counts": self.counts, "missing": self.missing}
+
+    def restore(self, state):
+        self.counts = list(state["counts"])
+        self.missing = state["missing"]
+
+
+class CategoricalSketch:
+    def __init__(self, spec, capacity=32):
+        self.expected = spec["expected"]
+        self.known = {category: 0 for category in self.expected}
+        self.capacity = capacity
+        self.unseen = {}        # Misra-Gries summary of categories not in the baseline
+        self.unseen_total = 0
+
+    def update(self, value):
+        value = str(value)
+        if value in self.known:
+            self.known[value] += 1
+            return
+        self.unseen_total += 1
+        if value in self.unseen:
+            self.unseen[value] += 1
+        elif len(self.unseen) < self.capacity:
+            self.unseen[value] = 1
+        else:
+            # Decrement-all; amortised O(1) since it can never remove more than was added
+            for key in list(self.unseen):
+                self.unseen[key] -= 1
+                if self.unseen[key] == 0:
+                    del self.unseen[key]
+
+    def score(self):
+        categories = list(self.expected)
+        expected = [self.expected[c] for c in categories] + [0.0]
+        observed = [self.known[c] for c in categories] + [self.unseen_total]
+        heavy = sorted(self.unseen.items(), key=lambda item: item[1], reverse=True)[:5]
+        return {"psi": psi(expected, observed), "observed": sum(observed),
+                "unseen_share": self.unseen_total / max(sum(observed), 1),
+                "unseen_heavy_hitters": [c for c, _ in heavy]}
+
+    def state(self):
+        return {"known": self.known, "unseen": self.unseen, "unseen_total": self.unseen_total}
+
+    def restore(self, state):
+        self.known.update(state["known"])
+        self.unseen = dict(state["unseen"])
+        self.unseen_total = state["unseen_total"]
+
+
+class DriftMonitor:
+    def __init__(self, model, baseline, report_every=1000, capacity=32, report_path=None):
+        self.model = model
+        self.report_every = report_every
+        self.report_path = report_path
+        self.updates = 0
+        self.sketches = {
+            name: NumericSketch(spec) if spec["type"] == "numeric" else CategoricalSketch(spec, capacity)
+            for name, spec in baseline["features"].items()
+        }
+
+    @classmethod
+    def for_model(cls, model, model_dir=ML_DIR, **kwargs):
+        """Monitor for a trained model, or None if no baseline was captured"""
+        baseline = load_baseline(model, model_dir)
+        return cls(model, baseline, **kwargs) if baseline else None
+
+    def update(self, row):
+        """Add one request's inputs; O(1) in the amount of traffic seen"""
+        for name, sketch in self.sketches.items():
+            if name in row:
+                sketch.update(row[name])
+        self.updates += 1
+        if self.report_every and self.updates % self.report_every == 0:
+            self.report()
+
+    def scores(self):
+        features = {name: sketch.score() for name, sketch in self.sketches.items()}
+        for score in features.values():
+            score["status"] = ("significant" if score["psi"] > PSI_SIGNIFICANT
+                               else "moderate" if score["psi"] > PSI_MODERATE else "stable")
+            score["psi"] = round(score["psi"], 6)
+        worst = max(features.items(), key=lambda item: item[1]["psi"], default=(None, {"psi": 0.0}))
+        return {"model": self.model, "updates": self.updates,
+                "max_psi": worst[1]["psi"], "max_psi_feature": worst[0], "features": features}
+
+    def report(self):
+        """Write the current scores to report_path, or stderr"""
+        scores = self.scores()
+        if self.report_path:
+            tmp = f"{self.report_path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(scores, f, indent=2)
+            os.replace(tmp, self.report_path)
+        else:
+            print(f"[drift] {self.model}: max PSI {scores['max_psi']} ({scores['max_psi_feature']}) "
+                  f"after {self.updates} requests", file=sys.stderr)
+        return scores
+
+    def state(self):
+        return {"updates": self.updates, "sketches": {n: s.state() for n, s in self.sketches.items()}}
+
+    def restore(self, state):
+        self.updates = state["updates"]
+        for name, sketch_state in state["sketches"].items():
+            if name in self.sketches:
+                self.sketches[name].restore(sketch_state)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drift scores for recorded traffic against the training baseline")
+    parser.add_argument("--model", choices=["crop", "yield", "labour"], required=True)
+    parser.add_argument("--log-dir", required=True, help="Prediction log directory")
+    parser.add_argument("--model-dir", default=ML_DIR)
+    args = parser.parse_args()
+
+    monitor = DriftMonitor.for_model(args.model, args.model_dir, report_every=0)
+    if monitor is None:
+        print(f"No drift baseline for {args.model}; retrain to capture one", file=sys.stderr)
+        sys.exit(1)
+
+    from replay_models import iter_requests
+    for batch in iter_requests(args.log_dir, args.model, 1024):
+        for row in batch:
+            monitor.update(row)
+    print(json.dumps(monitor.scores(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Farm Plan Pipeline: crop -> yield -> labour in a single process
+
+Runs the crop recommendation, yield prediction and labour requirement models
+on one set of soil, weather and farm inputs, loading each model once and
+chaining the outputs: the recommended crop(s) feed the yield model, and crop
+plus area feed the labour heuristic/model.
+"""
+import sys
+import json
+
+import cpu_budget
+import predict
+import predict_yield
+import smart_labour_recommendation as labour
+
+
+def yield_crop_name(crop):
+    """Crop model labels are lowercase ('rice'); the yield and labour models use 'Rice'"""
+    return str(crop).capitalize()
+
+
+def rank_candidates(crop_result, top_n):
+    """Top-N crops by recommendation probability"""
+    ranked = sorted(crop_result["all_predictions"].items(), key=lambda item: item[1], reverse=True)
+    return ranked[:max(1, top_n)]
+
+
+def plan_yields(data, crops, artifacts):
+    """
+    Predict yield for every candidate crop in one batched model call
+
+    Crops the trained encoders have never seen (e.g. the crop model's 'tomato')
+    get the rule-based estimate instead of failing the whole batch.
+    """
+    base = {
+        "State": data["State"],
+        "Year": data["Year"],
+        "Season": data.get("Season", "Kharif"),
+        "Area": data["Area"],
+        "Rainfall": data.get("Rainfall", data["rainfall"]),
+        "Temperature": data.get("Temperature", data["temperature"]),
+        "Fertilizer": data.get("Fertilizer", predict_yield.DEFAULTS["Fertilizer"]),
+        "Pesticide": data.get("Pesticide", predict_yield.DEFAULTS["Pesticide"]),
+    }
+    rows = [dict(base, Crop=crop) for crop in crops]
+
+    encoders = artifacts["encoders"]
+    if artifacts["model"] is not None and encoders is not None:
+        known = set(encoders["Crop"].classes_)
+    else:
+        known = set(predict_yield.FALLBACK_MAPS["Crop"])
+
+    results = [None] * len(rows)
+    supported = [i for i, row in enumerate(rows) if row["Crop"] in known]
+    if supported:
+        batch = predict_yield.predict_yield_batch([rows[i] for i in supported], artifacts)
+        for i, result in zip(supported, batch):
+            results[i] = result
+    for i, row in enumerate(rows):
+        if results[i] is None:
+            results[i] = predict_yield.rule_based_prediction(row)
+    return results
+
+
+def plan_labour(data, crops):
+    """Labour requirement for each candidate crop on the farm's area"""
+    area = float(data["Area"])
+    season = data.get("Season", "Kharif")
+    results = labour.batch_rows(labour.calculate_labour_requirement_batch(
+        crops, [area] * len(crops), [season] * len(crops)))
+    return [labour.build_output(crop, area, season, result) for crop, result in zip(crops, results)]
+
+
+def build_plan(data, crop_artifacts=None, yield_artifacts=None):
+    """
+    Build a combined season plan
+
+    Args:
+        data: dict with the crop model inputs (N, P, K, temperature, humidity,
+              ph, rainfall), the farm inputs (State, Year, Season, Area) and
+              optionally Rainfall, Temperature, Fertilizer, Pesticide and top_n
+        crop_artifacts: preloaded crop model artifacts (loaded if omitted)
+        yield_artifacts: preloaded yield model artifacts (loaded if omitted)
+
+    Returns:
+        dict with the crop recommendation and one plan entry per candidate crop
+    """
+    crop_result = predict.predict_crop(data, crop_artifacts)
+    if "error" in crop_result:
+        return dict(crop_result, success=False)
+
+    if yield_artifacts is None:
+        yield_artifacts = predict_yield.load_artifacts()
+
+    candidates = rank_candidates(crop_result, int(data.get("top_n", 1)))
+    crops = [yield_crop_name(crop) for crop, _ in candidates]
+
+    yields = plan_yields(data, crops, yield_artifacts)
+    labour_plans = plan_labour(data, crops)
+
+    plan = [{
+        "crop": crop,
+        "crop_probability": probability,
+        "yield": yield_result,
+        "labour": labour_plan
+    } for (crop, probability), yield_result, labour_plan in zip(candidates, yields, labour_plans)]
+
+    return {
+        "success": True,
+        "recommended_crop": crop_result["recommended_crop"],
+        "confidence": crop_result["confidence"],
+        "crop_model": crop_result["model_used"],
+        "plan": plan
+    }
+
+
+def main():
+    """
+    Main function to handle stdin input
+    Expected input format:
+    {
+        "N": 80, "P": 40, "K": 40, "temperature": 25, "humidity": 80,
+        "ph": 6.5, "rainfall": 200,
+        "State": "Punjab", "Year": 2024, "Season": "Kharif", "Area": 10,
+        "top_n": 3
+    }
+    """
+    cpu_budget.configure(verbose=False)
+    try:
+        input_data = json.loads(sys.stdin.read())
+        print(json.dumps(build_plan(input_data)))
+        sys.exit(0)
+
+    except Exception as e:
+        error_output = {
+            'success': False,
+            'error': str(e),
+            'message': 'Failed to build farm plan'
+        }
+        print(json.dumps(error_output))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
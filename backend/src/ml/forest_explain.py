@@ -0,0 +1,163 @@
+"""
+Per-prediction feature contributions for the random forest models
+
+Uses path contributions: walking a tree from the root to a leaf, each split
+moves the node's expected value (class probabilities, or the mean target)
+from the parent's to the child's, and that change is credited to the split
+feature. The expected value at the root plus the changes along the path
+equals the leaf value, so averaged over the trees
+
+    prediction = base_value + sum of per-feature contributions
+
+exactly, for predict_proba and regressor predict alike.
+
+At export time every node's change from its parent is folded into one
+sparse (total nodes x features*outputs) weight matrix, already averaged over
+the trees and grouped from model columns back to the raw input features
+(one-hot columns sum into the categorical feature they encode). At
+inference the forest's decision_path indicator for a batch, multiplied by
+that matrix, gives every row's contributions in one sparse product.
+"""
+import numpy as np
+import scipy.sparse as sp
+
+
+def column_groups(preprocessor):
+    """
+    Raw input feature behind each column a fitted ColumnTransformer outputs
+
+    One-hot encoded columns map to their source column; other transformers
+    (scalers) are one-to-one.
+    """
+    groups = []
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == "drop" or name == "remainder":
+            continue
+        categories = getattr(transformer, "categories_", None)
+        if categories is None:
+            groups.extend(columns)
+            continue
+        drop_idx = getattr(transformer, "drop_idx_", None)
+        for i, (column, values) in enumerate(zip(columns, categories)):
+            dropped = drop_idx is not None and drop_idx[i] is not None
+            groups.extend([column] * (len(values) - int(dropped)))
+    return groups
+
+
+class ForestExplainer:
+    def __init__(self, weights, base_value, feature_names, node_counts, classes=None):
+        """
+        Args:
+            weights: CSR (total nodes, n_features * n_outputs) contribution weights
+            base_value: (n_outputs,) forest-average root value
+            feature_names: raw feature names, in weight-column order
+            node_counts: nodes per tree, to check the explainer matches a forest
+            classes: class labels for classifiers (one output per class)
+        """
+        self.weights = weights
+        self.base_value = base_value
+        self.feature_names = list(feature_names)
+        self.node_counts = tuple(node_counts)
+        self.classes = None if classes is None else list(classes)
+
+    @classmethod
+    def from_forest(cls, forest, feature_names, column_features=None):
+        """
+        Precompute the contribution weights of a fitted forest
+
+        Args:
+            forest: fitted RandomForestClassifier or RandomForestRegressor
+            feature_names: raw input features to report contributions for
+            column_features: raw feature for each model input column (e.g. from
+                             column_groups()); defaults to feature_names itself
+        """
+        column_features = list(column_features or feature_names)
+        feature_index = {name: i for i, name in enumerate(feature_names)}
+        column_to_feature = np.array([feature_index[name] for name in column_features])
+
+        n_trees = len(forest.estimators_)
+        n_features = len(feature_names)
+        blocks, bases = [], []
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            values = tree.value[:, 0, :]
+            if hasattr(forest, "classes_"):
+                values = values / values.sum(axis=1, keepdims=True)
+            n_outputs = values.shape[1]
+
+            parent = np.full(tree.node_count, -1)
+            internal = np.flatnonzero(tree.children_left >= 0)
+            parent[tree.children_left[internal]] = internal
+            parent[tree.children_right[internal]] = internal
+
+            # Entering a child changes the expected value by child - parent,
+            # credited to the feature the parent split on
+            children = np.flatnonzero(parent >= 0)
+            delta = (values[children] - values[parent[children]]) / n_trees
+            feature = column_to_feature[tree.feature[parent[children]]]
+            rows = np.repeat(children, n_outputs)
+            cols = (feature[:, None] * n_outputs + np.arange(n_outputs)).ravel()
+            blocks.append(sp.csr_matrix((delta.ravel(), (rows, cols)),
+                                        shape=(tree.node_count, n_features * n_outputs)))
+            bases.append(values[0])
+
+        # Duplicate (node, feature) entries from grouped one-hot columns are summed
+        weights = sp.vstack(blocks, format="csr")
+        weights.sum_duplicates()
+        return cls(weights, np.mean(bases, axis=0), feature_names,
+                   [e.tree_.node_count for e in forest.estimators_],
+                   getattr(forest, "classes_", None))
+
+    def contributions(self, forest, X):
+        """
+        Contributions for a batch of model inputs
+
+        Args:
+            forest: the fitted forest the explainer was built from
+            X: model input matrix (already preprocessed), dense or CSR
+
+        Returns:
+            (n_rows, n_features, n_outputs) array; base_value plus the sum over
+            features equals the forest's prediction for each row
+        """
+        if tuple(e.tree_.node_count for e in forest.estimators_) != self.node_counts:
+            raise ValueError("Explainer was exported for a different forest; retrain to regenerate it")
+        paths, _ = forest.decision_path(X)
+        n_outputs = len(self.base_value)
+        return (paths @ self.weights).toarray().reshape(X.shape[0], len(self.feature_names), n_outputs)
+
+    def explain(self, forest, X, outputs=None):
+        """
+        Explanations blocks for a batch, one per row
+
+        Args:
+            forest: the fitted forest
+            X: model input matrix
+            outputs: for classifiers, the class to explain per row (defaults
+                     to each row's predicted class)
+
+        Returns:
+            list of {"base_value", "contributions": {feature: value}} with the
+            contributions ordered by absolute size (plus "class" for classifiers)
+        """
+        contributions = self.contributions(forest, X)
+        if self.classes is not None:
+            if outputs is None:
+                predicted = (self.base_value + contributions.sum(axis=1)).argmax(axis=1)
+            else:
+                index = {c: i for i, c in enumerate(self.classes)}
+                predicted = np.array([index[o] for o in outputs])
+        else:
+            predicted = np.zeros(X.shape[0], dtype=int)
+
+        blocks = []
+        for row, k in zip(contributions, predicted):
+            order = np.argsort(-np.abs(row[:, k]))
+            block = {
+                "base_value": round(float(self.base_value[k]), 6),
+                "contributions": {self.feature_names[j]: round(float(row[j, k]), 6) for j in order},
+            }
+            if self.classes is not None:
+                block["class"] = str(self.classes[k])
+            blocks.append(block)
+        return blocks
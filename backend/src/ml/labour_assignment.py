@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+"""
+Global labour assignment across all open jobs
+
+recommendLabour ranks labourers for one job at a time, so two farmers posting
+for the same day are both shown the same top workers. This assigns every open
+job at once: each job gets up to its capacity of labourers, each labourer works
+at most one job per day, and the total match score is maximised.
+
+    score     - the same weighted match score as recommendLabour (skills 40,
+                experience 25, location 20, rating 10, availability 5),
+                computed for blocks of jobs against all labourers at once.
+                The rules are recommendLabour's, edge cases included: no
+                skills list scores the full 40, and a location object with
+                no city or state matches any place. The only difference is
+                that a job's location is an object, so each of its village,
+                district and state names is tried against the labourer's
+    capacity  - the job's predicted labour requirement (ML model, else the
+                heuristic) when its crop and area are known, like
+                recommendLabour's override; workersNeeded otherwise
+    candidates- per date, each job keeps its best top_k labourers (more for
+                jobs needing more workers) and each labourer its best labour_k
+                jobs, so the problem stays a sparse bipartite graph rather
+                than jobs x labourers
+    solve     - the capacitated assignment on that graph is a transportation
+                problem; its constraint matrix is totally unimodular, so
+                HiGHS dual simplex on the plain LP returns an integral optimum;
+                slots and labourers the graph left unmatched are paired up in
+                up to MAX_ROUNDS further rounds over just the leftovers
+
+Input (stdin or --input file):
+    {
+        "jobs": [{"id", "date", "workersNeeded", "skills", "experience",
+                  "location": {"village", "district", "state"},
+                  "cropType", "area", "season"}, ...],
+        "labourers": [{"id", "skills": [...], "experience", "rating",
+                       "availability", "location": {...}}, ...],
+        "options": {"top_k": 30, "candidate_factor": 3, "labour_k": 5,
+                    "time_limit": null}
+    }
+
+Usage:
+    python labour_assignment.py < request.json
+    python labour_assignment.py --input request.json --output assignment.json
+    python labour_assignment.py --demo 20000 30000     # synthetic jobs, labourers
+"""
+import argparse
+import json
+import sys
+import time
+import warnings
+from collections import defaultdict
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import linprog
+
+import cpu_budget
+from smart_labour_recommendation import calculate_labour_requirement_batch
+
+warnings.filterwarnings("ignore")
+
+DEFAULT_TOP_K = 30
+CANDIDATE_FACTOR = 3
+DEFAULT_LABOUR_K = 5
+MAX_ROUNDS = 4
+JOB_BLOCK = 256
+
+# Match score weights, as in labourController.recommendLabour
+SKILL_POINTS = 40.0
+EXPERIENCE_POINTS = 25.0
+LOCATION_MATCH, LOCATION_MISMATCH, LOCATION_UNKNOWN = 20.0, 10.0, 15.0
+RATING_POINTS = 10.0
+DEFAULT_RATING = 4.0
+AVAILABLE_POINTS, UNAVAILABLE_POINTS = 5.0, 2.0
+
+# Labourers marked like this are left out of the assignment entirely
+UNASSIGNABLE = {"unavailable", "busy", "inactive"}
+
+# Growing season by job month, for jobs that do not give one
+SEASON_BY_MONTH = {6: "Kharif", 7: "Kharif", 8: "Kharif", 9: "Kharif", 10: "Kharif",
+                   11: "Rabi", 12: "Rabi", 1: "Rabi", 2: "Rabi", 3: "Rabi",
+                   4: "Zaid", 5: "Zaid"}
+
+
+def split_terms(value, strip=True):
+    """
+    Lower-cased terms from a list or comma-separated string
+
+    Empty terms are kept: recommendLabour keeps them too, and an empty string
+    is contained in every other string, so it matches anything.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    terms = [str(v).lower() for v in value if v is not None]
+    return [t.strip() for t in terms] if strip else terms
+
+
+def substring_matches(required, offered):
+    """
+    Which row terms each offered term satisfies, using recommendLabour's rule
+    (either string contains the other), as a sparse (required x offered)
+    0/1 matrix. Computed once over the distinct strings, not per pair.
+    """
+    rows, cols = [], []
+    for i, r in enumerate(required):
+        for j, o in enumerate(offered):
+            if r in o or o in r:
+                rows.append(i)
+                cols.append(j)
+    return sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                         shape=(len(required), len(offered)))
+
+
+def incidence(term_lists, vocabulary):
+    """
+    Sparse (rows x vocabulary) matrix of how often each row lists each term;
+    repeated required skills count separately, as in recommendLabour
+    """
+    rows, cols = [], []
+    for i, terms in enumerate(term_lists):
+        for term in terms:
+            rows.append(i)
+            cols.append(vocabulary[term])
+    return sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                         shape=(len(term_lists), len(vocabulary)))
+
+
+def job_skills(job):
+    """Required skills: explicit skills, else the job type unless it is General"""
+    skills = split_terms(job.get("skills"))
+    if not skills and str(job.get("type") or "").strip().lower() not in ("", "general"):
+        skills = split_terms(job["type"])
+    return skills
+
+
+def labour_skills(labour):
+    """
+    The labourer's skills, or None when there is no skills list; like
+    recommendLabour, skills are lower-cased but not trimmed
+    """
+    skills = labour.get("skills")
+    return split_terms(skills, strip=False) if isinstance(skills, list) else None
+
+
+def job_locations(job):
+    """
+    Place names the job's location may match (village, district, state), or
+    None without a location. A location object with no names gives [""],
+    which matches every labourer, as an empty request location would.
+    """
+    location = job.get("location")
+    if not location and not isinstance(location, dict):
+        return None
+    if isinstance(location, str):
+        return [location.strip().lower()]
+    places = [str(location[k]).strip().lower() for k in ("village", "district", "state") if location.get(k)]
+    return places or [""]
+
+
+def labour_location(labour):
+    """
+    The labourer's location string recommendLabour compares (city, else state,
+    lower-cased), or None without a location. A location object without city
+    or state gives "", which recommendLabour counts as a match.
+    """
+    location = labour.get("location")
+    if not location and not isinstance(location, dict):
+        return None
+    if isinstance(location, str):
+        return location.lower()
+    return str(location.get("city") or location.get("state") or "").lower()
+
+
+def job_date(job):
+    return str(job.get("date") or "")[:10] or "undated"
+
+
+class MatchScorer:
+    """
+    Vectorised recommendLabour match score between jobs and labourers
+
+    Skills and locations are turned into sparse incidence matrices over their
+    distinct strings, so the pairwise skill and location terms for a block of
+    jobs are two sparse products instead of a Python loop per pair.
+    """
+
+    def __init__(self, jobs, labourers):
+        job_skill_terms = [job_skills(j) for j in jobs]
+        labour_skill_lists = [labour_skills(l) for l in labourers]
+        labour_skill_terms = [terms or [] for terms in labour_skill_lists]
+        required = sorted({t for terms in job_skill_terms for t in terms})
+        offered = sorted({t for terms in labour_skill_terms for t in terms})
+        required_index = {t: i for i, t in enumerate(required)}
+        offered_index = {t: i for i, t in enumerate(offered)}
+
+        # (jobs x required) and (labourers x required skills they satisfy)
+        self.required = incidence(job_skill_terms, required_index)
+        satisfies = incidence(labour_skill_terms, offered_index) @ substring_matches(required, offered).T
+        satisfies.data[:] = 1.0
+        self.satisfies_t = satisfies.T.tocsr()
+        self.n_required = np.asarray(self.required.sum(axis=1)).ravel()
+        # Labourers without a skills list get the full skill points
+        self.labour_has_skills = np.array([terms is not None for terms in labour_skill_lists])
+
+        job_location_terms = [job_locations(j) for j in jobs]
+        labour_location_terms = [labour_location(l) for l in labourers]
+        job_places = sorted({t for terms in job_location_terms if terms for t in terms})
+        labour_places = sorted({t for t in labour_location_terms if t is not None})
+        places = incidence([terms or [] for terms in job_location_terms],
+                           {t: i for i, t in enumerate(job_places)})
+        labour_place = incidence([[t] if t is not None else [] for t in labour_location_terms],
+                                 {t: i for i, t in enumerate(labour_places)})
+        self.places = places
+        self.place_match_t = (substring_matches(job_places, labour_places) @ labour_place.T).tocsr()
+        self.job_has_location = np.array([terms is not None for terms in job_location_terms])
+        self.labour_has_location = np.array([t is not None for t in labour_location_terms])
+
+        # recommendLabour parses the minimum with parseInt
+        self.min_experience = np.array([int(float(j.get("experience") or 0)) for j in jobs], dtype=float)
+        self.experience = np.array([float(l.get("experience") or 0) for l in labourers])
+        rating = np.array([float(l.get("rating") or DEFAULT_RATING) for l in labourers])
+        available = np.array([(l.get("availability") or "Available") == "Available" for l in labourers])
+        # Rating and availability only depend on the labourer
+        self.labour_points = rating / 5 * RATING_POINTS + np.where(available, AVAILABLE_POINTS, UNAVAILABLE_POINTS)
+
+    def score(self, job_index):
+        """(len(job_index), labourers) float32 match scores for a block of jobs"""
+        n_required = self.n_required[job_index][:, None]
+        matched = (self.required[job_index] @ self.satisfies_t).toarray()
+        scored = (n_required > 0) & self.labour_has_skills[None, :]
+        skills = np.where(scored, matched / np.maximum(n_required, 1) * SKILL_POINTS, SKILL_POINTS)
+
+        min_exp = self.min_experience[job_index][:, None]
+        exp = self.experience[None, :]
+        experience = np.where(exp >= min_exp,
+                              np.minimum(EXPERIENCE_POINTS, exp / np.maximum(min_exp, 1) * 12.5),
+                              np.maximum(0, EXPERIENCE_POINTS - (min_exp - exp) / np.maximum(min_exp, 1e-9) * 15))
+
+        same_place = (self.places[job_index] @ self.place_match_t).toarray() > 0
+        known = self.job_has_location[job_index][:, None] & self.labour_has_location[None, :]
+        location = np.where(known, np.where(same_place, LOCATION_MATCH, LOCATION_MISMATCH), LOCATION_UNKNOWN)
+
+        return (skills + experience + location + self.labour_points[None, :]).astype(np.float32)
+
+
+def job_capacities(jobs):
+    """
+    Workers each job can take, and where that number came from
+
+    Jobs with a crop and area use the predicted labour requirement, as
+    recommendLabour does, computed for all of them in one batch.
+    """
+    capacities = np.array([max(1, int(job.get("workersNeeded") or 1)) for job in jobs], dtype=np.int64)
+    sources = ["workersNeeded"] * len(jobs)
+    predicted = [i for i, job in enumerate(jobs)
+                 if job.get("cropType") and job.get("area") and float(job["area"]) > 0]
+    if predicted:
+        seasons = []
+        for i in predicted:
+            season = jobs[i].get("season")
+            if not season:
+                date = job_date(jobs[i])
+                month = int(date[5:7]) if date[4:5] == "-" else None
+                season = SEASON_BY_MONTH.get(month, "Kharif")
+            seasons.append(season)
+        result = calculate_labour_requirement_batch([jobs[i]["cropType"] for i in predicted],
+                                                    [float(jobs[i]["area"]) for i in predicted], seasons)
+        capacities[predicted] = np.maximum(1, result["labour_required"])
+        for i, method in zip(predicted, result["method"]):
+            sources[i] = str(method)
+    return capacities, sources
+
+
+def candidate_edges(scorer, job_index, capacities, top_k, candidate_factor, labour_k, taken=None):
+    """
+    Sparse candidate graph for one date
+
+    Each job keeps its best max(top_k, candidate_factor * capacity)
+    labourers, and each labourer keeps its best labour_k jobs. Job-side lists
+    alone all pick the same highly rated labourers; the labourer-side lists
+    make sure everyone available that day can be placed somewhere.
+    Labourers flagged in taken (already assigned that day) are left out.
+
+    Returns:
+        (job, labourer, score) edge arrays with global indices, no duplicates
+    """
+    n_labourers = len(scorer.experience)
+    labour_k = min(labour_k, len(job_index))
+    best_scores = np.full((labour_k, n_labourers), -np.inf, dtype=np.float32)
+    best_jobs = np.zeros((labour_k, n_labourers), dtype=np.int64)
+    jobs_out, labour_out, score_out = [], [], []
+    for start in range(0, len(job_index), JOB_BLOCK):
+        block = job_index[start:start + JOB_BLOCK]
+        scores = scorer.score(block)
+        if taken is not None:
+            scores[:, taken] = -np.inf
+
+        keep = np.minimum(n_labourers, np.maximum(top_k, candidate_factor * capacities[block]))
+        k_max = int(keep.max())
+        if k_max < n_labourers:
+            top = np.argpartition(-scores, k_max - 1, axis=1)[:, :k_max]
+        else:
+            top = np.tile(np.arange(n_labourers), (len(block), 1))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        mask = np.arange(k_max)[None, :] < keep[:, None]
+        jobs_out.append(np.broadcast_to(block[:, None], top.shape)[mask])
+        labour_out.append(top[mask])
+        score_out.append(top_scores[mask])
+
+        # Running best labour_k jobs per labourer across the blocks
+        merged_scores = np.vstack([best_scores, scores])
+        merged_jobs = np.vstack([best_jobs, np.broadcast_to(block[:, None], scores.shape)])
+        top = np.argpartition(-merged_scores, labour_k - 1, axis=0)[:labour_k]
+        best_scores = np.take_along_axis(merged_scores, top, axis=0)
+        best_jobs = np.take_along_axis(merged_jobs, top, axis=0)
+
+    jobs_out.append(best_jobs.ravel())
+    labour_out.append(np.tile(np.arange(n_labourers), labour_k))
+    score_out.append(best_scores.ravel())
+    edge_job, edge_labour = np.concatenate(jobs_out), np.concatenate(labour_out)
+    edge_score = np.concatenate(score_out)
+    _, first = np.unique(edge_job * n_labourers + edge_labour, return_index=True)
+    first = first[np.isfinite(edge_score[first])]
+    return edge_job[first], edge_labour[first], edge_score[first]
+
+
+def solve_assignment(edge_job, edge_labour, edge_score, capacities, time_limit=None):
+    """
+    Maximise total score subject to job capacities and one job per labourer
+
+    Args:
+        edge_job, edge_labour, edge_score: candidate edges (global indices)
+        capacities: capacity per job (global index)
+        time_limit: optional solver time limit in seconds
+
+    Returns:
+        (boolean mask of chosen edges, solver status message)
+    """
+    n_edges = len(edge_job)
+    jobs, job_row = np.unique(edge_job, return_inverse=True)
+    labourers, labour_row = np.unique(edge_labour, return_inverse=True)
+    columns = np.arange(n_edges)
+    job_rows = sp.csr_matrix((np.ones(n_edges), (job_row, columns)), shape=(len(jobs), n_edges))
+    labour_rows = sp.csr_matrix((np.ones(n_edges), (labour_row, columns)), shape=(len(labourers), n_edges))
+    options = {"time_limit": time_limit} if time_limit else {}
+    # Dual simplex ends on a vertex, and every vertex of this polytope is
+    # integral, so the LP needs no branch and bound
+    result = linprog(-edge_score.astype(np.float64),
+                     A_ub=sp.vstack([job_rows, labour_rows], format="csr"),
+                     b_ub=np.concatenate([capacities[jobs], np.ones(len(labourers))]),
+                     bounds=(0, 1), method="highs-ds", options=options)
+    if result.x is None:
+        raise RuntimeError(f"Assignment solver failed: {result.message}")
+    return result.x > 0.5, result.message
+
+
+def assign(data):
+    """
+    Assign labourers to every job in the request
+
+    Returns:
+        dict with per-job assignments and a summary
+    """
+    options = data.get("options") or {}
+    top_k = int(options.get("top_k", DEFAULT_TOP_K))
+    candidate_factor = int(options.get("candidate_factor", CANDIDATE_FACTOR))
+    labour_k = int(options.get("labour_k", DEFAULT_LABOUR_K))
+    timings = {}
+
+    start = time.perf_counter()
+    jobs = list(data.get("jobs") or [])
+    labourers = [l for l in data.get("labourers") or []
+                 if str(l.get("availability") or "Available").lower() not in UNASSIGNABLE]
+    capacities, sources = job_capacities(jobs)
+    timings["capacity_s"] = time.perf_counter() - start
+
+    assigned = defaultdict(list)
+    edges = 0
+    rounds = 0
+    messages = set()
+    timings.update(candidates_s=0.0, solve_s=0.0)
+    if jobs and labourers:
+        scorer = MatchScorer(jobs, labourers)
+        by_date = defaultdict(list)
+        for i, job in enumerate(jobs):
+            by_date[job_date(job)].append(i)
+
+        # Dates are independent: a labourer can work one job on each day.
+        # Within a date, slots and labourers the sparse graph left unmatched
+        # are matched against each other in further rounds.
+        for index in by_date.values():
+            index = np.array(index)
+            remaining = capacities.copy()
+            taken = np.zeros(len(labourers), dtype=bool)
+            for _ in range(MAX_ROUNDS):
+                open_jobs = index[remaining[index] > 0]
+                if len(open_jobs) == 0 or taken.all():
+                    break
+                start = time.perf_counter()
+                edge_job, edge_labour, edge_score = candidate_edges(
+                    scorer, open_jobs, remaining, top_k, candidate_factor, labour_k, taken)
+                timings["candidates_s"] += time.perf_counter() - start
+                if len(edge_job) == 0:
+                    break
+
+                start = time.perf_counter()
+                chosen, message = solve_assignment(edge_job, edge_labour, edge_score, remaining,
+                                                   options.get("time_limit"))
+                timings["solve_s"] += time.perf_counter() - start
+                edges += len(edge_job)
+                rounds += 1
+                messages.add(message)
+                if not chosen.any():
+                    break
+                for j, l, s in zip(edge_job[chosen], edge_labour[chosen], edge_score[chosen]):
+                    assigned[j].append((float(s), l))
+                remaining -= np.bincount(edge_job[chosen], minlength=len(jobs))
+                taken[edge_labour[chosen]] = True
+
+    results = []
+    total_score = 0.0
+    total_assigned = 0
+    for i, job in enumerate(jobs):
+        picks = sorted(assigned.get(i, []), reverse=True)
+        total_score += sum(s for s, _ in picks)
+        total_assigned += len(picks)
+        results.append({
+            "job_id": job.get("id"),
+            "date": job_date(job),
+            "capacity": int(capacities[i]),
+            "capacity_source": sources[i],
+            "assigned": [{"labour_id": labourers[l].get("id"), "match_score": round(s, 1)} for s, l in picks],
+            "unfilled": int(capacities[i]) - len(picks),
+        })
+
+    capacity_total = int(capacities.sum()) if len(jobs) else 0
+    return {
+        "success": True,
+        "assignments": results,
+        "summary": {
+            "jobs": len(jobs),
+            "labourers": len(labourers),
+            "dates": len({job_date(j) for j in jobs}),
+            "candidate_edges": edges,
+            "rounds": rounds,
+            "assigned": total_assigned,
+            "capacity": capacity_total,
+            "fill_rate": round(total_assigned / capacity_total, 4) if capacity_total else 0.0,
+            "total_match_score": round(total_score, 1),
+            "mean_match_score": round(total_score / total_assigned, 2) if total_assigned else 0.0,
+            "solver": sorted(messages),
+            "timings": {k: round(v, 3) for k, v in timings.items()},
+        },
+    }
+
+
+def demo_request(n_jobs, n_labourers, n_dates=7, seed=42):
+    """Synthetic open jobs and labourers for scale testing"""
+    rng = np.random.default_rng(seed)
+    skills = ["harvesting", "sowing", "irrigation", "spraying", "weeding", "ploughing",
+              "transplanting", "threshing", "tractor driving", "pruning"]
+    states = ["Punjab", "Haryana", "Uttar Pradesh", "Bihar", "Maharashtra", "Karnataka"]
+    districts = [f"District {i}" for i in range(120)]
+    crops = ["Rice", "Wheat", "Cotton", "Maize", "Sugarcane", "Vegetables", None]
+    dates = [f"2026-{(6 + d // 28) % 12 + 1:02d}-{d % 28 + 1:02d}" for d in range(n_dates)]
+
+    jobs = []
+    for i in range(n_jobs):
+        crop = crops[rng.integers(len(crops))]
+        job = {
+            "id": f"job-{i}",
+            "date": dates[rng.integers(n_dates)],
+            "workersNeeded": int(rng.integers(1, 6)),
+            "skills": ",".join(rng.choice(skills, size=rng.integers(0, 3), replace=False)),
+            "experience": int(rng.integers(0, 6)),
+            "location": {"district": districts[rng.integers(len(districts))],
+                         "state": states[rng.integers(len(states))]},
+        }
+        if crop and rng.random() < 0.3:
+            job.update(cropType=crop, area=round(float(rng.uniform(0.2, 2.0)), 1))
+        jobs.append(job)
+
+    labourers = [{
+        "id": f"labour-{i}",
+        "skills": list(rng.choice(skills, size=rng.integers(1, 4), replace=False)),
+        "experience": int(rng.integers(0, 15)),
+        "rating": round(float(rng.uniform(3, 5)), 1),
+        "availability": "Available" if rng.random() < 0.9 else "Limited",
+        "location": {"state": states[rng.integers(len(states))]},
+    } for i in range(n_labourers)]
+    return {"jobs": jobs, "labourers": labourers}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assign labourers to all open jobs")
+    parser.add_argument("--input", help="Request JSON file (default: stdin)")
+    parser.add_argument("--output", help="Write the result here instead of stdout")
+    parser.add_argument("--demo", nargs=2, type=int, metavar=("JOBS", "LABOURERS"),
+                        help="Solve a synthetic request of this size and print the summary")
+    parser.add_argument("--top-k", type=int, help="Candidate labourers kept per job")
+    args = parser.parse_args()
+    cpu_budget.configure(verbose=False)
+
+    try:
+        if args.demo:
+            data = demo_request(*args.demo)
+        elif args.input:
+            with open(args.input) as f:
+                data = json.load(f)
+        else:
+            data = json.loads(sys.stdin.read())
+        if args.top_k:
+            data.setdefault("options", {})["top_k"] = args.top_k
+
+        result = assign(data)
+        if args.demo:
+            print(json.dumps(result["summary"], indent=2))
+        elif args.output:
+            with open(args.output, "w") as f:
+                json.dump(result, f)
+            print(json.dumps(result["summary"], indent=2))
+        else:
+            print(json.dumps(result))
+    except Exception as e:
+        print(json.dumps({"success": False, "error": str(e), "message": "Failed to assign labourers"}))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,7 @@ from sklearn.pipeline import Pipeline, FeatureUnion
 from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
 from sklearn.base import BaseEstimator, TransformerMixin
 import joblib
+import cpu_budget
 
 # Custom transformer to allow dual output
 class LabourFeatures(BaseEstimator, TransformerMixin):
@@ -41,13 +42,13 @@ preprocessor = ColumnTransformer(transformers=[
 # Regression pipeline
 reg_pipe = Pipeline([
     ("pre", preprocessor),
-    ("reg", RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=-1))
+    ("reg", RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=cpu_budget.n_jobs()))
 ])
 
 # Classification pipeline
 cls_pipe = Pipeline([
     ("pre", preprocessor),
-    ("clf", RandomForestClassifier(n_estimators=200, random_state=42, n_jobs=-1))
+    ("clf", RandomForestClassifier(n_estimators=200, random_state=42, n_jobs=cpu_budget.n_jobs()))
 ])
 
 # Split data
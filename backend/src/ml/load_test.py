@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test of the ML predictors, driven the way the Node backend drives them
+
+Generates the request mix the controllers send and replays it at increasing
+concurrency against two serving modes:
+
+    spawn      one `python <script>` process per request with JSON on stdin,
+               exactly as cropController.js, yieldController.js and
+               recommendLabour do
+    resident   the pre-fork server (prefork_server.py) on a Unix socket, one
+               persistent connection per concurrent client
+
+Traffic types (weights set with --mix):
+
+    crop          predict.py                       POST /api/crop/predict
+    yield         predict_yield.py                 POST /api/yield/predict
+    labour        predict_labour.py                recommendLabour with the 12 advanced inputs
+    labour_smart  smart_labour_recommendation.py   recommendLabour with cropType + area
+
+For each mode and concurrency level the report gives throughput, latency
+percentiles (p50/p95/p99), error rate and peak memory: the largest single
+process RSS, and the total RSS and PSS (shared pages counted once) of all
+serving processes, sampled from /proc. The JSON report lays every metric out
+as a curve over the concurrency levels.
+
+Runs on one Linux box: unless --model-dir already holds trained models,
+synthetic crop, yield and labour models are trained into it first.
+
+Usage:
+    python load_test.py --concurrency 1,2,4,8 --requests 200
+    python load_test.py --modes resident --concurrency 1,4,16,64 --requests 2000 --report load.json
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import cpu_budget
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# request type -> (script the controller spawns, pre-fork server model name)
+TARGETS = {
+    "crop": ("predict.py", "crop"),
+    "yield": ("predict_yield.py", "yield"),
+    "labour": ("predict_labour.py", "labour"),
+    "labour_smart": ("smart_labour_recommendation.py", "labour_smart"),
+}
+DEFAULT_MIX = "crop=4,yield=3,labour=1.5,labour_smart=1.5"
+
+# The crop and yield controllers fail the request on any stderr output
+STDERR_IS_ERROR = ("crop", "yield")
+
+SAMPLE_INTERVAL_S = 0.05
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in TARGETS:
+            raise SystemExit(f"Unknown request type {name!r} in --mix; expected {', '.join(TARGETS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def make_payload(kind, rng):
+    """One request body as the controller builds it (defaults filled the same way)"""
+    if kind == "crop":
+        return {"N": rng.randint(0, 140), "P": rng.randint(5, 145), "K": rng.randint(5, 205),
+                "temperature": round(rng.uniform(10, 40), 1), "humidity": round(rng.uniform(15, 99), 1),
+                "ph": round(rng.uniform(4, 9), 2), "rainfall": round(rng.uniform(20, 300), 1)}
+    if kind == "yield":
+        return {"State": rng.choice(["Punjab", "Haryana", "UP", "MP", "Maharashtra", "Karnataka"]),
+                "Year": rng.randint(2015, 2024), "Season": rng.choice(["Kharif", "Rabi", "Zaid"]),
+                "Crop": rng.choice(["Rice", "Wheat", "Maize", "Cotton", "Sugarcane", "Soybean"]),
+                "Area": round(rng.uniform(1, 500), 1), "Rainfall": round(rng.uniform(100, 1500), 1),
+                "Temperature": 25, "Fertilizer": 150, "Pesticide": 3}
+    if kind == "labour":
+        return [{"Crop": rng.choice(["Rice", "Wheat", "Maize", "Cotton", "Sugarcane"]),
+                 "Season": rng.choice(["Kharif", "Rabi", "Zaid"]),
+                 "Region": rng.choice(["Punjab", "Bihar", "Maharashtra", "Uttar_Pradesh"]),
+                 "Soil_Type": "Loamy", "Irrigation_Type": "Canal", "Mechanization_Level": "Medium",
+                 "Labour_Availability": "High", "Gender_Split": "Mixed",
+                 "Farm_Size_Acre": round(rng.uniform(0.5, 30), 1), "Task": "General",
+                 "Prev_Yield_q_per_acre": 20.0, "Weather_Index": 0.8}]
+    return {"crop_type": rng.choice(["Rice", "Wheat", "Cotton", "Maize", "Vegetables"]),
+            "area": round(rng.uniform(1, 100), 1), "season": rng.choice(["Kharif", "Rabi", "Zaid"])}
+
+
+def make_requests(mix, n, seed):
+    rng = random.Random(seed)
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=n)
+    return [(kind, make_payload(kind, rng)) for kind in kinds]
+
+
+def response_error(kind, response):
+    """Error message if the predictor's response signals a failure, else None"""
+    first = response[0] if isinstance(response, list) and response else response
+    if isinstance(first, dict) and ("error" in first or first.get("success") is False):
+        return str(first.get("error") or first.get("message"))
+    return None
+
+
+def read_memory(pid):
+    """(rss_bytes, pss_bytes) of a process, or None once it has exited"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line and not line.startswith(" "))
+        return (int(fields["Rss"].split()[0]) * 1024, int(fields["Pss"].split()[0]) * 1024)
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def child_pids(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+class MemorySampler:
+    """Background sampler of the total RSS/PSS of a changing set of processes"""
+
+    def __init__(self, pids):
+        self.pids = pids  # callable returning the pids to sample
+        self.peak_rss = 0
+        self.peak_pss = 0
+        self.peak_process_rss = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            samples = [m for m in map(read_memory, self.pids()) if m]
+            if samples:
+                self.peak_rss = max(self.peak_rss, sum(rss for rss, _ in samples))
+                self.peak_pss = max(self.peak_pss, sum(pss for _, pss in samples))
+                self.peak_process_rss = max(self.peak_process_rss, max(rss for rss, _ in samples))
+            self._stop.wait(SAMPLE_INTERVAL_S)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class SpawnClient:
+    """One process per request, like child_process.spawn in the controllers"""
+
+    def __init__(self, model_dir):
+        self.env = dict(os.environ, ML_MODEL_DIR=model_dir)
+        self.live = set()
+        self._lock = threading.Lock()
+
+    def pids(self):
+        with self._lock:
+            return list(self.live)
+
+    def connect(self):
+        return None
+
+    def close(self, conn):
+        pass
+
+    def request(self, conn, kind, payload):
+        proc = subprocess.Popen([sys.executable, os.path.join(ML_DIR, TARGETS[kind][0])],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                env=self.env)
+        with self._lock:
+            self.live.add(proc.pid)
+        try:
+            out, err = proc.communicate(json.dumps(payload).encode())
+        finally:
+            with self._lock:
+                self.live.discard(proc.pid)
+        if proc.returncode != 0:
+            return f"exit status {proc.returncode}: {err.decode(errors='replace').strip()[-200:]}"
+        if err.strip() and kind in STDERR_IS_ERROR:
+            return f"stderr: {err.decode(errors='replace').strip()[-200:]}"
+        return response_error(kind, json.loads(out))
+
+
+class ResidentClient:
+    """Persistent connections to the pre-fork server"""
+
+    def __init__(self, model_dir, workers):
+        self.workdir = tempfile.mkdtemp(prefix="ml-loadtest-")
+        self.socket_path = os.path.join(self.workdir, "ml.sock")
+        self.server = subprocess.Popen(
+            [sys.executable, os.path.join(ML_DIR, "prefork_server.py"),
+             "--socket", self.socket_path, "--workers", str(workers)],
+            env=dict(os.environ, ML_MODEL_DIR=model_dir), stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 120
+        while time.monotonic() < deadline:
+            try:
+                self.close(self.connect())
+                return
+            except OSError:
+                if self.server.poll() is not None:
+                    raise SystemExit("prefork_server.py exited during startup")
+                time.sleep(0.2)
+        raise SystemExit("prefork_server.py did not start listening within 120s")
+
+    def pids(self):
+        return [self.server.pid] + child_pids(self.server.pid)
+
+    def connect(self):
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(self.socket_path)
+        return conn, conn.makefile("rb")
+
+    def close(self, conn):
+        conn[1].close()
+        conn[0].close()
+
+    def request(self, conn, kind, payload):
+        sock, reader = conn
+        sock.sendall((json.dumps({"model": TARGETS[kind][1], "input": payload}) + "\n").encode())
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        return response_error(kind, json.loads(line))
+
+    def shutdown(self):
+        self.server.terminate()
+        self.server.wait(timeout=30)
+
+
+def run_level(client, requests, concurrency):
+    """
+    Closed-loop run: `concurrency` clients each send their next request as
+    soon as the previous one completes, until all requests are done
+    """
+    latencies = [None] * len(requests)
+    errors = [None] * len(requests)
+    next_index = iter(range(len(requests)))
+    index_lock = threading.Lock()
+
+    def client_loop():
+        conn = None
+        try:
+            while True:
+                with index_lock:
+                    i = next(next_index, None)
+                if i is None:
+                    return
+                kind, payload = requests[i]
+                start = time.perf_counter()
+                try:
+                    if conn is None:
+                        conn = client.connect()
+                    errors[i] = client.request(conn, kind, payload)
+                except Exception as e:
+                    errors[i] = f"{type(e).__name__}: {e}"
+                    if conn is not None:
+                        client.close(conn)
+                        conn = None
+                latencies[i] = (time.perf_counter() - start) * 1000
+        finally:
+            if conn is not None:
+                client.close(conn)
+
+    with MemorySampler(client.pids) as sampler:
+        start = time.perf_counter()
+        threads = [threading.Thread(target=client_loop) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+    latency = np.array(latencies)
+    failed = [e for e in errors if e]
+    by_kind = {}
+    for kind in sorted({kind for kind, _ in requests}):
+        mask = np.array([k == kind for k, _ in requests])
+        by_kind[kind] = {"requests": int(mask.sum()),
+                         "p50_ms": round(float(np.percentile(latency[mask], 50)), 2),
+                         "p95_ms": round(float(np.percentile(latency[mask], 95)), 2)}
+    return {
+        "concurrency": concurrency,
+        "requests": len(requests),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(requests) / elapsed, 2),
+        "p50_ms": round(float(np.percentile(latency, 50)), 2),
+        "p95_ms": round(float(np.percentile(latency, 95)), 2),
+        "p99_ms": round(float(np.percentile(latency, 99)), 2),
+        "max_ms": round(float(latency.max()), 2),
+        "error_rate": round(len(failed) / len(requests), 4),
+        "errors": sorted(set(failed))[:5],
+        "peak_total_rss_mb": round(sampler.peak_rss / 2**20, 1),
+        "peak_total_pss_mb": round(sampler.peak_pss / 2**20, 1),
+        "peak_process_rss_mb": round(sampler.peak_process_rss / 2**20, 1),
+        "by_type": by_kind,
+    }
+
+
+def ensure_models(model_dir):
+    """Train synthetic crop, yield and labour models into model_dir if it has none"""
+    wanted = ["crop_model.pkl", "scaler.pkl", "yield_model.pkl", "labour_model.joblib"]
+    if all(os.path.exists(os.path.join(model_dir, f)) for f in wanted):
+        return
+    import train_crop_model
+    import train_labour_model_v2
+    import train_yield_model
+
+    print(f"Training synthetic models into {model_dir}...")
+    os.makedirs(model_dir, exist_ok=True)
+    train_crop_model.train_model(model_dir)
+    train_yield_model.train_model(model_dir)
+    dataset_path = os.path.join(model_dir, "synthetic_labour_dataset.csv")
+    train_labour_model_v2.create_labour_dataset().to_csv(dataset_path, index=False)
+    train_labour_model_v2.train_labour_model(dataset_path,
+                                             model_path=os.path.join(model_dir, "labour_model.joblib"))
+
+
+def curves(levels):
+    """Metric name -> list of values, one per concurrency level"""
+    keys = ["concurrency", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "error_rate",
+            "peak_total_rss_mb", "peak_total_pss_mb", "peak_process_rss_mb"]
+    return {key: [level[key] for level in levels] for key in keys}
+
+
+def print_table(mode, levels):
+    print(f"\n{mode}")
+    print(f"{'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} "
+          f"{'RSS MB':>8} {'PSS MB':>8} {'max proc':>9}")
+    for level in levels:
+        print(f"{level['concurrency']:>5} {level['throughput_rps']:>9.2f} {level['p50_ms']:>9.1f} "
+              f"{level['p95_ms']:>9.1f} {level['p99_ms']:>9.1f} {level['error_rate']:>7.2%} "
+              f"{level['peak_total_rss_mb']:>8.1f} {level['peak_total_pss_mb']:>8.1f} "
+              f"{level['peak_process_rss_mb']:>9.1f}")
+        for error in level["errors"]:
+            print(f"      error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the ML predictors at increasing concurrency")
+    parser.add_argument("--modes", default="spawn,resident", help="Comma-separated: spawn, resident")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Request type weights (default {DEFAULT_MIX})")
+    parser.add_argument("--model-dir", default=os.path.join(tempfile.gettempdir(), "ml-loadtest-models"),
+                        help="Models to serve; synthetic ones are trained here if missing")
+    parser.add_argument("--workers", type=int, help="Pre-fork server workers (default: the CPU budget)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--report", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    if not modes or any(m not in ("spawn", "resident") for m in modes):
+        raise SystemExit(f"--modes must list spawn and/or resident; got {args.modes!r}")
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    budget = cpu_budget.configure()
+    ensure_models(args.model_dir)
+    requests = make_requests(parse_mix(args.mix), args.requests, args.seed)
+
+    report = {"cpu_budget": budget, "requests_per_level": args.requests, "mix": parse_mix(args.mix),
+              "model_dir": args.model_dir, "modes": {}}
+    for mode in modes:
+        client = (SpawnClient(args.model_dir) if mode == "spawn"
+                  else ResidentClient(args.model_dir, args.workers or budget))
+        try:
+            results = []
+            for concurrency in levels:
+                print(f"[{mode}] concurrency {concurrency}...", file=sys.stderr)
+                results.append(run_level(client, requests, concurrency))
+        finally:
+            if mode == "resident":
+                client.shutdown()
+        report["modes"][mode] = {"levels": results, "curves": curves(results)}
+        print_table(mode, results)
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""
+Lazy, memory-budgeted model registry
+
+Predict scripts ask the registry for a model by name (and optionally a
+version) instead of calling joblib.load themselves. Artifacts are loaded on
+first use, their resident size is tracked, and least-recently-used models
+are evicted once the configured memory budget is exceeded.
+
+Versioned variants live next to the default artifacts with the version
+inserted before the extension, e.g. labour_model@punjab-rice.joblib for
+registry.get("labour", "punjab-rice"). Roles a variant does not provide
+(scalers, encoders) fall back to the default files. Versions come from
+request payloads, so they are restricted to VERSION_PATTERN and every
+resolved path must stay inside the model directory.
+
+Environment:
+    ML_MODEL_DIR                directory holding the artifacts (default: this directory)
+    ML_MODEL_MEMORY_BUDGET_MB   resident budget before LRU eviction (default: unlimited)
+"""
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+
+ML_DIR = os.environ.get("ML_MODEL_DIR", os.path.dirname(os.path.abspath(__file__)))
+
+# Letters, digits, dots, underscores and hyphens; ".." is rejected separately
+VERSION_PATTERN = re.compile(r"^[A-Za-z0-9._-]+$")
+
+# Size of one node in sklearn's tree structure (sklearn.tree._tree.NODE_DTYPE)
+TREE_NODE_BYTES = 64
+
+
+def estimate_nbytes(obj, _seen=None):
+    """
+    Estimate the resident size of a loaded artifact by walking its object graph
+
+    numpy arrays count their buffers and sklearn trees their node and value
+    arrays, which is where nearly all of a forest's memory lives.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if hasattr(obj, "node_count") and hasattr(obj, "value"):
+        return obj.node_count * TREE_NODE_BYTES + obj.value.nbytes
+    if hasattr(obj, "memory_usage") and hasattr(obj, "columns"):
+        return int(obj.memory_usage(deep=True).sum())
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_nbytes(k, _seen) + estimate_nbytes(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_nbytes(item, _seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += estimate_nbytes(vars(obj), _seen)
+    return size
+
+
+def release_n_jobs(obj, _seen=None):
+    """
+    Reset the n_jobs each loaded estimator was pickled with to None
+
+    Models trained with n_jobs=-1 would otherwise predict on every host core.
+    None predicts on the calling thread: inference parallelism comes from
+    processes (one stdin script per request, or the pre-fork workers), each
+    already within its share of the CPU budget.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen or isinstance(obj, (np.ndarray, str, bytes, int, float)):
+        return
+    _seen.add(id(obj))
+
+    if isinstance(obj, dict):
+        for value in obj.values():
+            release_n_jobs(value, _seen)
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            release_n_jobs(item, _seen)
+    elif hasattr(obj, "__dict__"):
+        if "n_jobs" in vars(obj) and hasattr(obj, "get_params"):
+            obj.n_jobs = None
+        release_n_jobs(vars(obj), _seen)
+
+
+class ModelSpec:
+    def __init__(self, name, files, required=()):
+        """
+        Args:
+            name: Registry name (crop, yield, labour)
+            files: dict of role -> default artifact filename
+            required: roles that must exist for the model to be usable
+        """
+        self.name = name
+        self.files = files
+        self.required = tuple(required)
+
+
+def validate_version(version):
+    """Raise ValueError unless version is a plain artifact-name suffix"""
+    if not isinstance(version, str) or not VERSION_PATTERN.fullmatch(version) or ".." in version:
+        raise ValueError(f"Invalid model version {version!r}: use letters, digits, '.', '_' or '-'")
+    return version
+
+
+def versioned_filename(filename, version):
+    if not version:
+        return filename
+    validate_version(version)
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}@{version}{ext}"
+
+
+class ModelRegistry:
+    def __init__(self, model_dir=ML_DIR, memory_budget_mb=None):
+        self.model_dir = model_dir
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024) if memory_budget_mb else None
+        self._specs = {}
+        self._loaded = OrderedDict()  # (name, version) -> {"artifacts", "nbytes"}
+        self._lock = threading.RLock()
+        self.counters = {"hits": 0, "loads": 0, "misses": 0, "evictions": 0}
+
+    def register(self, name, files, required=()):
+        self._specs[name] = ModelSpec(name, files, required)
+
+    def resolve(self, name, version=None):
+        """
+        Map each role of a model to the artifact path that would be loaded
+
+        Returns:
+            dict of role -> path (None for missing optional roles), or None if
+            a required artifact is missing
+        """
+        spec = self._specs[name]
+        if version:
+            validate_version(version)
+        paths = {}
+        for role, filename in spec.files.items():
+            candidates = [versioned_filename(filename, version), filename] if version else [filename]
+            paths[role] = next(
+                (self._artifact_path(f) for f in candidates
+                 if os.path.exists(self._artifact_path(f))),
+                None,
+            )
+        if version and not any(
+            p and os.path.basename(p) == versioned_filename(spec.files[r], version)
+            for r, p in paths.items()
+        ):
+            # Unknown version: nothing variant-specific on disk
+            return None
+        if any(paths[role] is None for role in spec.required):
+            return None
+        return paths
+
+    def _artifact_path(self, filename):
+        """Path of an artifact file, refusing anything that resolves outside model_dir"""
+        path = os.path.join(self.model_dir, filename)
+        root = os.path.abspath(self.model_dir)
+        if os.path.commonpath([root, os.path.abspath(path)]) != root:
+            raise ValueError(f"Artifact {filename!r} resolves outside the model directory")
+        return path
+
+    def artifact_tag(self, name, version=None):
+        """
+        Short identifier of the artifact a request is served by: the version
+        plus the primary file's modification time, e.g. "default@1760860800"
+        """
+        paths = self.resolve(name, version)
+        primary = paths and (paths.get("model") or next((p for p in paths.values() if p), None))
+        if not primary:
+            return f"{version or 'default'}@untrained"
+        return f"{version or 'default'}@{int(os.path.getmtime(primary))}"
+
+    def available(self, name, version=None):
+        return self.resolve(name, version) is not None
+
+    def get(self, name, version=None):
+        """
+        Return the loaded artifacts for a model, loading them on first use
+
+        Returns:
+            dict of role -> loaded object (None for missing optional roles),
+            or None if the model has not been trained
+        """
+        key = (name, version)
+        with self._lock:
+            entry = self._loaded.get(key)
+            if entry is not None:
+                self._loaded.move_to_end(key)
+                self.counters["hits"] += 1
+                return entry["artifacts"]
+
+            paths = self.resolve(name, version)
+            if paths is None:
+                self.counters["misses"] += 1
+                return None
+            if not any(paths.values()):
+                # Nothing trained yet; don't pin the empty result in memory
+                self.counters["misses"] += 1
+                return dict(paths)
+
+            artifacts = {role: joblib.load(path) if path else None for role, path in paths.items()}
+            release_n_jobs(artifacts)
+            nbytes = estimate_nbytes(artifacts)
+            self._loaded[key] = {"artifacts": artifacts, "nbytes": nbytes}
+            self.counters["loads"] += 1
+            self._enforce_budget(keep=key)
+            return artifacts
+
+    def _enforce_budget(self, keep):
+        if self.memory_budget is None:
+            return
+        while self.memory_usage() > self.memory_budget and len(self._loaded) > 1:
+            oldest = next(iter(self._loaded))
+            if oldest == keep:
+                break
+            self.evict(*oldest)
+
+    def evict(self, name, version=None):
+        with self._lock:
+            if self._loaded.pop((name, version), None) is not None:
+                self.counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._loaded.clear()
+
+    def memory_usage(self):
+        """Estimated bytes held by all resident models"""
+        return sum(entry["nbytes"] for entry in self._loaded.values())
+
+    def stats(self):
+        """Counters plus the resident models in LRU order (oldest first)"""
+        with self._lock:
+            return {
+                **self.counters,
+                "resident_bytes": self.memory_usage(),
+                "budget_bytes": self.memory_budget,
+                "resident": [
+                    {"name": name, "version": version, "bytes": entry["nbytes"]}
+                    for (name, version), entry in self._loaded.items()
+                ],
+            }
+
+
+def default_registry(model_dir=ML_DIR):
+    """Registry with the crop, yield and labour models the predict scripts use"""
+    budget = os.environ.get("ML_MODEL_MEMORY_BUDGET_MB")
+    reg = ModelRegistry(model_dir, memory_budget_mb=float(budget) if budget else None)
+    reg.register("crop", {"model": "crop_model.pkl", "scaler": "scaler.pkl",
+                          "explainer": "crop_explainer.pkl"},
+                 required=("model", "scaler"))
+    reg.register("yield", {"model": "yield_model.pkl", "scaler": "yield_scaler.pkl",
+                           "encoders": "yield_encoders.pkl", "calibration": "yield_calibration.pkl"})
+    reg.register("labour", {"model": "labour_model.joblib"}, required=("model",))
+    return reg
+
+
+registry = default_registry()
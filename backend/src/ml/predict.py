@@ -1,67 +1,122 @@
 import sys
 import json
-import joblib
+import time
 import numpy as np
-import os
 import warnings
+import cpu_budget
+from model_registry import registry
+from prediction_log import log_prediction
 
 # Suppress sklearn warnings
 warnings.filterwarnings("ignore")
 
-MODEL_PATH = os.path.join(os.path.dirname(__file__), "crop_model.pkl")
-SCALER_PATH = os.path.join(os.path.dirname(__file__), "scaler.pkl")
-
-# Read input JSON from Node.js
-input_str = sys.stdin.read()
-data = json.loads(input_str)
-
-features = np.array([[
-    data["N"],
-    data["P"],
-    data["K"],
-    data["temperature"],
-    data["humidity"],
-    data["ph"],
-    data["rainfall"]
-]])
-
-try:
-    # Load model and scaler
-    if os.path.exists(MODEL_PATH) and os.path.exists(SCALER_PATH):
-        model = joblib.load(MODEL_PATH)
-        scaler = joblib.load(SCALER_PATH)
-        
-        # Scale the features (important for ML model)
-        features_scaled = scaler.transform(features)
-        
-        # Get prediction
-        prediction = model.predict(features_scaled)[0]
-        
-        # Get prediction probabilities for confidence
-        probabilities = model.predict_proba(features_scaled)[0]
-        classes = model.classes_
-        
-        # Find confidence score
-        max_prob_index = np.argmax(probabilities)
-        confidence = probabilities[max_prob_index]
-        
-        print(json.dumps({
-            "recommended_crop": prediction,
-            "confidence": float(confidence),
+FEATURE_NAMES = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
+
+MODEL_NOT_FOUND = {
+    "error": "ML model not found. Please train the model first.",
+    "message": "Run: python src/ml/train_crop_model.py"
+}
+
+EXPLAINER_NOT_FOUND = {
+    "available": False,
+    "message": "No explainer exported for this model; retrain it to enable explanations"
+}
+
+
+def load_artifacts(version=None):
+    """Crop model and scaler from the registry, or None if they have not been trained"""
+    return registry.get("crop", version)
+
+
+def build_features(rows):
+    """Stack input dicts into the (n, 7) feature matrix the model was trained on"""
+    return np.array([[row[name] for name in FEATURE_NAMES] for row in rows], dtype=float)
+
+
+def explanations_for(model, features, outputs, explainer):
+    """Per-row explanations blocks, or an unavailable notice per row"""
+    if explainer is None:
+        return [EXPLAINER_NOT_FOUND] * len(outputs)
+    try:
+        return explainer.explain(model, features, outputs)
+    except ValueError as e:
+        return [{"available": False, "message": str(e)}] * len(outputs)
+
+
+def predict_crop_batch(rows, artifacts, explain=False):
+    """
+    Recommend a crop for each input row in one vectorized pass
+
+    Args:
+        rows: list of dicts with N, P, K, temperature, humidity, ph, rainfall
+        artifacts: dict from load_artifacts()
+        explain: add an "explanations" block with each feature's contribution
+                 to the recommended crop's probability (see forest_explain.py)
+
+    Returns:
+        list of result dicts in the same format predict.py prints
+    """
+    model = artifacts["model"]
+
+    # Scale the features (important for ML model)
+    features_scaled = artifacts["scaler"].transform(build_features(rows))
+
+    # The forest's prediction is the argmax of its class probabilities
+    probabilities = model.predict_proba(features_scaled)
+    classes = model.classes_
+
+    results = []
+    for row_probabilities in probabilities:
+        max_prob_index = np.argmax(row_probabilities)
+        results.append({
+            "recommended_crop": classes[max_prob_index],
+            "confidence": float(row_probabilities[max_prob_index]),
             "model_used": "Random_Forest_ML_Model",
             "all_predictions": {
-                crop: float(prob) for crop, prob in zip(classes, probabilities)
+                crop: float(prob) for crop, prob in zip(classes, row_probabilities)
             }
-        }))
-    else:
-        # Model not found error
+        })
+
+    if explain:
+        blocks = explanations_for(model, features_scaled, [r["recommended_crop"] for r in results],
+                                  artifacts.get("explainer"))
+        for result, block in zip(results, blocks):
+            result["explanations"] = block
+    return results
+
+
+def predict_crop(data, artifacts=None):
+    """Recommend a crop for a single input dict ("explain": true adds explanations)"""
+    if artifacts is None:
+        artifacts = load_artifacts(data.get("model_version"))
+    if artifacts is None:
+        return dict(MODEL_NOT_FOUND)
+    return predict_crop_batch([data], artifacts, explain=bool(data.get("explain")))[0]
+
+
+def main():
+    # No budget log here: the Node controllers treat stderr output as a failure
+    cpu_budget.configure(verbose=False)
+    # Read input JSON from Node.js
+    input_str = sys.stdin.read()
+    data = json.loads(input_str)
+
+    try:
+        start = time.perf_counter()
+        result = predict_crop(data)
+        latency_ms = (time.perf_counter() - start) * 1000
+        print(json.dumps(result))
+    except Exception as e:
         print(json.dumps({
-            "error": "ML model not found. Please train the model first.",
-            "message": "Run: python src/ml/train_crop_model.py"
+            "error": f"Model prediction failed: {str(e)}",
+            "message": "Check if model is properly trained"
         }))
-        
-except Exception as e:
-    print(json.dumps({
-        "error": f"Model prediction failed: {str(e)}",
-        "message": "Check if model is properly trained"
-    }))
+        return
+
+    # After the response, outside its try: logging can never change it
+    log_prediction("crop", data, result, latency_ms,
+                   lambda: registry.artifact_tag("crop", data.get("model_version")))
+
+
+if __name__ == "__main__":
+    main()
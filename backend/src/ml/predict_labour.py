@@ -4,19 +4,21 @@ Predict Labour Requirements using trained ML model
 """
 import sys
 import json
+import time
 import pandas as pd
-import joblib
-from pathlib import Path
+import cpu_budget
+from model_registry import registry
+from prediction_log import log_prediction
 
 def predict_labour(input_data):
     """
     Predict labour requirements using trained model
     """
     try:
-        # Load the trained model
-        model_path = Path(__file__).parent / "labour_model.joblib"
+        # Load the trained model (lazily, via the model registry)
+        artifacts = registry.get("labour")
         
-        if not model_path.exists():
+        if artifacts is None:
             # Fallback to heuristic calculation
             farm_size = input_data[0].get('Farm_Size_Acre', 30)
             labour_per_acre = 3  # Default estimate
@@ -30,14 +32,14 @@ def predict_labour(input_data):
                 'message': 'ML model not found, using heuristic calculation'
             }]
         
-        # Load model
-        model = joblib.load(model_path)
+        model = artifacts["model"]
         
         # Convert input to DataFrame
         df = pd.DataFrame(input_data)
         
-        # Make predictions
-        predictions = model.predict(df)
+        # Make predictions ("explain": true on any row adds explanations)
+        explain = any(row.get('explain') for row in input_data)
+        predictions = model.predict(df, explain=explain)
         
         return predictions
         
@@ -56,17 +58,19 @@ def main():
     """
     Main function to handle stdin input
     """
+    cpu_budget.configure(verbose=False)
     try:
         # Read input from stdin
         input_json = sys.stdin.read()
         input_data = json.loads(input_json)
         
         # Make prediction
+        start = time.perf_counter()
         predictions = predict_labour(input_data)
+        latency_ms = (time.perf_counter() - start) * 1000
         
         # Output result
         print(json.dumps(predictions))
-        sys.exit(0)
         
     except Exception as e:
         error_output = {
@@ -75,6 +79,11 @@ def main():
         }
         print(json.dumps([error_output]), file=sys.stderr)
         sys.exit(1)
+    
+    # After the response, outside its try: logging can never change it
+    log_prediction("labour", input_data, predictions, latency_ms,
+                   lambda: registry.artifact_tag("labour"))
+    sys.exit(0)
 
 if __name__ == '__main__':
     main()
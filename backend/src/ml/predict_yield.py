@@ -1,93 +1,336 @@
 import sys
 import json
-import joblib
+import math
+import time
 import numpy as np
-import os
 import warnings
+import cpu_budget
+import forest_intervals
+from model_registry import registry
+from prediction_log import log_prediction
 
 # Suppress sklearn warnings
 warnings.filterwarnings("ignore")
 
-MODEL_PATH = os.path.join(os.path.dirname(__file__), "yield_model.pkl")
-SCALER_PATH = os.path.join(os.path.dirname(__file__), "yield_scaler.pkl")
-ENCODERS_PATH = os.path.join(os.path.dirname(__file__), "yield_encoders.pkl")
-
-# Read input JSON from Node.js
-input_str = sys.stdin.read()
-data = json.loads(input_str)
-
-# Load encoders if available
-if os.path.exists(ENCODERS_PATH):
-    encoders = joblib.load(ENCODERS_PATH)
-    state_encoded = encoders["State"].transform([data["State"]])[0]
-    season_encoded = encoders["Season"].transform([data["Season"]])[0]
-    crop_encoded = encoders["Crop"].transform([data["Crop"]])[0]
-else:
-    # Fallback encoding
-    state_map = {"Punjab": 0, "Haryana": 1, "UP": 2, "MP": 3, "Maharashtra": 4, 
-                 "Karnataka": 5, "Tamil Nadu": 6, "AP": 7, "Gujarat": 8, "Rajasthan": 9}
-    season_map = {"Kharif": 0, "Rabi": 1, "Zaid": 2}
-    crop_map = {"Rice": 0, "Wheat": 1, "Maize": 2, "Cotton": 3, "Sugarcane": 4, "Soybean": 5}
-    
-    state_encoded = state_map.get(data["State"], 0)
-    season_encoded = season_map.get(data["Season"], 0)
-    crop_encoded = crop_map.get(data["Crop"], 0)
-
-# Prepare features with all 9 parameters
-features = np.array([[
-    state_encoded,
-    data["Year"],
-    season_encoded,
-    crop_encoded,
-    data["Area"],
-    data["Rainfall"],
-    data.get("Temperature", 25),  # Default if not provided
-    data.get("Fertilizer", 150),  # Default if not provided
-    data.get("Pesticide", 3)      # Default if not provided
-]])
-
-try:
-    # Load model and scaler if available
-    if os.path.exists(MODEL_PATH):
-        model = joblib.load(MODEL_PATH)
-        
-        # Use scaler if available
-        if os.path.exists(SCALER_PATH):
-            scaler = joblib.load(SCALER_PATH)
-            features_scaled = scaler.transform(features)
-            prediction = model.predict(features_scaled)[0]
-        else:
-            prediction = model.predict(features)[0]
-        
-        print(json.dumps({
-            "predicted_production": round(float(prediction), 2),
-            "yield_per_hectare": round(float(prediction) / data["Area"], 2),
-            "model_used": "Random_Forest_Regressor",
-            "unit": "tons",
-            "confidence": "High"
-        }))
+# Fallback encoding when the trained encoders are not available
+FALLBACK_MAPS = {
+    "State": {"Punjab": 0, "Haryana": 1, "UP": 2, "MP": 3, "Maharashtra": 4,
+              "Karnataka": 5, "Tamil Nadu": 6, "AP": 7, "Gujarat": 8, "Rajasthan": 9},
+    "Season": {"Kharif": 0, "Rabi": 1, "Zaid": 2},
+    "Crop": {"Rice": 0, "Wheat": 1, "Maize": 2, "Cotton": 3, "Sugarcane": 4, "Soybean": 5},
+}
+
+# Rule-based yield (tons/hectare) used when the ML model is missing
+CROP_FACTORS = {"Rice": 3.5, "Wheat": 3.2, "Soybean": 1.5, "Maize": 4.0, "Cotton": 2.0, "Sugarcane": 70.0}
+
+# Inputs every request must provide (the yield controller checks the same list)
+REQUIRED = ("State", "Year", "Season", "Crop", "Area", "Rainfall")
+
+# Defaults for the optional inputs
+DEFAULTS = {"Temperature": 25, "Fertilizer": 150, "Pesticide": 3}
+
+# Column order of the feature matrix the model was trained on
+FEATURE_NAMES = ["State", "Year", "Season", "Crop", "Area", "Rainfall", "Temperature", "Fertilizer", "Pesticide"]
+
+# Numeric inputs a what-if sweep may vary, and a cap on the grid it may build
+SWEEPABLE = ("Year", "Area", "Rainfall", "Temperature", "Fertilizer", "Pesticide")
+MAX_SWEEP_POINTS = 250_000
+
+
+def load_artifacts(version=None):
+    """Whichever of the yield model, scaler and encoders have been trained"""
+    artifacts = registry.get("yield", version)
+    if artifacts is None:
+        return {"model": None, "scaler": None, "encoders": None, "calibration": None}
+    return artifacts
+
+
+def predict_with_intervals(model, features, calibration=None):
+    """
+    Production and its prediction interval from one pass over the trees
+
+    Returns:
+        (production, bounds) - bounds is the forest_intervals.prediction_intervals
+        dict, or None for a model without per-tree outputs
+    """
+    if not hasattr(model, "estimators_"):
+        return model.predict(features), None
+    mean, std = forest_intervals.forest_mean_std(model, features)
+    bounds = forest_intervals.prediction_intervals(mean, std, calibration)
+    # Production cannot be negative, however wide the interval
+    bounds["lower"] = np.maximum(bounds["lower"], 0.0)
+    return mean, bounds
+
+
+def interval_fields(bounds, i):
+    """Per-row interval fields of a prediction result"""
+    if bounds is None:
+        return {"confidence": "High"}
+    return {
+        "confidence": str(bounds["confidence"][i]),
+        "uncertainty": round(float(bounds["uncertainty"][i]), 4),
+        "prediction_interval": {
+            "lower": round(float(bounds["lower"][i]), 2),
+            "upper": round(float(bounds["upper"][i]), 2),
+            "coverage": bounds["coverage"],
+            "calibrated": bounds["calibrated"],
+        },
+    }
+
+
+def validate_rows(rows, provided=()):
+    """
+    Reject rows missing a required input or with a non-positive Area
+
+    Args:
+        rows: input dicts
+        provided: inputs supplied some other way (a sweep's axes)
+
+    Raises:
+        ValueError naming the first offending row and fields
+    """
+    required = [name for name in REQUIRED if name not in provided]
+    for i, row in enumerate(rows):
+        missing = [name for name in required if row.get(name) is None]
+        if missing:
+            where = f"row {i}: " if len(rows) > 1 else ""
+            raise ValueError(f"{where}missing required field(s): {', '.join(missing)}")
+        if "Area" not in provided and not float(row["Area"]) > 0:
+            where = f"row {i}: " if len(rows) > 1 else ""
+            raise ValueError(f"{where}Area must be greater than 0, got {row['Area']}")
+
+
+def encode_column(values, column, encoders):
+    """Encode a categorical column with the trained LabelEncoder or the fallback map"""
+    if encoders is not None:
+        return encoders[column].transform(values)
+    mapping = FALLBACK_MAPS[column]
+    return np.array([mapping.get(value, 0) for value in values])
+
+
+def build_features(rows, encoders):
+    """Build the (n, 9) feature matrix, encoding each categorical column once"""
+    def column(name):
+        return np.array([row.get(name, DEFAULTS.get(name)) for row in rows], dtype=float)
+
+    return np.column_stack([
+        encode_column([row["State"] for row in rows], "State", encoders),
+        column("Year"),
+        encode_column([row["Season"] for row in rows], "Season", encoders),
+        encode_column([row["Crop"] for row in rows], "Crop", encoders),
+        column("Area"),
+        column("Rainfall"),
+        column("Temperature"),
+        column("Fertilizer"),
+        column("Pesticide"),
+    ]).astype(float)
+
+
+def rule_based_prediction(data):
+    """Fallback rule-based calculation"""
+    crop_factor = CROP_FACTORS.get(data.get("Crop", "Rice"), 2.0)
+
+    # Calculate production
+    production = data["Area"] * crop_factor
+
+    return {
+        "predicted_production": round(production, 2),
+        "yield_per_hectare": round(crop_factor, 2),
+        "model_used": "Rule_Based_Fallback",
+        "unit": "tons",
+        "note": "ML model not available, using rule-based prediction"
+    }
+
+
+def predict_yield_batch(rows, artifacts):
+    """
+    Predict production for each input row in one vectorized pass
+
+    Args:
+        rows: list of dicts with State, Year, Season, Crop, Area, Rainfall and
+              optionally Temperature, Fertilizer, Pesticide
+        artifacts: dict from load_artifacts()
+
+    Returns:
+        list of result dicts in the same format predict_yield.py prints
+
+    Raises:
+        ValueError for rows missing a required input (see validate_rows)
+    """
+    validate_rows(rows)
+    model = artifacts["model"]
+    if model is None:
+        return [rule_based_prediction(row) for row in rows]
+
+    features = build_features(rows, artifacts["encoders"])
+
+    # Use scaler if available
+    if artifacts["scaler"] is not None:
+        features = artifacts["scaler"].transform(features)
+    predictions, bounds = predict_with_intervals(model, features, artifacts.get("calibration"))
+
+    return [{
+        "predicted_production": round(float(prediction), 2),
+        "yield_per_hectare": round(float(prediction) / row["Area"], 2),
+        "model_used": "Random_Forest_Regressor",
+        "unit": "tons",
+        **interval_fields(bounds, i)
+    } for i, (row, prediction) in enumerate(zip(rows, predictions))]
+
+
+def predict_yield(data, artifacts=None):
+    """Predict production for a single input dict"""
+    if artifacts is None:
+        artifacts = load_artifacts(data.get("model_version"))
+    return predict_yield_batch([data], artifacts)[0]
+
+
+def sweep_axis_length(spec):
+    """Number of values on an axis, found without building it"""
+    if isinstance(spec, dict):
+        return int(spec.get("num", 10))
+    if isinstance(spec, (list, tuple)):
+        return len(spec)
+    raise ValueError('sweep axes must be a list of values or {"start", "stop", "num"}')
+
+
+def sweep_axis(spec):
+    """An axis is either explicit values or {"start", "stop", "num"} for an even range"""
+    if isinstance(spec, dict):
+        return np.linspace(float(spec["start"]), float(spec["stop"]), int(spec.get("num", 10)))
+    return np.asarray(spec, dtype=float)
+
+
+def predict_yield_sweep(data, artifacts=None):
+    """
+    What-if sensitivity sweep over one or more numeric inputs
+
+    The categorical columns of the base scenario are encoded once, the full
+    scenario grid is built in one vectorized step and predicted in a single
+    batched forest call.
+
+    Args:
+        data: base scenario (same fields as a single prediction) plus
+              "sweep": {input name: [values] or {"start", "stop", "num"}}
+        artifacts: dict from load_artifacts()
+
+    Returns:
+        dict with the axes, the production and yield response surfaces
+        (nested lists indexed in axis order), the interval and uncertainty
+        surfaces when the model has them, and the best/worst scenarios
+    """
+    if artifacts is None:
+        artifacts = load_artifacts(data.get("model_version"))
+
+    sweep = data["sweep"]
+    unknown = [name for name in sweep if name not in SWEEPABLE]
+    if not sweep or unknown:
+        raise ValueError(f"sweep must vary one or more of {', '.join(SWEEPABLE)}; got {unknown or 'nothing'}")
+
+    names = list(sweep)
+    validate_rows([data], provided=names)
+    # Sized on Python ints before any axis is allocated
+    shape = tuple(sweep_axis_length(sweep[name]) for name in names)
+    n_points = math.prod(shape) if min(shape) > 0 else 0
+    if n_points == 0 or n_points > MAX_SWEEP_POINTS:
+        raise ValueError(f"sweep grid has {n_points} points; must be between 1 and {MAX_SWEEP_POINTS}")
+    axes = [sweep_axis(sweep[name]) for name in names]
+    for name, axis in zip(names, axes):
+        if not np.all(np.isfinite(axis)):
+            raise ValueError(f"sweep values for {name} must be finite numbers")
+    if "Area" in sweep and not np.all(axes[names.index("Area")] > 0):
+        # Yield per hectare divides by it; zero would put NaN/Infinity in the JSON
+        raise ValueError("sweep values for Area must be greater than 0")
+
+    # Encode the base scenario once, then overwrite the swept columns
+    base = build_features([data], artifacts["encoders"])
+    features = np.repeat(base, n_points, axis=0)
+    for name, grid in zip(names, np.meshgrid(*axes, indexing="ij")):
+        features[:, FEATURE_NAMES.index(name)] = grid.ravel()
+    area = features[:, FEATURE_NAMES.index("Area")].copy()
+
+    model = artifacts["model"]
+    bounds = None
+    if model is not None:
+        if artifacts["scaler"] is not None:
+            features = artifacts["scaler"].transform(features)
+        production, bounds = predict_with_intervals(model, features, artifacts.get("calibration"))
+        model_used = "Random_Forest_Regressor"
     else:
-        # Fallback rule-based calculation
-        crop_factors = {"Rice": 3.5, "Wheat": 3.2, "Soybean": 1.5, "Maize": 4.0, "Cotton": 2.0, "Sugarcane": 70.0}
-        crop_name = data.get("Crop", "Rice")
-        crop_factor = crop_factors.get(crop_name, 2.0)
-        
-        # Calculate production
-        production = data["Area"] * crop_factor
-        
+        production = area * CROP_FACTORS.get(data.get("Crop", "Rice"), 2.0)
+        model_used = "Rule_Based_Fallback"
+
+    production = production.reshape(shape)
+    yield_per_hectare = production / area.reshape(shape)
+
+    def scenario(flat_index):
+        index = np.unravel_index(flat_index, shape)
+        result = {
+            "inputs": {name: float(axis[i]) for name, axis, i in zip(names, axes, index)},
+            "predicted_production": round(float(production[index]), 2),
+            "yield_per_hectare": round(float(yield_per_hectare[index]), 2)
+        }
+        if bounds is not None:
+            result.update(interval_fields(bounds, flat_index))
+        return result
+
+    result = {
+        "axes": {name: np.round(axis, 4).tolist() for name, axis in zip(names, axes)},
+        "shape": list(shape),
+        "points": n_points,
+        "predicted_production": np.round(production, 2).tolist(),
+        "yield_per_hectare": np.round(yield_per_hectare, 2).tolist(),
+        "best": scenario(int(np.argmax(production))),
+        "worst": scenario(int(np.argmin(production))),
+        "model_used": model_used,
+        "unit": "tons"
+    }
+    if bounds is not None:
+        result.update({
+            "production_lower": np.round(bounds["lower"].reshape(shape), 2).tolist(),
+            "production_upper": np.round(bounds["upper"].reshape(shape), 2).tolist(),
+            "uncertainty": np.round(bounds["uncertainty"].reshape(shape), 4).tolist(),
+            "interval_coverage": bounds["coverage"],
+            "interval_calibrated": bounds["calibrated"],
+        })
+    return result
+
+
+def sweep_log_outputs(result):
+    """
+    What the prediction log keeps of a sweep: its size and best/worst
+    scenarios, not the response surfaces (up to MAX_SWEEP_POINTS each)
+    """
+    return {key: result[key] for key in ("axes", "shape", "points", "best", "worst", "model_used")}
+
+
+def main():
+    cpu_budget.configure(verbose=False)
+    # Read input JSON from Node.js
+    input_str = sys.stdin.read()
+    data = json.loads(input_str)
+
+    sweep = "sweep" in data
+    try:
+        start = time.perf_counter()
+        result = predict_yield_sweep(data) if sweep else predict_yield(data)
+        latency_ms = (time.perf_counter() - start) * 1000
+        print(json.dumps(result))
+    except Exception as e:
         print(json.dumps({
-            "predicted_production": round(production, 2),
-            "yield_per_hectare": round(crop_factor, 2),
-            "model_used": "Rule_Based_Fallback",
-            "unit": "tons",
-            "note": "ML model not available, using rule-based prediction"
+            "error": f"Prediction failed: {str(e)}",
+            "predicted_production": 0,
+            "yield_per_hectare": 0,
+            "model_used": "Error_Fallback"
         }))
-        
-except Exception as e:
-    print(json.dumps({
-        "error": f"Prediction failed: {str(e)}",
-        "predicted_production": 0,
-        "yield_per_hectare": 0,
-        "model_used": "Error_Fallback"
-    }))
+        return
+
+    # After the response, outside its try: logging can never change it. Sweeps
+    # are logged under their own name so replay and drift only see single predictions
+    log_prediction("yield_sweep" if sweep else "yield", data,
+                   sweep_log_outputs(result) if sweep else result, latency_ms,
+                   lambda: registry.artifact_tag("yield", data.get("model_version")))
+
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+"""
+Append-only prediction log in Parquet
+
+Records the input features, outputs, model version and latency of every
+prediction. Finished files are named *.parquet, a file being written is
+*.parquet.open, so readers never see a file without its footer.
+
+How rows reach Parquet depends on the process:
+
+    resident (prefork_server.py calls use_resident_log()): the request path
+    only appends a tuple to an in-memory buffer; a background thread flushes
+    the buffer as Parquet row groups and rotates to a new file by size or age.
+
+    one-shot (the stdin scripts the Node controllers spawn per request): each
+    prediction is appended as one JSON line to LOG_DIR/spool.ndjson under a
+    flock, and that append is all the request does. A separate compactor
+    renames the spool aside and writes it as a single Parquet file once it
+    passes the spool size or rotate age, run from cron or as a sidecar:
+
+        python prediction_log.py                # once, if due (cron)
+        python prediction_log.py --every 60     # keep checking (sidecar)
+        python prediction_log.py --force        # compact now (shutdown, replay)
+
+Enabled by setting PREDICTION_LOG_DIR. Requires pyarrow (imported on the
+first flush or compaction); without it, or when the log directory cannot be
+created, logging is disabled for the rest of the process and predictions are
+unaffected. Problems are reported on the "prediction_log" logger, which has
+no handler of its own: the Node controllers treat any stderr output from a
+script as a failed request, so nothing here prints to stderr.
+
+Environment:
+    PREDICTION_LOG_DIR              directory for log files (unset: disabled)
+    PREDICTION_LOG_FLUSH_SECONDS    background flush interval (default 1.0)
+    PREDICTION_LOG_ROTATE_MB        rotate files after this size (default 64)
+    PREDICTION_LOG_ROTATE_SECONDS   rotate files, or compact the spool, after this age (default 3600)
+    PREDICTION_LOG_SPOOL_MB         compact the one-shot spool after this size (default 4)
+"""
+import argparse
+import atexit
+import glob
+import importlib.util
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: spool appends are not locked
+    fcntl = None
+
+# Checked without importing it; pyarrow itself is loaded on the first flush
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+COLUMNS = ["ts", "model", "model_version", "latency_ms", "features", "outputs", "pid"]
+
+SPOOL_FILE = "spool.ndjson"
+# Held (non-blocking) by the compactor, so two compactors never overlap
+COMPACT_LOCK_FILE = ".compact.lock"
+
+logger = logging.getLogger("prediction_log")
+logger.addHandler(logging.NullHandler())
+
+_schema = None
+
+
+def _pyarrow():
+    """Import pyarrow and build the log schema on first use"""
+    global _schema
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    if _schema is None:
+        _schema = pa.schema([
+            ("ts", pa.timestamp("ms")),
+            ("model", pa.string()),
+            ("model_version", pa.string()),
+            ("latency_ms", pa.float64()),
+            ("features", pa.string()),   # JSON; expanded by read_log(expand=True)
+            ("outputs", pa.string()),    # JSON
+            ("pid", pa.int32()),
+        ])
+    return pa, pq, _schema
+
+
+def _table(rows):
+    """Arrow table from (ts, model, model_version, latency_ms, features, outputs, pid) tuples"""
+    pa, _, schema = _pyarrow()
+    ts, model, version, latency, features, outputs, pid = zip(*rows)
+    return pa.table({
+        "ts": pa.array([int(t * 1000) for t in ts], pa.timestamp("ms")),
+        "model": pa.array(model, pa.string()),
+        "model_version": pa.array(version, pa.string()),
+        "latency_ms": pa.array(latency, pa.float64()),
+        "features": pa.array(features, pa.string()),
+        "outputs": pa.array(outputs, pa.string()),
+        "pid": pa.array(pid, pa.int32()),
+    }, schema=schema)
+
+
+def _log_filename(log_dir):
+    stamp = time.strftime("%Y%m%dT%H%M%S")
+    return os.path.join(log_dir, f"predictions-{stamp}-{os.getpid()}-{time.time_ns() % 10**6}.parquet")
+
+
+def _row(model, features, outputs, latency_ms, model_version):
+    return (time.time(), model, model_version, float(latency_ms),
+            json.dumps(features, default=str), json.dumps(outputs, default=str), os.getpid())
+
+
+class PredictionLog:
+    def __init__(self, log_dir, flush_interval=1.0, max_buffer_rows=1000,
+                 rotate_bytes=64 * 1024 * 1024, rotate_seconds=3600):
+        self.log_dir = log_dir
+        self.flush_interval = flush_interval
+        self.max_buffer_rows = max_buffer_rows
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+
+        self._writer = None
+        self._path = None
+        self._opened_at = 0.0
+
+        os.makedirs(log_dir, exist_ok=True)
+        atexit.register(self.close)
+
+    def record(self, model, features, outputs, latency_ms, model_version=None):
+        """Buffer one prediction; the only cost on the request path"""
+        row = _row(model, features, outputs, latency_ms, model_version)
+        with self._lock:
+            self._buffer.append(row)
+            pending = len(self._buffer)
+            if self._thread is None:
+                self._start_thread()
+        if pending >= self.max_buffer_rows:
+            self._wake.set()
+
+    def _start_thread(self):
+        self._thread = threading.Thread(target=self._run, name="prediction-log", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Prediction log flush failed")
+
+    def flush(self):
+        """Write buffered rows as one row group, rotating the file if due"""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+
+        table = _table(rows)
+        with self._write_lock:
+            if self._writer is None:
+                self._open_writer()
+            self._writer.write_table(table)
+            if (os.path.getsize(self._path) >= self.rotate_bytes
+                    or time.time() - self._opened_at >= self.rotate_seconds):
+                self._close_writer()
+
+    def _open_writer(self):
+        _, pq, schema = _pyarrow()
+        self._path = _log_filename(self.log_dir) + ".open"
+        self._writer = pq.ParquetWriter(self._path, schema)
+        self._opened_at = time.time()
+
+    def _close_writer(self):
+        self._writer.close()
+        os.replace(self._path, self._path[:-len(".open")])
+        self._writer = None
+        self._path = None
+
+    def close(self):
+        """Flush everything and finalise the current file"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+        with self._write_lock:
+            if self._writer is not None:
+                self._close_writer()
+
+
+class SpoolLog:
+    """
+    Prediction log for processes that serve a single request
+
+    Appends each row as a JSON line to the shared spool file under a shared
+    flock; compaction (compact_spool, never the request path) renames the
+    spool aside and takes an exclusive lock on it, so it waits for appends
+    that opened the file before the rename.
+    """
+
+    def __init__(self, log_dir):
+        self.log_dir = log_dir
+        self.path = os.path.join(log_dir, SPOOL_FILE)
+        os.makedirs(log_dir, exist_ok=True)
+
+    def record(self, model, features, outputs, latency_ms, model_version=None):
+        """Append one prediction to the spool"""
+        line = (json.dumps(_row(model, features, outputs, latency_ms, model_version)) + "\n").encode("utf-8")
+        self._append(line)
+
+    def _append(self, line):
+        while True:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_SH)
+                    # Renamed aside by a compaction between open and lock: append to the new spool
+                    try:
+                        current = os.stat(self.path)
+                    except FileNotFoundError:
+                        continue
+                    if current.st_ino != os.fstat(fd).st_ino:
+                        continue
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+            return
+
+    def due(self, min_bytes=0, max_age_seconds=0):
+        """Whether the spool holds rows and has reached min_bytes or its oldest row max_age_seconds"""
+        try:
+            size = os.path.getsize(self.path)
+            if size == 0 or size >= min_bytes:
+                return size > 0
+            with open(self.path, "rb") as f:
+                first = f.readline()
+            return time.time() - json.loads(first)[0] >= max_age_seconds
+        except (OSError, ValueError, IndexError):
+            return False
+
+    def compact(self):
+        """Move the spool's rows into one Parquet file; a no-op if another process got there first"""
+        compacting = f"{self.path}.{os.getpid()}-{time.time_ns()}.compacting"
+        try:
+            os.rename(self.path, compacting)
+        except FileNotFoundError:
+            return
+        compact_file(compacting, self.log_dir)
+
+
+def compact_file(spool_path, log_dir):
+    """Write a renamed-aside spool file as a Parquet log file and remove it"""
+    _, pq, _ = _pyarrow()
+    with open(spool_path, "rb") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        rows = [tuple(json.loads(line)) for line in f if line.strip()]
+    if rows:
+        path = _log_filename(log_dir)
+        pq.write_table(_table(rows), path + ".open")
+        os.replace(path + ".open", path)
+    os.remove(spool_path)
+
+
+def compact_spool(log_dir=None, min_bytes=0, max_age_seconds=0):
+    """
+    Compact the one-shot spool into a Parquet file, first finishing any
+    spool an interrupted compaction left behind
+
+    Args:
+        log_dir: log directory (defaults to PREDICTION_LOG_DIR)
+        min_bytes, max_age_seconds: leave a spool that is smaller and younger
+            than both to grow (the defaults compact whatever is there)
+
+    Returns:
+        True if the spool was compacted, False if it was empty or not due or
+        another compactor holds the lock
+    """
+    log_dir = log_dir or os.environ.get("PREDICTION_LOG_DIR")
+    spool = SpoolLog(log_dir)
+    with open(os.path.join(log_dir, COMPACT_LOCK_FILE), "a") as lock:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+        for leftover in sorted(glob.glob(os.path.join(log_dir, SPOOL_FILE + ".*.compacting"))):
+            compact_file(leftover, log_dir)
+        if not spool.due(min_bytes, max_age_seconds):
+            return False
+        spool.compact()
+        return True
+
+
+_log = None
+_log_lock = threading.Lock()
+_resident = False
+# Stands in for _log once setup has failed, so it is not retried per request
+_DISABLED = object()
+
+
+def use_resident_log():
+    """
+    Log through the buffered Parquet writer instead of the spool
+
+    For long-running servers only; call before the first prediction.
+    """
+    global _resident
+    _resident = True
+
+
+def get_log():
+    """
+    The process-wide log (the buffered PredictionLog in a resident server,
+    else a SpoolLog), or None when PREDICTION_LOG_DIR is unset or the log
+    could not be set up
+    """
+    global _log
+    log_dir = os.environ.get("PREDICTION_LOG_DIR")
+    if not log_dir:
+        return None
+    with _log_lock:
+        if _log is None:
+            try:
+                _log = _open_log(log_dir)
+            except Exception:
+                logger.exception("Prediction log disabled: could not set it up in %s", log_dir)
+                _log = _DISABLED
+        return None if _log is _DISABLED else _log
+
+
+def _open_log(log_dir):
+    if not HAS_PYARROW:
+        raise RuntimeError("PREDICTION_LOG_DIR is set but pyarrow is not installed")
+    if _resident:
+        return PredictionLog(
+            log_dir,
+            flush_interval=float(os.environ.get("PREDICTION_LOG_FLUSH_SECONDS", 1.0)),
+            rotate_bytes=int(float(os.environ.get("PREDICTION_LOG_ROTATE_MB", 64)) * 1024 * 1024),
+            rotate_seconds=float(os.environ.get("PREDICTION_LOG_ROTATE_SECONDS", 3600)),
+        )
+    return SpoolLog(log_dir)
+
+
+def _reset_after_fork():
+    # Buffers and the flush thread belong to the parent; a forked worker starts its own log
+    global _log, _log_lock
+    _log = None
+    _log_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def close_log():
+    """Flush and finalise the process-wide log (for exits that skip atexit)"""
+    if isinstance(_log, PredictionLog):
+        _log.close()
+
+
+def log_prediction(model, features, outputs, latency_ms, model_version=None):
+    """
+    Record a prediction if logging is enabled; never raises or prints
+
+    model_version may be a callable (e.g. a registry.artifact_tag lookup);
+    it is only called when logging is on, and a failure just skips the row.
+    """
+    try:
+        log = get_log()
+        if log is not None:
+            if callable(model_version):
+                model_version = model_version()
+            log.record(model, features, outputs, latency_ms, model_version)
+    except Exception:
+        logger.exception("Prediction log append failed")
+
+
+def read_log(log_dir=None, model=None, expand=False, include_open=False):
+    """
+    Read the log back as a DataFrame for offline analysis and replay
+
+    Args:
+        log_dir: log directory (defaults to PREDICTION_LOG_DIR)
+        model: only rows for this model name
+        expand: parse the features/outputs JSON into features.* / outputs.* columns
+        include_open: also read files still being written (only safe after
+                      close()) and the rows still in the one-shot spool
+
+    Returns:
+        DataFrame with one row per prediction, ordered by timestamp
+    """
+    import pandas as pd
+
+    log_dir = log_dir or os.environ.get("PREDICTION_LOG_DIR")
+    files = sorted(glob.glob(os.path.join(log_dir, "*.parquet")))
+    frames = []
+    if include_open:
+        files += sorted(glob.glob(os.path.join(log_dir, "*.parquet.open")))
+        spool = os.path.join(log_dir, SPOOL_FILE)
+        if os.path.exists(spool):
+            with open(spool) as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            if rows:
+                spooled = pd.DataFrame(rows, columns=COLUMNS)
+                spooled["ts"] = pd.to_datetime((spooled["ts"] * 1000).astype("int64"), unit="ms")
+                frames.append(spooled)
+    frames = [pd.read_parquet(f) for f in files] + frames
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+
+    df = pd.concat(frames, ignore_index=True)
+    if model is not None:
+        df = df[df["model"] == model]
+    df = df.sort_values("ts", kind="stable").reset_index(drop=True)
+
+    if expand:
+        for column in ("features", "outputs"):
+            parsed = [json.loads(v) for v in df[column]]
+            # Labour requests/responses are one-row lists
+            parsed = [v[0] if isinstance(v, list) and len(v) == 1 else v for v in parsed]
+            expanded = pd.json_normalize(parsed).add_prefix(f"{column}.")
+            df = pd.concat([df.drop(columns=[column]), expanded], axis=1)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact the one-shot prediction spool into Parquet")
+    parser.add_argument("--log-dir", default=os.environ.get("PREDICTION_LOG_DIR"),
+                        help="log directory (default: PREDICTION_LOG_DIR)")
+    parser.add_argument("--every", type=float, default=0,
+                        help="keep running, checking every N seconds (default: check once)")
+    parser.add_argument("--force", action="store_true",
+                        help="compact whatever is spooled, regardless of size and age")
+    args = parser.parse_args()
+    if not args.log_dir:
+        parser.error("--log-dir or PREDICTION_LOG_DIR is required")
+
+    min_bytes = int(float(os.environ.get("PREDICTION_LOG_SPOOL_MB", 4)) * 1024 * 1024)
+    max_age_seconds = float(os.environ.get("PREDICTION_LOG_ROTATE_SECONDS", 3600))
+    if args.force:
+        min_bytes = max_age_seconds = 0
+    while True:
+        if compact_spool(args.log_dir, min_bytes, max_age_seconds):
+            print(f"Compacted the prediction spool in {args.log_dir}")
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Pre-fork prediction server for the crop, yield and labour models
+
+The master process imports numpy, pandas and sklearn and loads every model
+artifact once, freezes the heap so the garbage collector does not dirty the
+shared pages, then forks N workers that share those pages copy-on-write.
+Workers accept connections on a socket the master opened before forking, so
+the kernel spreads connections across them; the master only supervises and
+restarts any worker that dies.
+
+Protocol: newline-delimited JSON over TCP (or a Unix socket). Each request
+line is {"model": <name>, "input": <payload>} and gets one JSON line back,
+identical to what the matching stdin script prints:
+
+    crop          predict.py
+    yield         predict_yield.py (sweep mode when input has "sweep")
+    labour        predict_labour.py (input is a list of rows)
+    labour_smart  smart_labour_recommendation.py
+    plan          farm_plan.py
+    stats         worker pid and model registry counters
+    drift         this worker's feature-drift scores (see drift_monitor.py)
+
+With PREDICTION_LOG_DIR set, each worker appends crop, yield and labour
+predictions to its own prediction log file (see prediction_log.py); yield
+sweeps are logged as "yield_sweep" with their best/worst scenarios only.
+
+Each worker feeds crop, yield and labour inputs into a constant-memory drift
+monitor when the model's training baseline exists. Scores are reported every
+DRIFT_REPORT_EVERY requests (default 1000) to stderr, or to
+DRIFT_REPORT_DIR/<model>-drift-<pid>.json when that is set.
+
+Usage:
+    python prefork_server.py --workers 4 --port 5055
+    python prefork_server.py --socket /tmp/ml.sock
+"""
+import argparse
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+import time
+import warnings
+
+import numpy  # noqa: F401  (imported before fork so workers share it)
+import pandas  # noqa: F401
+import sklearn.ensemble  # noqa: F401
+
+import cpu_budget
+import farm_plan
+import predict
+import predict_labour
+import predict_yield
+import smart_labour_recommendation as smart_labour
+from drift_monitor import DriftMonitor
+from model_registry import registry
+from prediction_log import close_log, log_prediction, use_resident_log
+
+warnings.filterwarnings("ignore")
+
+# Idle connections are closed so a silent client cannot pin a worker
+CONNECTION_TIMEOUT_S = 30
+# A worker that dies sooner than this after starting is restarted with a delay
+MIN_WORKER_LIFETIME_S = 1.0
+
+
+# Per-worker drift monitors, created lazily after fork
+_monitors = {}
+
+
+def drift_monitor_for(model):
+    if model not in _monitors:
+        report_dir = os.environ.get("DRIFT_REPORT_DIR")
+        _monitors[model] = DriftMonitor.for_model(
+            model,
+            registry.model_dir,
+            report_every=int(os.environ.get("DRIFT_REPORT_EVERY", 1000)),
+            report_path=os.path.join(report_dir, f"{model}-drift-{os.getpid()}.json") if report_dir else None,
+        )
+    return _monitors[model]
+
+
+def track_drift(model, payload):
+    monitor = drift_monitor_for(model)
+    if monitor is not None:
+        for row in payload if isinstance(payload, list) else [payload]:
+            monitor.update(row)
+
+
+def drift_scores(_):
+    return {"pid": os.getpid(), "models": {
+        model: monitor.scores() for model, monitor in _monitors.items() if monitor is not None
+    }}
+
+
+def handle_yield(data):
+    if "sweep" in data:
+        return predict_yield.predict_yield_sweep(data)
+    return predict_yield.predict_yield(data)
+
+
+# Requests recorded in the prediction log (same models the stdin scripts log)
+LOGGED_MODELS = ("crop", "yield", "labour")
+
+HANDLERS = {
+    "crop": predict.predict_crop,
+    "yield": handle_yield,
+    "labour": predict_labour.predict_labour,
+    "labour_smart": smart_labour.recommend,
+    "plan": farm_plan.build_plan,
+    "stats": lambda _: {"pid": os.getpid(), "registry": registry.stats()},
+    "drift": drift_scores,
+}
+
+
+def record_request(model, payload, response, latency_ms):
+    """Drift tracking and prediction logging for a served request; never raises"""
+    try:
+        logged_as, outputs = model, response
+        if model == "yield" and "sweep" in payload:
+            logged_as, outputs = "yield_sweep", predict_yield.sweep_log_outputs(response)
+        else:
+            track_drift(model, payload)
+        version = payload.get("model_version") if isinstance(payload, dict) else None
+        log_prediction(logged_as, payload, outputs, latency_ms, registry.artifact_tag(model, version))
+    except Exception as e:
+        print(f"[worker {os.getpid()}] recording a {model} request failed: {e}", file=sys.stderr)
+
+
+def handle_request(line):
+    """Decode one request line and return the JSON response line"""
+    try:
+        request = json.loads(line)
+        model = request.get("model")
+        handler = HANDLERS.get(model)
+        if handler is None:
+            response = {"error": f"Unknown model {model!r}", "models": sorted(HANDLERS)}
+        else:
+            payload = request.get("input") or {}
+            start = time.perf_counter()
+            response = handler(payload)
+            latency_ms = (time.perf_counter() - start) * 1000
+    except Exception as e:
+        response = {"error": str(e), "message": "Prediction request failed"}
+    else:
+        # Guarded on its own: drift and logging never change the reply
+        if handler is not None and model in LOGGED_MODELS:
+            record_request(model, payload, response, latency_ms)
+    return (json.dumps(response) + "\n").encode("utf-8")
+
+
+def serve_connection(conn):
+    conn.settimeout(CONNECTION_TIMEOUT_S)
+    with conn, conn.makefile("rb") as reader:
+        for line in reader:
+            if line.strip():
+                conn.sendall(handle_request(line))
+
+
+def worker_loop(listener):
+    """Accept and serve connections until terminated"""
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        conn, _ = listener.accept()
+        try:
+            serve_connection(conn)
+        except (OSError, ValueError) as e:
+            print(f"[worker {os.getpid()}] connection error: {e}", file=sys.stderr)
+
+
+def preload_models():
+    """Import-time work and model loads the workers will share copy-on-write"""
+    for name in ("crop", "yield", "labour"):
+        artifacts = registry.get(name)
+        status = "loaded" if artifacts and any(artifacts.values()) else "not trained (fallback)"
+        print(f"[master] {name}: {status}", file=sys.stderr)
+
+
+def open_listener(args):
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(args.socket)
+    else:
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((args.host, args.port))
+    listener.listen(args.backlog)
+    return listener
+
+
+class Master:
+    def __init__(self, listener, n_workers):
+        self.listener = listener
+        self.n_workers = n_workers
+        self.workers = {}  # pid -> start time
+        self.stopping = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                gc.enable()
+                # Workers split the CPU budget so their thread pools don't oversubscribe it
+                cpu_budget.configure(threads=max(1, cpu_budget.n_jobs() // self.n_workers))
+                worker_loop(self.listener)
+            finally:
+                close_log()
+                os._exit(0)
+        self.workers[pid] = time.monotonic()
+        if self.stopping:
+            # stop() ran while this worker was being forked and did not see it
+            os.kill(pid, signal.SIGTERM)
+        return pid
+
+    def stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for _ in range(self.n_workers):
+            self.spawn()
+        print(f"[master {os.getpid()}] serving with {self.n_workers} workers", file=sys.stderr)
+
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            started = self.workers.pop(pid, None)
+            if self.stopping or started is None:
+                continue
+
+            print(f"[master] worker {pid} exited (status {status}); restarting", file=sys.stderr)
+            if time.monotonic() - started < MIN_WORKER_LIFETIME_S:
+                time.sleep(MIN_WORKER_LIFETIME_S)
+                if self.stopping:
+                    continue
+            self.spawn()
+
+        self.listener.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork server for the ML predictors")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("ML_SERVER_WORKERS", 0)) or None,
+                        help="Worker processes (default: the CPU budget, see cpu_budget.py)")
+    parser.add_argument("--host", default=os.environ.get("ML_SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("ML_SERVER_PORT", 5055)))
+    parser.add_argument("--socket", default=os.environ.get("ML_SERVER_SOCKET"),
+                        help="Serve on a Unix socket instead of TCP")
+    parser.add_argument("--backlog", type=int, default=128)
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        print("prefork_server.py requires a platform with os.fork()", file=sys.stderr)
+        sys.exit(1)
+
+    budget = cpu_budget.configure()
+    n_workers = max(1, args.workers or budget)
+    # Workers are long-lived, so they buffer rows and write Parquet directly
+    use_resident_log()
+
+    # Keep the collector from touching (and copying) shared pages while loading
+    gc.disable()
+    preload_models()
+    listener = open_listener(args)
+    gc.freeze()
+
+    Master(listener, n_workers).run()
+
+
+if __name__ == '__main__':
+    main()
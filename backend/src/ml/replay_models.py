@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Offline replay of recorded requests through the current and a candidate model
+
+Streams a recorded request file through both models side by side in batches
+and reports how the candidate differs before it is promoted:
+
+    - prediction disagreement rate, per-class changes (crop, labour demand)
+    - regression deltas (yield production, labour required)
+    - batch latency and memory for each model
+
+Requests come from a prediction log directory (see prediction_log.py), a
+single Parquet log file, or a JSON-lines file with one request per line.
+The candidate directory holds the same artifact filenames as src/ml
+(crop_model.pkl + scaler.pkl, yield_*.pkl, labour_model.joblib).
+
+Usage:
+    python replay_models.py --model crop --requests logs/ --candidate-dir /tmp/retrained
+    python replay_models.py --model yield --requests yield.jsonl --candidate-dir new/ \\
+        --max-latency-regression 0.2 --report replay.json
+
+Exits with status 1 when a promotion gate fails.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+import predict
+import predict_yield
+from model_registry import ML_DIR, default_registry, estimate_nbytes
+
+warnings.filterwarnings("ignore")
+
+
+def iter_requests(path, model, batch_size):
+    """
+    Yield batches of request dicts without loading the whole recording
+
+    Labour requests are lists of rows; each row is replayed separately.
+    """
+    def rows_of(payload):
+        return payload if isinstance(payload, list) else [payload]
+
+    batch = []
+    if path.endswith(".jsonl") or path.endswith(".json"):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    for row in rows_of(json.loads(line)):
+                        batch.append(row)
+                        if len(batch) == batch_size:
+                            yield batch
+                            batch = []
+    else:
+        import pyarrow.parquet as pq
+        files = sorted(glob.glob(os.path.join(path, "*.parquet"))) if os.path.isdir(path) else [path]
+        for file in files:
+            for record_batch in pq.ParquetFile(file).iter_batches(batch_size=batch_size,
+                                                                  columns=["model", "features"]):
+                for name, features in zip(*record_batch.to_pydict().values()):
+                    if name != model:
+                        continue
+                    for row in rows_of(json.loads(features)):
+                        batch.append(row)
+                        if len(batch) == batch_size:
+                            yield batch
+                            batch = []
+    if batch:
+        yield batch
+
+
+def predict_batch(model, rows, artifacts):
+    """
+    Score one batch, returning (labels, values) arrays; either may be None
+
+    crop:   labels = recommended crop
+    yield:  values = predicted production
+    labour: labels = demand level, values = labour required
+    """
+    if model == "crop":
+        results = predict.predict_crop_batch(rows, artifacts)
+        return np.array([r["recommended_crop"] for r in results]), None
+    if model == "yield":
+        results = predict_yield.predict_yield_batch(rows, artifacts)
+        return None, np.array([r["predicted_production"] for r in results])
+    results = artifacts["model"].predict(pd.DataFrame(rows))
+    return (np.array([r["Labour_Demand_Level"] for r in results]),
+            np.array([r["Labour_Required"] for r in results], dtype=float))
+
+
+class ReplaySide:
+    """Per-model accumulator for one side (current or candidate) of the replay"""
+
+    def __init__(self, name, model, model_dir):
+        self.name = name
+        self.model_dir = model_dir
+        registry = default_registry(model_dir)
+
+        start = time.perf_counter()
+        self.artifacts = registry.get(model)
+        self.load_s = time.perf_counter() - start
+        if self.artifacts is None or not any(self.artifacts.values()):
+            raise SystemExit(f"No trained {model} model in {model_dir}")
+        self.model_bytes = estimate_nbytes(self.artifacts)
+        self.batch_ms = []
+        self.rows = 0
+        self.peak_alloc = 0
+
+    def run(self, model, rows):
+        """
+        Score a batch twice: an untraced pass that is timed and whose output
+        is returned, then a pass under tracemalloc for the peak allocation,
+        since tracing every allocation would inflate the latencies
+        """
+        start = time.perf_counter()
+        output = predict_batch(model, rows, self.artifacts)
+        self.batch_ms.append((time.perf_counter() - start) * 1000)
+
+        tracemalloc.start()
+        try:
+            predict_batch(model, rows, self.artifacts)
+            self.peak_alloc = max(self.peak_alloc, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+        self.rows += len(rows)
+        return output
+
+    def summary(self):
+        batch_ms = np.array(self.batch_ms) if self.batch_ms else np.zeros(1)
+        return {
+            "model_dir": self.model_dir,
+            "load_s": round(self.load_s, 4),
+            "model_bytes": self.model_bytes,
+            "peak_predict_alloc_bytes": self.peak_alloc,
+            "batches": len(self.batch_ms),
+            "rows": self.rows,
+            "batch_latency_ms": {
+                "mean": round(float(batch_ms.mean()), 3),
+                "p50": round(float(np.percentile(batch_ms, 50)), 3),
+                "p95": round(float(np.percentile(batch_ms, 95)), 3),
+                "max": round(float(batch_ms.max()), 3),
+            },
+            "per_row_ms": round(float(batch_ms.sum()) / max(self.rows, 1), 4),
+        }
+
+
+def replay(model, requests, candidate_dir, current_dir=ML_DIR, batch_size=256):
+    """
+    Replay recorded requests through both models
+
+    Returns:
+        report dict (see module docstring); gates are applied by the caller
+    """
+    current = ReplaySide("current", model, current_dir)
+    candidate = ReplaySide("candidate", model, candidate_dir)
+
+    transitions = Counter()  # (current label, candidate label) -> count
+    per_class = Counter()    # current label -> rows
+    deltas = []
+
+    for i, rows in enumerate(iter_requests(requests, model, batch_size)):
+        # Alternate which side runs first so neither always gets the warmer cache
+        sides = (current, candidate) if i % 2 == 0 else (candidate, current)
+        outputs = {side.name: side.run(model, rows) for side in sides}
+        cur_labels, cur_values = outputs["current"]
+        cand_labels, cand_values = outputs["candidate"]
+
+        if cur_labels is not None:
+            per_class.update(cur_labels.tolist())
+            transitions.update(zip(cur_labels.tolist(), cand_labels.tolist()))
+        if cur_values is not None:
+            deltas.append(cand_values - cur_values)
+
+    report = {"model": model, "requests": requests, "rows": current.rows,
+              "current": current.summary(), "candidate": candidate.summary()}
+
+    if per_class:
+        disagreements = sum(n for (a, b), n in transitions.items() if a != b)
+        report["classification"] = {
+            "disagreement_rate": round(disagreements / max(current.rows, 1), 6),
+            "per_class": {
+                label: {
+                    "rows": total,
+                    "changed": sum(n for (a, b), n in transitions.items() if a == label and b != label),
+                    "changed_rate": round(
+                        sum(n for (a, b), n in transitions.items() if a == label and b != label) / total, 6),
+                }
+                for label, total in sorted(per_class.items())
+            },
+            "top_transitions": [
+                {"from": a, "to": b, "rows": n}
+                for (a, b), n in transitions.most_common() if a != b
+            ][:10],
+        }
+
+    if deltas:
+        delta = np.concatenate(deltas)
+        abs_delta = np.abs(delta)
+        report["regression"] = {
+            "mean_delta": round(float(delta.mean()), 4),
+            "mean_abs_delta": round(float(abs_delta.mean()), 4),
+            "p95_abs_delta": round(float(np.percentile(abs_delta, 95)), 4),
+            "max_abs_delta": round(float(abs_delta.max()), 4),
+        }
+
+    return report
+
+
+def apply_gates(report, max_latency_regression=None, max_disagreement=None):
+    """Return the list of failed promotion gates"""
+    failures = []
+    if max_latency_regression is not None:
+        current_p95 = report["current"]["batch_latency_ms"]["p95"]
+        candidate_p95 = report["candidate"]["batch_latency_ms"]["p95"]
+        if candidate_p95 > current_p95 * (1 + max_latency_regression):
+            failures.append(
+                f"p95 batch latency {candidate_p95:.2f}ms exceeds current {current_p95:.2f}ms "
+                f"by more than {max_latency_regression:.0%}")
+    if max_disagreement is not None and "classification" in report:
+        rate = report["classification"]["disagreement_rate"]
+        if rate > max_disagreement:
+            failures.append(f"disagreement rate {rate:.2%} exceeds {max_disagreement:.2%}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded requests through current and candidate models")
+    parser.add_argument("--model", choices=["crop", "yield", "labour"], required=True)
+    parser.add_argument("--requests", required=True,
+                        help="Prediction log directory, Parquet log file or JSON-lines file")
+    parser.add_argument("--candidate-dir", required=True)
+    parser.add_argument("--current-dir", default=ML_DIR)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--max-latency-regression", type=float,
+                        help="Fail if candidate p95 batch latency exceeds current by this fraction (e.g. 0.2)")
+    parser.add_argument("--max-disagreement", type=float,
+                        help="Fail if the classification disagreement rate exceeds this fraction")
+    parser.add_argument("--report", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = replay(args.model, args.requests, args.candidate_dir, args.current_dir, args.batch_size)
+    failures = apply_gates(report, args.max_latency_regression, args.max_disagreement)
+    report["promotion"] = {"passed": not failures, "failures": failures}
+
+    output = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(output)
+    print(output)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,21 +6,74 @@ import sys
 import json
 import pandas as pd
 import numpy as np
-from pathlib import Path
-
-# Try to load the ML model if it exists
-try:
-    import joblib
-    model_path = Path(__file__).parent / "labour_model.joblib"
-    if model_path.exists():
-        labour_model = joblib.load(model_path)
-        HAS_ML_MODEL = True
-    else:
-        HAS_ML_MODEL = False
-except:
-    HAS_ML_MODEL = False
+import cpu_budget
+from model_registry import registry
+
+# The ML model is loaded by the registry on first use, not at import time
+HAS_ML_MODEL = registry.available("labour")
+
+# Fallback heuristics if model not available
+LABOUR_PER_HECTARE = {
+    'Rice': 3.5,
+    'Wheat': 2.5,
+    'Cotton': 4.0,
+    'Sugarcane': 5.0,
+    'Maize': 2.0,
+    'Soybean': 1.5,
+    'Vegetables': 6.0,
+    'Fruits': 4.5,
+    'default': 3.0
+}
+
+# Season multipliers
+SEASON_FACTOR = {
+    'Kharif': 1.2,  # More labour intensive (monsoon season)
+    'Rabi': 1.0,    # Normal
+    'Zaid': 0.8,    # Summer crops, less labour
+    'default': 1.0
+}
+
+# Labour per hectare below each bound -> demand level; at or above the last -> Very_High
+DEMAND_BOUNDS = [1.5, 3.0, 4.5]
+DEMAND_LEVELS = np.array(["Low", "Medium", "High", "Very_High"], dtype=object)
+
+HEURISTIC_CONFIDENCE = 0.70
+ML_CONFIDENCE = 0.85
+
+ACRES_PER_HECTARE = 2.4711
+
+# Labour model features beyond crop, area and season. The model is only used
+# for requests that supply all of them; filling them in with guesses would
+# report ML numbers for a farm the request never described, so anything less
+# gets the heuristic.
+ML_EXTRA_FEATURES = (
+    'Region', 'Soil_Type', 'Irrigation_Type', 'Mechanization_Level', 'Labour_Availability',
+    'Gender_Split', 'Task', 'Prev_Yield_q_per_acre', 'Weather_Index',
+)
+
+def model_features(row):
+    """The ML_EXTRA_FEATURES of a request dict, or None unless it has every one"""
+    if not isinstance(row, dict) or any(row.get(name) is None for name in ML_EXTRA_FEATURES):
+        return None
+    return {name: row[name] for name in ML_EXTRA_FEATURES}
 
-def calculate_labour_requirement(crop_type, area, season=None):
+def ml_feature_frame(crop_types, areas, seasons, features):
+    """
+    Input frame for the labour model from crop, area (hectares), season and
+    each row's ML_EXTRA_FEATURES dict
+
+    Returns:
+        DataFrame with every column the model was trained on
+    """
+    areas = np.asarray(areas, dtype=np.float64)
+    n = len(areas)
+    frame = pd.DataFrame([model_features(f) for f in features], columns=list(ML_EXTRA_FEATURES))
+    frame['Crop'] = list(crop_types)
+    frame['Season'] = [s or 'Kharif' for s in seasons] if seasons is not None else ['Kharif'] * n
+    frame['Farm_Size_Acre'] = areas * ACRES_PER_HECTARE
+    return frame
+
+def calculate_labour_requirement(crop_type, area, season=None, features=None):
     """
     Calculate labour requirement using ML model or fallback heuristics
     
@@ -28,50 +81,24 @@ def calculate_labour_requirement(crop_type, area, season=None):
         crop_type: Type of crop (Rice, Wheat, etc.)
         area: Area in hectares
         season: Growing season (Kharif, Rabi, Zaid)
+        features: dict with the ML_EXTRA_FEATURES; the ML model is only
+                  used when it has all of them
     
     Returns:
         dict with labour_required and confidence
     """
-    
-    # Fallback heuristics if model not available
-    labour_per_hectare = {
-        'Rice': 3.5,
-        'Wheat': 2.5,
-        'Cotton': 4.0,
-        'Sugarcane': 5.0,
-        'Maize': 2.0,
-        'Soybean': 1.5,
-        'Vegetables': 6.0,
-        'Fruits': 4.5,
-        'default': 3.0
-    }
-    
-    # Season multipliers
-    season_factor = {
-        'Kharif': 1.2,  # More labour intensive (monsoon season)
-        'Rabi': 1.0,    # Normal
-        'Zaid': 0.8,    # Summer crops, less labour
-        'default': 1.0
-    }
-    
-    if HAS_ML_MODEL:
+    if HAS_ML_MODEL and model_features(features) is not None:
         try:
-            # Prepare input for ML model
-            input_data = pd.DataFrame({
-                'Crop': [crop_type],
-                'Area_Hectares': [area],
-                'Season': [season or 'Kharif']
-            })
-            
             # Get prediction
-            prediction = labour_model.predict(input_data)[0]
+            labour_model = registry.get("labour")["model"]
+            prediction = labour_model.predict(ml_feature_frame([crop_type], [area], [season], [features]))[0]
             labour_required = int(prediction['Labour_Required'])
             demand_level = prediction['Labour_Demand_Level']
             
             return {
                 'labour_required': labour_required,
                 'demand_level': demand_level,
-                'confidence': 0.85,
+                'confidence': ML_CONFIDENCE,
                 'method': 'ml_model'
             }
         except Exception as e:
@@ -79,8 +106,8 @@ def calculate_labour_requirement(crop_type, area, season=None):
             # Fall through to heuristic method
     
     # Heuristic calculation
-    base_rate = labour_per_hectare.get(crop_type, labour_per_hectare['default'])
-    season_mult = season_factor.get(season, season_factor['default'])
+    base_rate = LABOUR_PER_HECTARE.get(crop_type, LABOUR_PER_HECTARE['default'])
+    season_mult = SEASON_FACTOR.get(season, SEASON_FACTOR['default'])
     
     labour_required = int(np.ceil(area * base_rate * season_mult))
     
@@ -98,10 +125,145 @@ def calculate_labour_requirement(crop_type, area, season=None):
     return {
         'labour_required': labour_required,
         'demand_level': demand_level,
-        'confidence': 0.70,
+        'confidence': HEURISTIC_CONFIDENCE,
         'method': 'heuristic'
     }
 
+def lookup_codes(values, table):
+    """
+    Map an array of keys to table values, looking each distinct key up once
+
+    Keys missing from the table (including None) get table['default'].
+    """
+    codes, keys = pd.factorize(np.asarray(values, dtype=object))
+    # Missing keys (None/NaN) are coded -1, which indexes the appended default
+    rates = np.array([table.get(k, table['default']) for k in keys] + [table['default']], dtype=np.float64)
+    return rates[codes]
+
+def heuristic_labour_requirement_batch(crop_types, areas, seasons=None):
+    """
+    Vectorized heuristic for arrays of farms; row i equals the heuristic
+    branch of calculate_labour_requirement(crop_types[i], areas[i], seasons[i])
+
+    Returns:
+        dict of columns: labour_required (int64), demand_level, confidence, method
+    """
+    areas = np.asarray(areas, dtype=np.float64)
+    n = len(areas)
+    base_rate = lookup_codes(crop_types, LABOUR_PER_HECTARE)
+    season_mult = (lookup_codes(seasons, SEASON_FACTOR) if seasons is not None
+                   else np.full(n, SEASON_FACTOR['default']))
+    
+    labour_required = np.ceil(areas * base_rate * season_mult).astype(np.int64)
+    
+    per_hectare = np.zeros(n)
+    np.divide(labour_required, areas, out=per_hectare, where=areas > 0)
+    demand_level = DEMAND_LEVELS[np.searchsorted(DEMAND_BOUNDS, per_hectare, side='right')]
+    
+    return {
+        'labour_required': labour_required,
+        'demand_level': demand_level,
+        'confidence': np.full(n, HEURISTIC_CONFIDENCE),
+        'method': np.full(n, 'heuristic', dtype=object),
+    }
+
+def calculate_labour_requirement_batch(crop_types, areas, seasons=None, features=None):
+    """
+    Labour requirement for arrays of farms: the vectorized heuristic, with
+    the rows that supply every ML feature predicted by the ML model in one call
+
+    Args:
+        crop_types: sequence of crop names
+        areas: sequence of areas in hectares
+        seasons: sequence of seasons, or None
+        features: sequence of ML_EXTRA_FEATURES dicts (None entries allowed), or None
+
+    Returns:
+        dict of columns (labour_required, demand_level, confidence, method);
+        row i matches calculate_labour_requirement for that row
+    """
+    columns = heuristic_labour_requirement_batch(crop_types, areas, seasons)
+    complete = ([] if features is None else
+                [i for i, row in enumerate(features) if model_features(row) is not None])
+    if HAS_ML_MODEL and complete:
+        try:
+            labour_model = registry.get("labour")["model"]
+            predictions = labour_model.predict(ml_feature_frame(
+                [crop_types[i] for i in complete],
+                np.asarray(areas, dtype=np.float64)[complete],
+                None if seasons is None else [seasons[i] for i in complete],
+                [features[i] for i in complete]))
+            columns['labour_required'][complete] = [int(p['Labour_Required']) for p in predictions]
+            columns['demand_level'][complete] = [p['Labour_Demand_Level'] for p in predictions]
+            columns['confidence'][complete] = ML_CONFIDENCE
+            columns['method'][complete] = 'ml_model'
+        except Exception as e:
+            print(f"ML prediction failed: {e}", file=sys.stderr)
+    
+    return columns
+
+def batch_rows(columns):
+    """Columnar batch results as per-row dicts, like calculate_labour_requirement"""
+    return [
+        {'labour_required': int(lr), 'demand_level': str(dl), 'confidence': float(c), 'method': str(m)}
+        for lr, dl, c, m in zip(columns['labour_required'], columns['demand_level'],
+                                columns['confidence'], columns['method'])
+    ]
+
+def build_output(crop_type, area, season, result):
+    """
+    Format a labour requirement result as the JSON response the controller expects
+    """
+    labour_per_hectare = round(result['labour_required'] / area, 2) if area > 0 else 0
+    return {
+        'success': True,
+        'crop_type': crop_type,
+        'area_hectares': area,
+        'season': season,
+        'labour_required': result['labour_required'],
+        'demand_level': result['demand_level'],
+        'labour_per_hectare': labour_per_hectare,
+        'confidence': result['confidence'],
+        'method': result['method'],
+        'recommendations': [
+            f"Total labour required: {result['labour_required']} workers",
+            f"Labour intensity: {result['demand_level']}",
+            f"Estimated per hectare: {labour_per_hectare} workers/ha",
+            "Consider hiring experienced workers for better efficiency" if result['demand_level'] in ['High', 'Very_High'] else "Standard workforce should suffice"
+        ]
+    }
+
+def recommend(input_data):
+    """
+    Labour recommendation for one {crop_type, area, season} request, or a
+    list of them (computed as one batch). Requests that also carry every
+    ML_EXTRA_FEATURES field are answered by the ML model.
+    """
+    if isinstance(input_data, list):
+        return recommend_batch(input_data)
+    
+    crop_type = input_data.get('crop_type', 'Rice')
+    area = float(input_data.get('area', 10))
+    season = input_data.get('season', 'Kharif')
+    
+    # Calculate labour requirement
+    result = calculate_labour_requirement(crop_type, area, season, model_features(input_data))
+    
+    return build_output(crop_type, area, season, result)
+
+def recommend_batch(rows):
+    """
+    Labour recommendations for a list of {crop_type, area, season} requests
+    """
+    crop_types = [row.get('crop_type', 'Rice') for row in rows]
+    areas = [float(row.get('area', 10)) for row in rows]
+    seasons = [row.get('season', 'Kharif') for row in rows]
+    
+    features = [model_features(row) for row in rows]
+    
+    results = batch_rows(calculate_labour_requirement_batch(crop_types, areas, seasons, features))
+    return [build_output(c, a, s, r) for c, a, s, r in zip(crop_types, areas, seasons, results)]
+
 def main():
     """
     Main function to handle command line input
@@ -111,38 +273,16 @@ def main():
         "area": 100,
         "season": "Kharif"
     }
+    optionally with every ML_EXTRA_FEATURES field (Region, Soil_Type, ...)
+    to use the ML model, or a list of such objects, answered with a list
     """
+    cpu_budget.configure(verbose=False)
     try:
         # Read input from stdin
         input_data = json.loads(sys.stdin.read())
         
-        crop_type = input_data.get('crop_type', 'Rice')
-        area = float(input_data.get('area', 10))
-        season = input_data.get('season', 'Kharif')
-        
-        # Calculate labour requirement
-        result = calculate_labour_requirement(crop_type, area, season)
-        
         # Output result
-        output = {
-            'success': True,
-            'crop_type': crop_type,
-            'area_hectares': area,
-            'season': season,
-            'labour_required': result['labour_required'],
-            'demand_level': result['demand_level'],
-            'labour_per_hectare': round(result['labour_required'] / area, 2) if area > 0 else 0,
-            'confidence': result['confidence'],
-            'method': result['method'],
-            'recommendations': [
-                f"Total labour required: {result['labour_required']} workers",
-                f"Labour intensity: {result['demand_level']}",
-                f"Estimated per hectare: {round(result['labour_required'] / area, 2) if area > 0 else 0} workers/ha",
-                "Consider hiring experienced workers for better efficiency" if result['demand_level'] in ['High', 'Very_High'] else "Standard workforce should suffice"
-            ]
-        }
-        
-        print(json.dumps(output))
+        print(json.dumps(recommend(input_data)))
         sys.exit(0)
         
     except Exception as e:
@@ -0,0 +1,50 @@
+"""
+Wall-clock and CPU timing for training stages
+
+    timer = StageTimer()
+    with timer.stage("fit"):
+        model.fit(X, y)
+    timer.report()
+
+CPU time is process-wide (time.process_time), so it includes joblib worker
+threads; cpu/wall above 1.0 means the stage ran in parallel. The peak RSS
+recorded after each stage is the process high-water mark so far, so the first
+stage where it jumps is the one that allocated the memory.
+"""
+import resource
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    def __init__(self, verbose=True):
+        self.verbose = verbose
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            self.stages.append({"stage": name, "wall_s": wall, "cpu_s": cpu, "peak_rss_mb": peak_rss_mb})
+            if self.verbose:
+                print(f"[timing] {name}: wall {wall:.2f}s, cpu {cpu:.2f}s, peak RSS {peak_rss_mb:.0f} MB")
+
+    def total(self):
+        return {
+            "wall_s": sum(s["wall_s"] for s in self.stages),
+            "cpu_s": sum(s["cpu_s"] for s in self.stages),
+        }
+
+    def report(self):
+        """Print a per-stage summary table"""
+        print(f"\n{'Stage':<24}{'Wall (s)':>10}{'CPU (s)':>10}{'CPU/Wall':>10}{'Peak MB':>10}")
+        peak = max((s["peak_rss_mb"] for s in self.stages), default=0.0)
+        for s in self.stages + [dict(stage="total", peak_rss_mb=peak, **self.total())]:
+            ratio = s["cpu_s"] / s["wall_s"] if s["wall_s"] > 0 else 0.0
+            print(f"{s['stage']:<24}{s['wall_s']:>10.2f}{s['cpu_s']:>10.2f}{ratio:>10.2f}{s['peak_rss_mb']:>10.0f}")
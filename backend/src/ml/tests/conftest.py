@@ -0,0 +1,56 @@
+"""
+Shared fixtures for the ML script tests
+
+The scripts are flat modules in src/ml, so that directory goes on sys.path.
+Models are trained once per session on small synthetic datasets into a
+temporary directory; tests point the scripts' module-level registries at it,
+so the artifacts checked into a developer's src/ml are never read or written.
+"""
+import os
+import sys
+from contextlib import redirect_stdout
+from io import StringIO
+
+import pytest
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ML_DIR not in sys.path:
+    sys.path.insert(0, ML_DIR)
+
+# Keep test runs out of the developer's dataset cache
+os.environ.setdefault("ML_CACHE_DISABLE", "1")
+
+
+@pytest.fixture(scope="session")
+def model_dir(tmp_path_factory):
+    """Directory with small crop, yield and labour models"""
+    import train_crop_model
+    import train_labour_model_v2
+    import train_yield_model
+
+    path = tmp_path_factory.mktemp("models")
+    dataset_path = str(path / "labour_dataset.csv")
+    # The trainers report progress on stdout
+    with redirect_stdout(StringIO()):
+        train_crop_model.train_model(str(path), samples_per_crop=30, use_cache=False)
+        train_yield_model.train_model(str(path), n_samples=600, use_cache=False)
+        train_labour_model_v2.create_labour_dataset(600).to_csv(dataset_path, index=False)
+        train_labour_model_v2.train_labour_model(
+            dataset_path, n_cores=1, model_path=str(path / "labour_model.joblib"), use_cache=False)
+    return str(path)
+
+
+@pytest.fixture
+def trained_registry(model_dir, monkeypatch):
+    """
+    A fresh registry over the test models, installed in every loaded module
+    that holds a reference to model_registry.registry
+    """
+    import model_registry
+
+    reg = model_registry.default_registry(model_dir)
+    shared = model_registry.registry
+    for module in list(sys.modules.values()):
+        if getattr(module, "registry", None) is shared:
+            monkeypatch.setattr(module, "registry", reg)
+    return reg
@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import benchmark_training
+import cpu_budget
+from conftest import ML_DIR
+
+
+def result(trainer, rows, cores, fit_s, encode_s=0.1, over_baseline_mb=10.0):
+    return {"trainer": trainer, "rows": rows, "cores": cores,
+            "stages": [{"stage": "encode", "wall_s": encode_s}, {"stage": "fit", "wall_s": fit_s}],
+            "total_wall_s": fit_s + encode_s, "peak_over_baseline_mb": over_baseline_mb}
+
+
+def test_exponent():
+    assert benchmark_training.exponent(1.0, 2.0, 1000, 2000) == 1.0
+    assert benchmark_training.exponent(1.0, 4.0, 1000, 2000) == 2.0
+    assert benchmark_training.exponent(0.0, 4.0, 1000, 2000) is None
+    assert benchmark_training.exponent(1.0, 4.0, 1000, 1000) is None
+
+
+def test_scaling_flags_superlinear_stages():
+    results = [
+        result("labour", 4000, 1, fit_s=4.0, encode_s=0.2, over_baseline_mb=40.0),
+        result("labour", 1000, 1, fit_s=1.0, encode_s=0.05, over_baseline_mb=10.0),
+        result("labour", 2000, 1, fit_s=2.0, encode_s=0.2, over_baseline_mb=40.0),
+    ]
+    curves = benchmark_training.scaling(results)
+    assert [(c["rows_from"], c["rows_to"]) for c in curves] == [(1000, 2000), (2000, 4000)]
+    assert curves[0]["stages"] == {"encode": 2.0, "fit": 1.0}
+    assert curves[0]["superlinear"] == ["encode", "memory"]
+    assert curves[1]["stages"]["encode"] == 0.0 and curves[1]["memory"] == 0.0
+    assert curves[1]["superlinear"] == []
+
+
+def test_speedups_compare_against_the_smallest_budget():
+    results = [result("yield", 1000, 4, fit_s=1.0), result("yield", 1000, 1, fit_s=3.0),
+               result("yield", 1000, 2, fit_s=2.0), result("crop", 1000, 1, fit_s=1.0)]
+    assert benchmark_training.speedups(results) == [
+        {"trainer": "yield", "rows": 1000, "cores_from": 1, "cores_to": 2, "fit_speedup": 1.5},
+        {"trainer": "yield", "rows": 1000, "cores_from": 1, "cores_to": 4, "fit_speedup": 3.0},
+    ]
+
+
+def test_artifact_sizes_skip_directories_and_excluded(tmp_path):
+    (tmp_path / "model.pkl").write_bytes(b"x" * 10)
+    (tmp_path / "data.csv").write_bytes(b"y" * 5)
+    (tmp_path / "sub").mkdir()
+    assert benchmark_training.artifact_sizes(str(tmp_path), exclude=("data.csv",)) == {"model.pkl": 10}
+
+
+def test_child_env_sets_the_budget_and_drops_thread_caps(monkeypatch):
+    monkeypatch.setenv("OMP_NUM_THREADS", "1")
+    env = benchmark_training.child_env(3)
+    assert env[cpu_budget.ENV_VAR] == "3"
+    assert not set(cpu_budget.THREAD_ENV_VARS) & set(env)
+
+
+@pytest.mark.parametrize("trainer", benchmark_training.TRAINERS)
+def test_single_run(trainer, tmp_path):
+    # configure() sets process-wide thread limits, so run it the way the
+    # benchmark does: in a child with its own CPU budget
+    output = subprocess.run(
+        [sys.executable, os.path.join(ML_DIR, "benchmark_training.py"), "--single", trainer, "300", str(tmp_path)],
+        capture_output=True, text=True, env=benchmark_training.child_env(1), cwd=ML_DIR, timeout=300)
+    assert output.returncode == 0, output.stderr
+    r = json.loads(output.stdout.strip().splitlines()[-1])
+    assert r["trainer"] == trainer and r["cores"] == 1 and r["rows"] > 0
+    assert "fit" in {s["stage"] for s in r["stages"]}
+    assert r["artifacts"] and "labour_dataset.csv" not in r["artifacts"]
+    assert r["peak_rss_mb"] >= r["baseline_rss_mb"]
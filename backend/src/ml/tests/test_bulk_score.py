@@ -0,0 +1,78 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import bulk_score
+import train_labour_model_v2
+
+
+def index_and_read(path, fmt, shard_rows):
+    columns, shards = bulk_score.index_shards(str(path), fmt, shard_rows)
+    frames = [bulk_score.read_shard(str(path), fmt, columns, s["offset"], s["rows"]) for s in shards]
+    return shards, pd.concat(frames, ignore_index=True)
+
+
+@pytest.mark.parametrize("shard_rows", [1, 2, 3, 7, 100])
+def test_csv_shards_respect_multiline_fields(tmp_path, shard_rows):
+    frame = pd.DataFrame({
+        "id": range(10),
+        "note": ["plain", "two\nlines", "quote \"inside\"", "", "comma, here",
+                 "three\nline\nfield", "x", "trailing\n", "y", "z"],
+        "value": np.arange(10) * 1.5,
+    })
+    path = tmp_path / "input.csv"
+    frame.to_csv(path, index=False)
+    shards, read = index_and_read(path, "csv", shard_rows)
+    assert sum(s["rows"] for s in shards) == 10
+    assert [s["first_row"] for s in shards] == list(range(0, 10, shard_rows))
+    # A one-row shard whose only note is empty reads as all-NaN, hence no dtype check
+    pd.testing.assert_frame_equal(read, pd.read_csv(path), check_dtype=False)
+
+
+def test_csv_blank_lines_and_bom(tmp_path):
+    path = tmp_path / "input.csv"
+    path.write_bytes("﻿a,b\n1,2\n\n3,4\n   \n5,6\n".encode("utf-8"))
+    shards, read = index_and_read(path, "csv", 2)
+    assert [s["rows"] for s in shards] == [2, 1]
+    assert read["a"].tolist() == [1, 3, 5]
+
+
+def test_jsonl_shards(tmp_path):
+    path = tmp_path / "input.jsonl"
+    path.write_text("".join(json.dumps({"i": i, "text": "a\nb"}) + "\n" + ("\n" if i % 3 == 0 else "")
+                            for i in range(8)))
+    shards, read = index_and_read(path, "jsonl", 3)
+    assert [s["rows"] for s in shards] == [3, 3, 2]
+    assert read["i"].tolist() == list(range(8))
+
+
+def test_labour_scoring_fills_missing_mechanization_like_the_trainer(trained_registry):
+    artifacts = {"model": trained_registry.get("labour")["model"]}
+    rows = train_labour_model_v2.create_labour_dataset(20, seed=3)[train_labour_model_v2.FEATURE_COLUMNS]
+    rows.loc[::2, "Mechanization_Level"] = np.nan
+    scored = bulk_score.score_labour(rows, artifacts)
+    expected = artifacts["model"].predict(rows.fillna(train_labour_model_v2.FILLNA))
+    np.testing.assert_allclose(scored["labour_required"], [r["Labour_Required"] for r in expected])
+    assert list(scored["labour_demand_level"]) == [r["Labour_Demand_Level"] for r in expected]
+
+
+def test_bulk_run_resumes_and_scores_every_row(model_dir, tmp_path):
+    crop = {"N": 80, "P": 40, "K": 40, "temperature": 25, "humidity": 80, "ph": 6.5, "rainfall": 200}
+    farm = {"State": "Punjab", "Year": 2020, "Season": "Kharif", "Area": 10, "Rainfall": 900}
+    rows = pd.DataFrame([dict(crop, **farm, N=n, note="line\nbreak") for n in range(25)])
+    rows.to_csv(tmp_path / "input.csv", index=False)
+    args = SimpleNamespace(input=str(tmp_path / "input.csv"), output=str(tmp_path / "out"),
+                           models="crop,yield", workers=2, shard_rows=10, chunk_rows=4,
+                           output_format="csv", model_dir=model_dir, restart=False)
+    assert bulk_score.run(args) == 0
+    manifest = json.loads((tmp_path / "out" / bulk_score.MANIFEST).read_text())
+    assert [s["rows"] for s in manifest["shards"]] == [10, 10, 5]
+    scored = pd.concat([pd.read_csv(tmp_path / "out" / s["output"]) for s in manifest["shards"]])
+    assert scored["row"].tolist() == list(range(25))
+    assert scored["N"].tolist() == list(range(25))
+    assert scored["yield_predicted_production"].notna().all()
+    # A rerun finds every shard done
+    assert bulk_score.run(args) == 0
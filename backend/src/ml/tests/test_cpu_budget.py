@@ -0,0 +1,95 @@
+import pytest
+
+import cpu_budget
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+@pytest.fixture
+def proc_cgroup(tmp_path):
+    return tmp_path / "proc-self-cgroup"
+
+
+def test_v2_root_quota(tmp_path, proc_cgroup):
+    write(tmp_path / "cpu.max", "150000 100000\n")
+    write(proc_cgroup, "0::/\n")
+    assert cpu_budget.cgroup_cpu_limit(str(tmp_path), str(proc_cgroup)) == 1.5
+
+
+def test_v2_unlimited(tmp_path, proc_cgroup):
+    write(tmp_path / "cpu.max", "max 100000\n")
+    write(proc_cgroup, "0::/\n")
+    assert cpu_budget.cgroup_cpu_limit(str(tmp_path), str(proc_cgroup)) is None
+
+
+def test_v2_nested_cgroup_is_honoured(tmp_path, proc_cgroup):
+    write(tmp_path / "system.slice" / "cpu.max", "400000 100000\n")
+    write(tmp_path / "system.slice" / "ml.service" / "cpu.max", "200000 100000\n")
+    write(proc_cgroup, "0::/system.slice/ml.service\n")
+    assert cpu_budget.cgroup_cpu_limit(str(tmp_path), str(proc_cgroup)) == 2.0
+
+
+def test_v2_parent_quota_caps_child(tmp_path, proc_cgroup):
+    write(tmp_path / "kubepods" / "cpu.max", "100000 100000\n")
+    write(tmp_path / "kubepods" / "pod1" / "cpu.max", "max 100000\n")
+    write(proc_cgroup, "0::/kubepods/pod1\n")
+    assert cpu_budget.cgroup_cpu_limit(str(tmp_path), str(proc_cgroup)) == 1.0
+
+
+def test_v1_nested_cgroup(tmp_path, proc_cgroup):
+    write(tmp_path / "cpu" / "cpu.cfs_quota_us", "-1\n")
+    write(tmp_path / "cpu" / "cpu.cfs_period_us", "100000\n")
+    write(tmp_path / "cpu" / "docker" / "abc" / "cpu.cfs_quota_us", "300000\n")
+    write(tmp_path / "cpu" / "docker" / "abc" / "cpu.cfs_period_us", "100000\n")
+    write(proc_cgroup, "4:memory:/docker/abc\n2:cpu,cpuacct:/docker/abc\n0::/\n")
+    assert cpu_budget.cgroup_cpu_limit(str(tmp_path), str(proc_cgroup)) == 3.0
+
+
+def test_without_proc_cgroup_reads_the_mount_point(tmp_path):
+    write(tmp_path / "cpu.max", "200000 100000\n")
+    assert cpu_budget.cgroup_cpu_limit(str(tmp_path), str(tmp_path / "missing")) == 2.0
+
+
+@pytest.fixture
+def host(monkeypatch):
+    def set_host(affinity, quota, override=None):
+        monkeypatch.setattr(cpu_budget, "affinity_cores", lambda: affinity)
+        monkeypatch.setattr(cpu_budget, "cgroup_cpu_limit", lambda: quota)
+        if override is None:
+            monkeypatch.delenv(cpu_budget.ENV_VAR, raising=False)
+        else:
+            monkeypatch.setenv(cpu_budget.ENV_VAR, str(override))
+    return set_host
+
+
+def test_override_cannot_exceed_quota(host):
+    host(affinity=16, quota=2.0, override=8)
+    cores, details = cpu_budget.resolve_cpu_budget()
+    assert cores == 2
+    assert details["source"] == "cgroup" and details["override_clamped"]
+
+
+def test_override_cannot_exceed_affinity(host):
+    host(affinity=4, quota=None, override=8)
+    assert cpu_budget.resolve_cpu_budget()[0] == 4
+
+
+def test_override_can_lower_the_budget(host):
+    host(affinity=16, quota=4.0, override=2)
+    cores, details = cpu_budget.resolve_cpu_budget()
+    assert cores == 2
+    assert details["source"] == "override" and not details["override_clamped"]
+
+
+def test_override_equal_to_quota_is_not_clamped(host):
+    host(affinity=16, quota=2.0, override=2)
+    assert cpu_budget.resolve_cpu_budget()[1]["source"] == "override"
+
+
+def test_fractional_quota_rounds_up(host):
+    host(affinity=16, quota=1.5)
+    assert cpu_budget.resolve_cpu_budget() == (2, {"affinity": 16, "cgroup_quota": 1.5, "override": None,
+                                                   "source": "cgroup", "override_clamped": False})
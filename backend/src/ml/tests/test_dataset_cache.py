@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+import sklearn
+from sklearn.preprocessing import StandardScaler
+
+import dataset_cache
+import train_crop_model
+import train_labour_model_v2
+
+CONFIG = {"generator": "demo", "seed": 42}
+
+
+def build_arrays():
+    rng = np.random.default_rng(0)
+    dense = rng.normal(size=(50, 4))
+    scaler = StandardScaler().fit(dense)
+    return {
+        "X": dense,
+        "labels": np.array(["rice", "wheat"] * 25, dtype=object),
+        "M": sp.random(50, 300, density=0.02, format="csr", random_state=0),
+    }, {"scaler": scaler}
+
+
+def test_round_trip_dense_sparse_and_artifacts(tmp_path):
+    arrays, artifacts = build_arrays()
+    key = dataset_cache.cache_key("demo", CONFIG)
+    dataset_cache.save_entry("demo", key, arrays, artifacts, config=CONFIG, cache_dir=str(tmp_path))
+    loaded, loaded_artifacts = dataset_cache.load_entry("demo", key, cache_dir=str(tmp_path))
+
+    assert isinstance(loaded["X"], np.memmap)
+    np.testing.assert_array_equal(loaded["X"], arrays["X"])
+    assert loaded["labels"].tolist() == arrays["labels"].tolist()
+    assert sp.issparse(loaded["M"]) and loaded["M"].format == "csr"
+    assert (loaded["M"] != arrays["M"]).nnz == 0
+    np.testing.assert_array_equal(loaded_artifacts["scaler"].transform(loaded["X"]),
+                                  artifacts["scaler"].transform(arrays["X"]))
+
+
+def test_missing_entry_is_a_miss(tmp_path):
+    assert dataset_cache.load_entry("demo", "0" * 32, cache_dir=str(tmp_path)) is None
+
+
+def test_cached_matrices_builds_once(tmp_path):
+    calls = []
+
+    def build():
+        calls.append(1)
+        return build_arrays()
+
+    cold, _ = dataset_cache.cached_matrices("demo", CONFIG, build, cache_dir=str(tmp_path), use_cache=True)
+    warm, _ = dataset_cache.cached_matrices("demo", CONFIG, build, cache_dir=str(tmp_path), use_cache=True)
+    assert len(calls) == 1
+    np.testing.assert_array_equal(cold["X"], warm["X"])
+
+
+def test_edited_build_function_is_a_miss(tmp_path):
+    calls = []
+
+    def build():
+        calls.append("old")
+        return build_arrays()
+
+    def edited_build():
+        calls.append("edited")
+        arrays, artifacts = build_arrays()
+        return dict(arrays, X=arrays["X"] * 2), artifacts
+
+    dataset_cache.cached_matrices("demo", CONFIG, build, cache_dir=str(tmp_path), use_cache=True)
+    edited, _ = dataset_cache.cached_matrices("demo", CONFIG, edited_build, cache_dir=str(tmp_path), use_cache=True)
+    assert calls == ["old", "edited"]
+    np.testing.assert_array_equal(edited["X"], build_arrays()[0]["X"] * 2)
+
+
+def test_edited_labour_preprocessor_is_a_miss(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    path = str(tmp_path / "labour.csv")
+    train_labour_model_v2.create_labour_dataset(100, seed=5).to_csv(path, index=False)
+    cached, _ = train_labour_model_v2.prepare_matrices(path, use_cache=True, sparse=False)
+
+    def build_preprocessor(cat_cols, num_cols, sparse=False):
+        return train_labour_model_v2.ColumnTransformer(
+            [("num", train_labour_model_v2.StandardScaler(), num_cols)], sparse_threshold=0.0)
+
+    monkeypatch.setattr(train_labour_model_v2, "build_preprocessor", build_preprocessor)
+    numeric_only, _ = train_labour_model_v2.prepare_matrices(path, use_cache=True, sparse=False)
+    assert numeric_only["X_train"].shape[1] < cached["X_train"].shape[1]
+
+
+def test_key_depends_on_config_and_namespace():
+    key = dataset_cache.cache_key("demo", CONFIG)
+    assert key == dataset_cache.cache_key("demo", dict(CONFIG))
+    assert key != dataset_cache.cache_key("demo", dict(CONFIG, seed=43))
+    assert key != dataset_cache.cache_key("other", CONFIG)
+
+
+@pytest.mark.parametrize("module, attribute", [
+    (np, "__version__"), (sklearn, "__version__"), (dataset_cache.pd, "__version__"),
+])
+def test_key_changes_with_library_versions(monkeypatch, module, attribute):
+    key = dataset_cache.cache_key("demo", CONFIG)
+    monkeypatch.setattr(module, attribute, "0.0.0")
+    assert dataset_cache.cache_key("demo", CONFIG) != key
+
+
+def test_key_changes_with_python_version(monkeypatch):
+    key = dataset_cache.cache_key("demo", CONFIG)
+    monkeypatch.setattr(dataset_cache.platform, "python_version", lambda: "2.7.18")
+    assert dataset_cache.cache_key("demo", CONFIG) != key
+
+
+def test_crop_matrices_cold_equal_warm(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_cache, "CACHE_DIR", str(tmp_path))
+    fresh, _ = train_crop_model.prepare_matrices(20, use_cache=False)
+    cold, _ = train_crop_model.prepare_matrices(20, use_cache=True)
+    warm, artifacts = train_crop_model.prepare_matrices(20, use_cache=True)
+    for name in fresh:
+        np.testing.assert_array_equal(np.asarray(cold[name]), np.asarray(fresh[name]))
+        np.testing.assert_array_equal(np.asarray(warm[name]), np.asarray(fresh[name]))
+    assert "scaler" in artifacts
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_labour_matrices_cold_equal_warm(tmp_path, monkeypatch, sparse):
+    monkeypatch.setattr(dataset_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    path = str(tmp_path / "labour.csv")
+    train_labour_model_v2.create_labour_dataset(300, seed=5).to_csv(path, index=False)
+    fresh, _ = train_labour_model_v2.prepare_matrices(path, use_cache=False, sparse=sparse)
+    cold, _ = train_labour_model_v2.prepare_matrices(path, use_cache=True, sparse=sparse)
+    warm, _ = train_labour_model_v2.prepare_matrices(path, use_cache=True, sparse=sparse)
+    assert sp.issparse(warm["X_train"]) == sparse
+    for name in fresh:
+        expected = fresh[name].toarray() if sp.issparse(fresh[name]) else np.asarray(fresh[name])
+        for got in (cold[name], warm[name]):
+            np.testing.assert_array_equal(got.toarray() if sp.issparse(got) else np.asarray(got), expected)
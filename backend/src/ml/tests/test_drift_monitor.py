@@ -0,0 +1,108 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import drift_monitor
+from drift_monitor import CategoricalSketch, DriftMonitor
+
+
+def training_frame(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "rainfall": rng.normal(1000, 200, n),
+        "soil": rng.choice(["Clay", "Loamy", "Sandy"], n, p=[0.5, 0.3, 0.2]),
+    })
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    return drift_monitor.capture_baseline(training_frame(), numeric_cols=["rainfall"], categorical_cols=["soil"])
+
+
+def monitor_over(baseline, frame):
+    monitor = DriftMonitor("test", baseline, report_every=0)
+    for row in frame.to_dict("records"):
+        monitor.update(row)
+    return monitor
+
+
+def test_baseline_bins_hold_equal_shares(baseline):
+    rainfall = baseline["features"]["rainfall"]
+    assert len(rainfall["edges"]) == 9
+    # The outer bins take their share between the extreme quantile and the min/max
+    np.testing.assert_allclose(rainfall["expected"], 0.1, atol=0.002)
+    assert baseline["features"]["soil"]["expected"] == pytest.approx({"Clay": 0.5, "Loamy": 0.3, "Sandy": 0.2},
+                                                                     abs=0.02)
+    json.dumps(baseline)
+
+
+def test_same_distribution_is_stable(baseline):
+    scores = monitor_over(baseline, training_frame(seed=1)).scores()
+    assert scores["updates"] == 5000
+    assert scores["max_psi"] < 0.02
+    assert {f["status"] for f in scores["features"].values()} == {"stable"}
+
+
+def test_shifted_distribution_is_flagged(baseline):
+    frame = training_frame(seed=2)
+    frame["rainfall"] += 200
+    frame["soil"] = np.random.default_rng(3).choice(["Clay", "Loamy", "Sandy"], len(frame), p=[0.2, 0.3, 0.5])
+    scores = monitor_over(baseline, frame).scores()
+    assert scores["features"]["rainfall"]["status"] == "significant"
+    assert scores["features"]["soil"]["status"] == "significant"
+    assert scores["features"]["rainfall"]["overflow"] > 0.1 * 5000
+
+    frame = training_frame(seed=4)
+    # A 0.4 standard deviation shift lands between the two thresholds
+    frame["rainfall"] += 80
+    scores = monitor_over(baseline, frame).scores()
+    assert scores["features"]["rainfall"]["status"] == "moderate"
+    assert scores["features"]["soil"]["status"] == "stable"
+
+
+def test_missing_numeric_values_are_counted_not_binned(baseline):
+    monitor = monitor_over(baseline, pd.DataFrame({"rainfall": [None, "n/a", float("nan"), 1000.0]}))
+    score = monitor.scores()["features"]["rainfall"]
+    assert score["missing"] == 3 and score["observed"] == 1
+
+
+def test_unseen_categories_stay_within_capacity():
+    sketch = CategoricalSketch({"type": "categorical", "expected": {"Clay": 1.0}}, capacity=8)
+    rng = np.random.default_rng(5)
+    # Two heavy unseen values among 10 000 distinct one-off values
+    stream = [f"rare-{i}" for i in range(10_000)] + ["Peat"] * 6000 + ["Chalk"] * 4000
+    for i in rng.permutation(len(stream)):
+        sketch.update(stream[i])
+        assert len(sketch.unseen) <= 8
+    score = sketch.score()
+    assert sketch.unseen_total == 20_000 and score["unseen_share"] == 1.0
+    assert score["unseen_heavy_hitters"][:2] == ["Peat", "Chalk"]
+
+
+def test_state_round_trip(baseline):
+    frame = training_frame(seed=6)
+    monitor = monitor_over(baseline, frame)
+    restored = DriftMonitor("test", baseline, report_every=0)
+    restored.restore(json.loads(json.dumps(monitor.state())))
+    assert restored.scores() == monitor.scores()
+
+
+def test_report_every_writes_the_report(baseline, tmp_path):
+    path = tmp_path / "drift.json"
+    monitor = DriftMonitor("test", baseline, report_every=100, report_path=str(path))
+    for row in training_frame(250, seed=7).to_dict("records"):
+        monitor.update(row)
+    report = json.loads(path.read_text())
+    assert report["updates"] == 200 and report["model"] == "test"
+
+
+@pytest.mark.parametrize("model", ["crop", "yield", "labour"])
+def test_trainers_save_a_baseline(model_dir, model):
+    monitor = DriftMonitor.for_model(model, model_dir, report_every=0)
+    assert monitor is not None and monitor.sketches
+
+
+def test_no_baseline_gives_no_monitor(tmp_path):
+    assert DriftMonitor.for_model("crop", str(tmp_path)) is None
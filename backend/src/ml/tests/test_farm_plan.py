@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ML_DIR
+
+import farm_plan
+
+REQUEST = {
+    "N": 80, "P": 40, "K": 40, "temperature": 25, "humidity": 80, "ph": 6.5, "rainfall": 200,
+    "State": "Punjab", "Year": 2024, "Season": "Kharif", "Area": 10, "top_n": 3,
+}
+
+
+def run_script(model_dir, payload):
+    env = dict(os.environ, ML_MODEL_DIR=model_dir)
+    env.pop("PREDICTION_LOG_DIR", None)
+    return subprocess.run([sys.executable, os.path.join(ML_DIR, "farm_plan.py")],
+                          input=json.dumps(payload), capture_output=True, text=True, env=env)
+
+
+def test_script_writes_nothing_to_stderr(model_dir):
+    # The controller treats any stderr output as a failed pipeline
+    output = run_script(model_dir, REQUEST)
+    assert output.returncode == 0
+    assert output.stderr == ""
+    plan = json.loads(output.stdout)
+    assert plan["success"] is True
+    assert len(plan["plan"]) == 3
+    # The plan request has no ML-only labour features, so labour stays heuristic
+    assert {entry["labour"]["method"] for entry in plan["plan"]} == {"heuristic"}
+
+
+def test_plan_chains_crop_into_yield_and_labour(trained_registry, monkeypatch):
+    monkeypatch.setattr(farm_plan.labour, "HAS_ML_MODEL", True)
+    plan = farm_plan.build_plan(dict(REQUEST, top_n=2))
+    assert plan["success"] is True
+    assert plan["plan"][0]["crop"] == plan["recommended_crop"]
+    for entry in plan["plan"]:
+        assert entry["labour"]["crop_type"] == farm_plan.yield_crop_name(entry["crop"])
+        assert entry["labour"]["area_hectares"] == REQUEST["Area"]
+        assert "predicted_production" in entry["yield"]
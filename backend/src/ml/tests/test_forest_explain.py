@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+import predict
+from forest_explain import ForestExplainer, column_groups
+from train_labour_model_v2 import FEATURE_COLUMNS, create_labour_dataset
+
+
+def mixed_frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "size": rng.uniform(1, 50, n),
+        "rain": rng.uniform(300, 1500, n),
+        "soil": rng.choice(["Clay", "Loamy", "Sandy", "Silt"], n),
+        "region": rng.choice(["North", "South", "East"], n),
+    })
+    target = 2 * frame["size"] + (frame["soil"] == "Clay") * 15 + frame["rain"] / 100 + rng.normal(0, 2, n)
+    return frame, target.to_numpy()
+
+
+@pytest.fixture(scope="module")
+def encoded():
+    frame, target = mixed_frame(400)
+    preprocessor = ColumnTransformer([
+        ("num", StandardScaler(), ["size", "rain"]),
+        ("cat", OneHotEncoder(handle_unknown="ignore"), ["soil", "region"]),
+    ])
+    features = preprocessor.fit_transform(frame)
+    return preprocessor, features, target, list(frame.columns)
+
+
+def test_column_groups_map_one_hot_columns_back(encoded):
+    preprocessor, features, _, _ = encoded
+    groups = column_groups(preprocessor)
+    assert len(groups) == features.shape[1]
+    assert groups == ["size", "rain"] + ["soil"] * 4 + ["region"] * 3
+
+
+def test_regressor_contributions_add_up_to_the_prediction(encoded):
+    preprocessor, features, target, names = encoded
+    forest = RandomForestRegressor(n_estimators=15, max_depth=8, random_state=0).fit(features, target)
+    explainer = ForestExplainer.from_forest(forest, names, column_groups(preprocessor))
+    contributions = explainer.contributions(forest, features)
+    assert contributions.shape == (features.shape[0], len(names), 1)
+    total = explainer.base_value[0] + contributions[:, :, 0].sum(axis=1)
+    np.testing.assert_allclose(total, forest.predict(features), rtol=1e-10)
+    # The target moves most with size
+    mean_abs = np.abs(contributions[:, :, 0]).mean(axis=0)
+    assert names[int(mean_abs.argmax())] == "size"
+
+
+def test_classifier_contributions_add_up_to_the_probabilities(encoded):
+    preprocessor, features, target, names = encoded
+    labels = np.digitize(target, np.quantile(target, [0.33, 0.66]))
+    labels = np.array(["Low", "Medium", "High"])[labels]
+    forest = RandomForestClassifier(n_estimators=15, max_depth=6, random_state=0).fit(features, labels)
+    explainer = ForestExplainer.from_forest(forest, names, column_groups(preprocessor))
+    contributions = explainer.contributions(forest, features)
+    total = explainer.base_value + contributions.sum(axis=1)
+    np.testing.assert_allclose(total, forest.predict_proba(features), atol=1e-12)
+
+    blocks = explainer.explain(forest, features[:5])
+    probabilities = forest.predict_proba(features[:5])
+    for block, row in zip(blocks, probabilities):
+        k = explainer.classes.index(block["class"])
+        assert k == row.argmax()
+        assert block["base_value"] + sum(block["contributions"].values()) == pytest.approx(row[k], abs=1e-5)
+        values = list(block["contributions"].values())
+        assert [abs(v) for v in values] == sorted((abs(v) for v in values), reverse=True)
+
+
+def test_explainer_rejects_a_different_forest(encoded):
+    _, features, target, names = encoded
+    groups = ["size", "rain"] + ["soil"] * 4 + ["region"] * 3
+    forest = RandomForestRegressor(n_estimators=5, random_state=0).fit(features, target)
+    other = RandomForestRegressor(n_estimators=5, random_state=1).fit(features, target)
+    explainer = ForestExplainer.from_forest(forest, names, groups)
+    with pytest.raises(ValueError, match="different forest"):
+        explainer.contributions(other, features)
+
+
+def test_crop_explanations_add_up_to_the_recommended_probability(trained_registry):
+    artifacts = predict.load_artifacts()
+    rows = [{"N": 90, "P": 42, "K": 43, "temperature": 21, "humidity": 82, "ph": 6.5, "rainfall": 203},
+            {"N": 20, "P": 60, "K": 20, "temperature": 30, "humidity": 50, "ph": 7.0, "rainfall": 60}]
+    for result in predict.predict_crop_batch(rows, artifacts, explain=True):
+        block = result["explanations"]
+        assert block["class"] == result["recommended_crop"]
+        assert set(block["contributions"]) == set(predict.FEATURE_NAMES)
+        assert block["base_value"] + sum(block["contributions"].values()) == pytest.approx(
+            result["confidence"], abs=1e-4)
+
+
+def test_crop_without_explainer_reports_unavailable(trained_registry):
+    artifacts = dict(predict.load_artifacts(), explainer=None)
+    row = {"N": 90, "P": 42, "K": 43, "temperature": 21, "humidity": 82, "ph": 6.5, "rainfall": 203}
+    result = predict.predict_crop_batch([row], artifacts, explain=True)[0]
+    assert result["explanations"] == predict.EXPLAINER_NOT_FOUND
+
+
+def test_labour_explanations_add_up_to_both_predictions(trained_registry):
+    recommender = trained_registry.get("labour")["model"]
+    frame = create_labour_dataset(3, seed=5)[FEATURE_COLUMNS]
+    for result in recommender.predict(frame, explain=True):
+        reg = result["explanations"]["Labour_Required"]
+        assert reg["base_value"] + sum(reg["contributions"].values()) == pytest.approx(
+            result["Labour_Required"], rel=1e-5)
+        cls = result["explanations"]["Labour_Demand_Level"]
+        assert cls["class"] == result["Labour_Demand_Level"]
+        assert set(reg["contributions"]) == set(recommender.feature_columns)
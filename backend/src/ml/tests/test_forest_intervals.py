@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.ensemble import RandomForestRegressor
+
+import forest_intervals
+import predict_yield
+
+ROW = {"Crop": "Rice", "State": "Punjab", "Season": "Kharif", "Year": 2020, "Area": 10,
+       "Rainfall": 900, "Temperature": 27, "Fertilizer": 120, "Pesticide": 1.5}
+
+
+def noisy_regression(n, seed):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(-2, 2, size=(n, 4))
+    # Noise grows with the first feature, so a fixed-width band would not do
+    y = 10 + 3 * X[:, 0] + X[:, 1] ** 2 + rng.normal(0, 0.5 + 0.5 * np.abs(X[:, 0]))
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def forest():
+    X, y = noisy_regression(1500, seed=0)
+    return RandomForestRegressor(n_estimators=40, min_samples_leaf=3, random_state=0, n_jobs=2).fit(X, y)
+
+
+def test_mean_is_the_forest_prediction(forest):
+    X, _ = noisy_regression(200, seed=1)
+    mean, std = forest_intervals.forest_mean_std(forest, X)
+    np.testing.assert_allclose(mean, forest.predict(X), rtol=1e-10)
+    per_tree = np.stack([tree.predict(X.astype(np.float32)) for tree in forest.estimators_])
+    np.testing.assert_allclose(std, per_tree.std(axis=0), rtol=1e-6, atol=1e-9)
+
+
+def test_sparse_input_matches_dense(forest):
+    X, _ = noisy_regression(100, seed=2)
+    dense = forest_intervals.forest_mean_std(forest, X)
+    csr = forest_intervals.forest_mean_std(forest, sparse.csr_matrix(X))
+    np.testing.assert_allclose(dense, csr)
+
+
+def test_calibrated_coverage_on_held_out_rows(forest):
+    X_cal, y_cal = noisy_regression(1000, seed=3)
+    X_new, y_new = noisy_regression(4000, seed=4)
+    for coverage in (0.8, 0.9, 0.95):
+        calibration = forest_intervals.calibrate(forest, X_cal, y_cal, coverage=coverage)
+        assert calibration["n_calibration"] == 1000 and calibration["factor"] > 0
+        bounds = forest_intervals.prediction_intervals(*forest_intervals.forest_mean_std(forest, X_new), calibration)
+        inside = np.mean((y_new >= bounds["lower"]) & (y_new <= bounds["upper"]))
+        assert bounds["calibrated"] and bounds["coverage"] == coverage
+        # Split conformal gives at least the target on exchangeable data; 4000
+        # rows keep the sampling error to about a percentage point
+        assert coverage - 0.025 <= inside <= coverage + 0.04
+
+
+def test_intervals_are_wider_where_trees_disagree():
+    calibration = {"coverage": 0.9, "factor": 2.0, "epsilon": 0.1}
+    mean = np.array([100.0, 100.0])
+    bounds = forest_intervals.prediction_intervals(mean, np.array([1.0, 5.0]), calibration)
+    np.testing.assert_allclose(bounds["lower"], [97.8, 89.8])
+    np.testing.assert_allclose(bounds["upper"], [102.2, 110.2])
+
+
+def test_confidence_labels_follow_the_relative_half_width():
+    low, high = forest_intervals.CONFIDENCE_BOUNDS
+    calibration = {"coverage": 0.9, "factor": 1.0, "epsilon": 0.0}
+    std = np.array([low - 0.01, low, high, high + 0.01]) * 100
+    bounds = forest_intervals.prediction_intervals(np.full(4, 100.0), std, calibration)
+    assert list(bounds["confidence"]) == ["High", "High", "Medium", "Low"]
+    np.testing.assert_allclose(bounds["uncertainty"], std / 100)
+
+
+def test_uncalibrated_intervals_use_the_normal_multiplier():
+    bounds = forest_intervals.prediction_intervals(np.array([50.0]), np.array([2.0]), coverage=0.95)
+    assert not bounds["calibrated"] and bounds["coverage"] == 0.95
+    np.testing.assert_allclose(bounds["upper"] - 50.0, [1.96 * 2.0])
+
+
+def test_trained_yield_model_is_calibrated(trained_registry):
+    artifacts = predict_yield.load_artifacts()
+    calibration = artifacts["calibration"]
+    assert calibration["coverage"] == forest_intervals.DEFAULT_COVERAGE
+    # 600 synthetic rows leave 60 held-out rows for the coverage check
+    assert calibration["holdout_coverage"] >= 0.75
+
+    result = predict_yield.predict_yield(ROW, artifacts)
+    interval = result["prediction_interval"]
+    assert interval["calibrated"]
+    assert 0 <= interval["lower"] <= result["predicted_production"] <= interval["upper"]
@@ -0,0 +1,156 @@
+import numpy as np
+import pytest
+
+import labour_assignment as la
+import smart_labour_recommendation as labour
+
+
+def js_match_score(skills, experience, location, labour):
+    """Line-by-line port of the match score in labourController.recommendLabour"""
+    score = 0.0
+    if skills and isinstance(labour.get("skills"), list) and labour["skills"] is not None:
+        required = [s.strip() for s in skills.lower().split(",")]
+        offered = [s.lower() for s in labour["skills"]]
+        matched = [r for r in required if any(o in r or r in o for o in offered)]
+        score += len(matched) / len(required) * 40 if required else 40
+    else:
+        score += 40
+
+    min_exp = int(float(experience)) if experience else 0  # parseInt
+    exp = labour.get("experience") or 0
+    if exp >= min_exp:
+        score += min(25, exp / max(min_exp, 1) * 12.5)
+    else:
+        score += max(0, 25 - (min_exp - exp) / min_exp * 15)
+
+    labour_location = labour.get("location")
+    if location and (labour_location or isinstance(labour_location, dict)):
+        req = location.lower().strip()
+        if isinstance(labour_location, dict):
+            lab = (labour_location.get("city") or labour_location.get("state") or "").lower()
+        else:
+            lab = labour_location.lower()
+        score += 20 if req in lab or lab in req else 10
+    else:
+        score += 15
+
+    score += (labour.get("rating") or 4.0) / 5 * 10
+    score += 5 if (labour.get("availability") or "Available") == "Available" else 2
+    return score
+
+
+LABOURERS = [
+    {"skills": ["Harvesting", "sowing"], "experience": 4, "rating": 4.5, "location": {"city": "Ludhiana"}},
+    {"experience": 2, "location": {"state": "Punjab"}},                      # no skills list
+    {"skills": [], "experience": 0, "location": {}},                         # empty skills, empty location
+    {"skills": ["tractor driving"], "experience": 9, "rating": 0, "availability": "Limited"},
+    {"skills": [" spraying"], "experience": 1, "location": "ludhiana district"},
+    {"skills": ["weeding"], "experience": 3, "location": ""},
+    {"skills": "harvesting", "experience": 5, "location": {"city": None, "state": "Haryana"}},
+]
+
+JOBS = [
+    {"skills": "harvesting, sowing", "experience": 2, "location": "Ludhiana"},
+    {"skills": "spraying", "experience": 5, "location": "Punjab"},
+    {"skills": "", "experience": 0, "location": ""},
+    {"skills": "driving,,", "experience": "3.7", "location": "ludhiana"},
+    {"skills": "weeding", "experience": 0},
+]
+
+
+@pytest.mark.parametrize("job_index", range(len(JOBS)))
+def test_scores_match_recommend_labour(job_index):
+    job = JOBS[job_index]
+    scorer = la.MatchScorer(JOBS, LABOURERS)
+    scores = scorer.score(np.array([job_index]))[0]
+    expected = [js_match_score(job["skills"], job["experience"], job.get("location"), l) for l in LABOURERS]
+    np.testing.assert_allclose(scores, expected, rtol=1e-6)
+
+
+def test_missing_skills_and_empty_location_get_full_points():
+    job = {"skills": "harvesting", "location": "Ludhiana"}
+    scores = la.MatchScorer([job], [{"location": {}}, {"skills": [], "location": {}}]).score(np.array([0]))[0]
+    # Skills 40 + experience 0 + location 20 + rating 8 + availability 5, then no skill match
+    np.testing.assert_allclose(scores, [73, 33])
+
+
+def test_job_location_object_tries_each_place():
+    job = {"location": {"village": "Khanna", "district": "Ludhiana", "state": "Punjab"}}
+    labourers = [{"location": {"state": "punjab"}}, {"location": {"city": "Amritsar"}}, {}]
+    scores = la.MatchScorer([job], labourers).score(np.array([0]))[0]
+    location = scores - (40 + 8 + 5)
+    np.testing.assert_allclose(location, [20, 10, 15])
+
+
+def test_random_requests_match_recommend_labour():
+    rng = np.random.default_rng(7)
+    skills = ["harvesting", "sowing", "spraying", "tractor driving", "weeding", "Harvest"]
+    places = ["Ludhiana", "Punjab", "Karnal", "haryana", ""]
+    jobs = [{"skills": ",".join(rng.choice(skills, rng.integers(0, 3), replace=False)),
+             "experience": int(rng.integers(0, 6)),
+             "location": places[rng.integers(len(places))]} for _ in range(40)]
+    labourers = []
+    for _ in range(60):
+        person = {"experience": int(rng.integers(0, 10)), "rating": round(float(rng.uniform(0, 5)), 1)}
+        if rng.random() < 0.8:
+            person["skills"] = list(rng.choice(skills, rng.integers(0, 3), replace=False))
+        kind = rng.integers(4)
+        if kind == 1:
+            person["location"] = {"city": places[rng.integers(len(places))]}
+        elif kind == 2:
+            person["location"] = places[rng.integers(len(places))]
+        elif kind == 3:
+            person["location"] = {}
+        labourers.append(person)
+    scores = la.MatchScorer(jobs, labourers).score(np.arange(len(jobs)))
+    expected = [[js_match_score(j["skills"], j["experience"], j["location"], l) for l in labourers] for j in jobs]
+    np.testing.assert_allclose(scores, expected, rtol=1e-5)
+
+
+def brute_force_best(scores, capacities):
+    """Best total score by trying every labourer -> job (or none) mapping"""
+    import itertools
+
+    n_jobs, n_labourers = scores.shape
+    best = 0.0
+    for choice in itertools.product(range(-1, n_jobs), repeat=n_labourers):
+        counts = np.bincount([c for c in choice if c >= 0], minlength=n_jobs)
+        if (counts <= capacities).all():
+            best = max(best, sum(scores[c, l] for l, c in enumerate(choice) if c >= 0))
+    return best
+
+
+def test_solver_finds_the_optimum_on_a_small_problem():
+    rng = np.random.default_rng(3)
+    scores = rng.uniform(20, 100, size=(3, 6)).astype(np.float32)
+    capacities = np.array([2, 1, 2])
+    edge_job, edge_labour = np.divmod(np.arange(scores.size), scores.shape[1])
+    chosen, _ = la.solve_assignment(edge_job, edge_labour, scores.ravel(), capacities)
+    assert np.bincount(edge_labour[chosen], minlength=6).max() <= 1
+    assert (np.bincount(edge_job[chosen], minlength=3) <= capacities).all()
+    assert scores.ravel()[chosen].sum() == pytest.approx(brute_force_best(scores, capacities), rel=1e-5)
+
+
+def test_assign_respects_capacity_and_one_job_per_day(monkeypatch):
+    monkeypatch.setattr(labour, "HAS_ML_MODEL", False)
+    request = la.demo_request(60, 90, n_dates=3, seed=1)
+    result = la.assign(request)
+    seen = set()
+    for job, entry in zip(request["jobs"], result["assignments"]):
+        assert len(entry["assigned"]) <= entry["capacity"]
+        for pick in entry["assigned"]:
+            assert (job["date"], pick["labour_id"]) not in seen
+            seen.add((job["date"], pick["labour_id"]))
+    assert result["summary"]["assigned"] == len(seen)
+    assert result["summary"]["fill_rate"] > 0.9
+
+
+def test_capacity_uses_the_labour_requirement(trained_registry, monkeypatch, capsys):
+    monkeypatch.setattr(labour, "HAS_ML_MODEL", True)
+    jobs = [{"cropType": "Rice", "area": 1.5, "date": "2026-07-02"}, {"workersNeeded": 3}]
+    capacities, sources = la.job_capacities(jobs)
+    # Jobs carry no ML-only labour features, so the heuristic sizes them
+    assert sources == ["heuristic", "workersNeeded"]
+    expected = labour.calculate_labour_requirement("Rice", 1.5, "Kharif")["labour_required"]
+    assert capacities.tolist() == [max(1, expected), 3]
+    assert capsys.readouterr().err == ""
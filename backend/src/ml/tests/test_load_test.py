@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+
+import pytest
+
+import load_test
+from train_labour_model_v2 import FEATURE_COLUMNS
+
+
+@pytest.fixture
+def serving_env(model_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv("PREDICTION_LOG_DIR", str(tmp_path / "log"))
+    monkeypatch.setenv("ML_CPU_BUDGET", "2")
+    return model_dir
+
+
+def test_parse_mix():
+    assert load_test.parse_mix("crop=2,yield") == {"crop": 2.0, "yield": 1.0}
+    with pytest.raises(SystemExit, match="Unknown request type 'maize'"):
+        load_test.parse_mix("crop=1,maize=2")
+
+
+def test_requests_follow_the_mix_and_seed():
+    mix = load_test.parse_mix("crop=3,labour_smart=1")
+    requests = load_test.make_requests(mix, 2000, seed=1)
+    assert requests == load_test.make_requests(mix, 2000, seed=1)
+    share = sum(kind == "crop" for kind, _ in requests) / len(requests)
+    assert share == pytest.approx(0.75, abs=0.03)
+    labour = load_test.make_requests({"labour": 1}, 1, seed=2)[0][1]
+    assert set(labour[0]) == set(FEATURE_COLUMNS)
+
+
+@pytest.mark.parametrize("response, expected", [
+    ({"recommended_crop": "rice"}, None),
+    ({"error": "Model not found"}, "Model not found"),
+    ({"success": False, "message": "bad input"}, "bad input"),
+    ([{"error": "boom"}], "boom"),
+    ([], None),
+])
+def test_response_error(response, expected):
+    assert load_test.response_error("crop", response) == expected
+
+
+def test_read_memory_of_this_process():
+    rss, pss = load_test.read_memory(os.getpid())
+    assert rss > 0 and 0 < pss <= rss
+    assert load_test.read_memory(2**22 + 1) is None
+
+
+class FakeClient:
+    """Sleeps per request and fails every fifth one; tracks peak concurrency"""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def pids(self):
+        return [os.getpid()]
+
+    def connect(self):
+        return object()
+
+    def close(self, conn):
+        pass
+
+    def request(self, conn, kind, payload):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.01)
+        with self.lock:
+            self.active -= 1
+        if payload["i"] % 5 == 0:
+            raise ConnectionError("dropped")
+        return None
+
+
+def test_run_level_counts_errors_and_latency():
+    requests = [("crop" if i % 2 else "yield", {"i": i}) for i in range(40)]
+    client = FakeClient()
+    level = load_test.run_level(client, requests, concurrency=4)
+    assert client.peak == 4
+    assert level["requests"] == 40 and level["concurrency"] == 4
+    assert level["error_rate"] == 0.2
+    assert level["errors"] == ["ConnectionError: dropped"]
+    assert 10 <= level["p50_ms"] <= level["p95_ms"] <= level["p99_ms"] <= level["max_ms"]
+    assert {kind: v["requests"] for kind, v in level["by_type"].items()} == {"crop": 20, "yield": 20}
+    assert level["peak_process_rss_mb"] > 0
+    assert load_test.curves([level])["error_rate"] == [0.2]
+
+
+def test_spawn_mode_serves_every_request_type(serving_env):
+    requests = load_test.make_requests(load_test.parse_mix("crop,yield,labour,labour_smart"), 8, seed=3)
+    level = load_test.run_level(load_test.SpawnClient(serving_env), requests, concurrency=2)
+    assert level["error_rate"] == 0, level["errors"]
+
+
+def test_resident_mode_serves_every_request_type(serving_env):
+    requests = load_test.make_requests(load_test.parse_mix("crop,yield,labour,labour_smart"), 40, seed=4)
+    client = load_test.ResidentClient(serving_env, workers=2)
+    try:
+        level = load_test.run_level(client, requests, concurrency=3)
+    finally:
+        client.shutdown()
+    assert level["error_rate"] == 0, level["errors"]
+    assert level["peak_total_pss_mb"] > 0
@@ -0,0 +1,77 @@
+import joblib
+import pytest
+
+from model_registry import ModelRegistry, default_registry, validate_version, versioned_filename
+
+
+@pytest.fixture
+def registry(tmp_path):
+    reg = ModelRegistry(str(tmp_path))
+    reg.register("demo", {"model": "demo_model.joblib", "scaler": "demo_scaler.joblib"}, required=("model",))
+    joblib.dump({"weights": [1, 2, 3]}, tmp_path / "demo_model.joblib")
+    joblib.dump({"scale": 1.0}, tmp_path / "demo_scaler.joblib")
+    joblib.dump({"weights": [4, 5, 6]}, tmp_path / "demo_model@punjab-rice.v2.joblib")
+    return reg
+
+
+@pytest.mark.parametrize("version", ["punjab-rice", "v2", "2024.10_a", "punjab-rice.v2"])
+def test_valid_versions(version):
+    assert validate_version(version) == version
+
+
+@pytest.mark.parametrize("version", [
+    "../crop_model", "..", "a..b", "sub/dir", "/etc/passwd", "..\\model", "v 2", "", "rice\n", 3, ["v2"],
+])
+def test_invalid_versions_are_rejected(version):
+    with pytest.raises(ValueError):
+        validate_version(version)
+
+
+def test_versioned_filename_rejects_traversal():
+    assert versioned_filename("crop_model.pkl", "v2") == "crop_model@v2.pkl"
+    with pytest.raises(ValueError):
+        versioned_filename("crop_model.pkl", "x/../../../outside")
+
+
+def test_version_falls_back_to_default_roles(registry, tmp_path):
+    paths = registry.resolve("demo", "punjab-rice.v2")
+    assert paths["model"].endswith("demo_model@punjab-rice.v2.joblib")
+    assert paths["scaler"].endswith("demo_scaler.joblib")
+    assert registry.get("demo", "punjab-rice.v2")["model"] == {"weights": [4, 5, 6]}
+
+
+def test_unknown_version_resolves_to_none(registry):
+    assert registry.resolve("demo", "missing") is None
+    assert registry.get("demo", "missing") is None
+
+
+def test_traversal_version_never_loads(registry, tmp_path):
+    # A file outside the model directory that a spliced path could reach
+    outside = tmp_path.parent / "demo_model@x.joblib"
+    joblib.dump({"weights": "outside"}, outside)
+    with pytest.raises(ValueError):
+        registry.get("demo", "../demo_model@x")
+    assert registry.counters["loads"] == 0
+
+
+def test_artifact_outside_model_dir_is_refused(tmp_path):
+    reg = ModelRegistry(str(tmp_path / "models"))
+    reg.register("demo", {"model": "../demo_model.joblib"})
+    joblib.dump({}, tmp_path / "demo_model.joblib")
+    with pytest.raises(ValueError):
+        reg.resolve("demo")
+
+
+def test_predict_scripts_report_invalid_versions(trained_registry):
+    import predict
+    import predict_yield
+
+    with pytest.raises(ValueError):
+        predict.predict_crop({"model_version": "../../etc/passwd"})
+    with pytest.raises(ValueError):
+        predict_yield.predict_yield({"model_version": "../yield"})
+
+
+def test_default_registry_resolves_trained_models(model_dir):
+    reg = default_registry(model_dir)
+    assert reg.available("crop") and reg.available("yield") and reg.available("labour")
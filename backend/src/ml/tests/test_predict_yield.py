@@ -0,0 +1,113 @@
+import json
+import math
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import predict_yield
+from conftest import ML_DIR
+
+ROW = {"Crop": "Rice", "State": "Punjab", "Season": "Kharif", "Year": 2020, "Area": 10,
+       "Rainfall": 900, "Temperature": 27, "Fertilizer": 120, "Pesticide": 1.5}
+
+
+@pytest.fixture
+def artifacts(trained_registry):
+    return predict_yield.load_artifacts()
+
+
+@pytest.mark.parametrize("field", predict_yield.REQUIRED)
+def test_missing_required_field_is_rejected(artifacts, field):
+    row = {k: v for k, v in ROW.items() if k != field}
+    with pytest.raises(ValueError, match=field):
+        predict_yield.predict_yield_batch([row], artifacts)
+
+
+def test_null_required_field_is_rejected(artifacts):
+    with pytest.raises(ValueError, match="row 1: missing required field\\(s\\): Year, Rainfall"):
+        predict_yield.predict_yield_batch([ROW, dict(ROW, Year=None, Rainfall=None)], artifacts)
+
+
+@pytest.mark.parametrize("area", [0, -3])
+def test_non_positive_area_is_rejected(artifacts, area):
+    with pytest.raises(ValueError, match="Area must be greater than 0"):
+        predict_yield.predict_yield(dict(ROW, Area=area), artifacts)
+
+
+def test_optional_fields_take_defaults(artifacts):
+    row = {k: v for k, v in ROW.items() if k not in ("Temperature", "Fertilizer", "Pesticide")}
+    defaulted = dict(ROW, **predict_yield.DEFAULTS)
+    assert predict_yield.predict_yield(row, artifacts) == predict_yield.predict_yield(defaulted, artifacts)
+
+
+def test_batch_matches_single_predictions(artifacts):
+    rows = [dict(ROW, Area=a, Rainfall=r) for a, r in [(2, 600), (10, 900), (55, 1300)]]
+    assert predict_yield.predict_yield_batch(rows, artifacts) == [
+        predict_yield.predict_yield(row, artifacts) for row in rows]
+
+
+def test_sweep_matches_point_predictions(artifacts):
+    data = dict(ROW, sweep={"Rainfall": [700, 1000], "Area": {"start": 5, "stop": 15, "num": 3}})
+    result = predict_yield.predict_yield_sweep(data, artifacts)
+    assert result["shape"] == [2, 3]
+    for i, rainfall in enumerate(result["axes"]["Rainfall"]):
+        for j, area in enumerate(result["axes"]["Area"]):
+            single = predict_yield.predict_yield(dict(ROW, Rainfall=rainfall, Area=area), artifacts)
+            assert result["predicted_production"][i][j] == single["predicted_production"]
+
+
+@pytest.mark.parametrize("axis", [[0, 5, 10], {"start": 0, "stop": 10, "num": 3}, [-1, 2]])
+def test_sweep_rejects_non_positive_area(artifacts, axis):
+    with pytest.raises(ValueError, match="Area"):
+        predict_yield.predict_yield_sweep(dict(ROW, sweep={"Area": axis}), artifacts)
+
+
+@pytest.mark.parametrize("sweep", [
+    {"Rainfall": {"start": 100, "stop": 2000, "num": 100_000_000}},
+    {"Rainfall": {"start": 100, "stop": 2000, "num": 600}, "Fertilizer": list(range(600))},
+    {"Rainfall": {"start": 100, "stop": 2000, "num": -3}, "Fertilizer": {"start": 1, "stop": 2, "num": -3}},
+    {"Rainfall": []},
+])
+def test_sweep_size_is_checked_before_building_axes(artifacts, sweep, monkeypatch):
+    def never(spec):
+        raise AssertionError("axis built before the size check")
+
+    monkeypatch.setattr(predict_yield, "sweep_axis", never)
+    with pytest.raises(ValueError, match="sweep grid has"):
+        predict_yield.predict_yield_sweep(dict(ROW, sweep=sweep), artifacts)
+
+
+def test_sweep_axis_must_be_a_list_or_range(artifacts):
+    with pytest.raises(ValueError, match="list of values"):
+        predict_yield.predict_yield_sweep(dict(ROW, sweep={"Rainfall": 900}), artifacts)
+
+
+def test_sweep_over_area_does_not_need_a_base_area(artifacts):
+    data = {k: v for k, v in ROW.items() if k != "Area"}
+    result = predict_yield.predict_yield_sweep(dict(data, sweep={"Area": [1, 2]}), artifacts)
+    assert all(math.isfinite(v) for v in result["yield_per_hectare"])
+
+
+def test_script_reports_missing_fields_and_logs_sweeps(model_dir, tmp_path):
+    import prediction_log
+
+    env = dict(os.environ, ML_MODEL_DIR=model_dir, PREDICTION_LOG_DIR=str(tmp_path))
+
+    def run(payload):
+        output = subprocess.run([sys.executable, os.path.join(ML_DIR, "predict_yield.py")],
+                                input=json.dumps(payload), capture_output=True, text=True, env=env)
+        assert output.stderr == ""
+        return json.loads(output.stdout)
+
+    error = run({k: v for k, v in ROW.items() if k != "Rainfall"})
+    assert "missing required field(s): Rainfall" in error["error"]
+
+    sweep = run(dict(ROW, sweep={"Fertilizer": list(np.linspace(50, 250, 5))}))
+    assert sweep["points"] == 5
+    logged = prediction_log.read_log(str(tmp_path), model="yield_sweep", include_open=True)
+    assert len(logged) == 1
+    outputs = json.loads(logged["outputs"][0])
+    assert outputs["points"] == 5 and "predicted_production" not in outputs
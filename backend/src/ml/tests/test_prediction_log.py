@@ -0,0 +1,147 @@
+import glob
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import predict
+import prediction_log
+from conftest import ML_DIR
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def log_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("PREDICTION_LOG_DIR", str(tmp_path))
+    monkeypatch.setattr(prediction_log, "_log", None)
+    monkeypatch.setattr(prediction_log, "_resident", False)
+    return tmp_path
+
+
+def parquet_files(log_dir):
+    return sorted(glob.glob(os.path.join(log_dir, "*.parquet")))
+
+
+def test_import_does_not_load_pyarrow_or_pandas():
+    code = "import sys, prediction_log; print(any(m.split('.')[0] in ('pyarrow', 'pandas') for m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ML_DIR)
+    assert output.stdout.strip() == "False"
+
+
+def test_one_shot_rows_go_to_the_spool(log_env):
+    for i in range(3):
+        prediction_log.log_prediction("crop", {"N": i}, {"recommended_crop": "rice"}, 1.5, "default@1")
+    assert isinstance(prediction_log.get_log(), prediction_log.SpoolLog)
+    assert parquet_files(log_env) == []
+    with open(log_env / prediction_log.SPOOL_FILE) as f:
+        assert len(f.readlines()) == 3
+
+    df = prediction_log.read_log(str(log_env), include_open=True, expand=True)
+    assert df["features.N"].tolist() == [0, 1, 2]
+    assert set(df["model_version"]) == {"default@1"}
+
+
+def test_requests_only_append_to_the_spool(log_env):
+    log = prediction_log.SpoolLog(str(log_env))
+    for i in range(40):
+        log.record("yield", {"Area": i}, {"predicted_production": i * 2.0}, 3.0)
+    assert parquet_files(log_env) == []
+    with open(log_env / prediction_log.SPOOL_FILE) as f:
+        assert len(f.readlines()) == 40
+
+
+def test_compact_spool_waits_until_due(log_env):
+    log = prediction_log.SpoolLog(str(log_env))
+    for i in range(40):
+        log.record("yield", {"Area": i}, {"predicted_production": i * 2.0}, 3.0)
+    assert not prediction_log.compact_spool(str(log_env), min_bytes=10**6, max_age_seconds=3600)
+    assert parquet_files(log_env) == []
+
+    assert prediction_log.compact_spool(str(log_env), min_bytes=2000, max_age_seconds=3600)
+    assert len(parquet_files(log_env)) == 1
+    df = prediction_log.read_log(str(log_env), include_open=True, expand=True)
+    assert sorted(df["features.Area"]) == list(range(40))
+    assert not glob.glob(str(log_env / "*.compacting"))
+    # Nothing left to compact
+    assert not prediction_log.compact_spool(str(log_env))
+
+
+def test_compactor_command_line(log_env):
+    prediction_log.SpoolLog(str(log_env)).record("crop", {"N": 1}, {}, 1.0)
+    command = [sys.executable, os.path.join(ML_DIR, "prediction_log.py")]
+    subprocess.run(command, check=True, capture_output=True)
+    assert parquet_files(log_env) == []
+    subprocess.run(command + ["--force"], check=True, capture_output=True)
+    assert len(parquet_files(log_env)) == 1
+
+
+def test_concurrent_appends_are_not_lost(log_env):
+    log = prediction_log.SpoolLog(str(log_env))
+
+    def write(worker):
+        for i in range(50):
+            log.record("crop", {"worker": worker, "i": i}, {}, 1.0)
+
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    prediction_log.compact_spool(str(log_env))
+    df = prediction_log.read_log(str(log_env), expand=True)
+    assert len(df) == 200
+    assert not os.path.exists(log_env / prediction_log.SPOOL_FILE)
+
+
+def test_unusable_log_dir_disables_logging_quietly(tmp_path, monkeypatch, capsys):
+    (tmp_path / "file").write_text("")
+    monkeypatch.setenv("PREDICTION_LOG_DIR", str(tmp_path / "file" / "sub"))
+    monkeypatch.setattr(prediction_log, "_log", None)
+    for _ in range(2):
+        prediction_log.log_prediction("crop", {"N": 1}, {}, 1.0)
+    assert prediction_log._log is prediction_log._DISABLED
+    assert prediction_log.get_log() is None
+    assert capsys.readouterr() == ("", "")
+
+
+def test_resident_log_buffers_into_parquet(log_env):
+    prediction_log.use_resident_log()
+    for i in range(5):
+        prediction_log.log_prediction("labour", [{"Crop": "Rice", "i": i}], [{"Labour_Required": 3.0}], 2.0)
+    log = prediction_log.get_log()
+    assert isinstance(log, prediction_log.PredictionLog)
+    log.close()
+    assert not os.path.exists(log_env / prediction_log.SPOOL_FILE)
+    df = prediction_log.read_log(str(log_env), model="labour", expand=True)
+    assert df["features.i"].tolist() == list(range(5))
+
+
+def test_script_logs_without_a_flush_thread(model_dir, tmp_path):
+    env = dict(os.environ, ML_MODEL_DIR=model_dir, PREDICTION_LOG_DIR=str(tmp_path))
+    payload = {"N": 80, "P": 40, "K": 40, "temperature": 25, "humidity": 80, "ph": 6.5, "rainfall": 200}
+    for _ in range(3):
+        output = subprocess.run([sys.executable, os.path.join(ML_DIR, "predict.py")],
+                                input=json.dumps(payload), capture_output=True, text=True, env=env)
+        assert output.returncode == 0 and output.stderr == ""
+    assert parquet_files(tmp_path) == []
+    assert len(prediction_log.read_log(str(tmp_path), include_open=True)) == 3
+
+
+def test_logging_failure_leaves_the_response_alone(log_env, trained_registry, monkeypatch, capsys):
+    def broken_tag(*args):
+        raise ValueError("no such version")
+
+    monkeypatch.setattr(trained_registry, "artifact_tag", broken_tag)
+    monkeypatch.setattr(predict.cpu_budget, "configure", lambda verbose: None)
+    payload = {"N": 80, "P": 40, "K": 40, "temperature": 25, "humidity": 80, "ph": 6.5, "rainfall": 200}
+    monkeypatch.setattr(sys, "stdin", io.StringIO(json.dumps(payload)))
+    predict.main()
+    out, err = capsys.readouterr()
+    assert err == ""
+    assert "recommended_crop" in json.loads(out)
+    assert not os.path.exists(log_env / prediction_log.SPOOL_FILE)
@@ -0,0 +1,107 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+import predict
+import prefork_server
+from conftest import ML_DIR
+
+CROP_ROW = {"N": 80, "P": 40, "K": 40, "temperature": 25, "humidity": 80, "ph": 6.5, "rainfall": 200}
+
+
+def request(path, payloads):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(20)
+        conn.connect(path)
+        reader = conn.makefile("rb")
+        responses = []
+        for payload in payloads:
+            conn.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+            responses.append(json.loads(reader.readline()))
+        return responses
+
+
+@pytest.fixture
+def server(model_dir, tmp_path):
+    path = str(tmp_path / "ml.sock")
+    log_dir = tmp_path / "log"
+    env = dict(os.environ, ML_MODEL_DIR=model_dir, PREDICTION_LOG_DIR=str(log_dir), ML_CPU_BUDGET="2")
+    process = subprocess.Popen([sys.executable, os.path.join(ML_DIR, "prefork_server.py"),
+                                "--workers", "2", "--socket", path],
+                               env=env, stderr=subprocess.PIPE, text=True)
+    deadline = time.monotonic() + 30
+    while not os.path.exists(path):
+        assert process.poll() is None, process.stderr.read()
+        assert time.monotonic() < deadline, "server did not start"
+        time.sleep(0.05)
+    yield path, process, log_dir
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=20)
+
+
+def test_handle_request_errors():
+    unknown = json.loads(prefork_server.handle_request(b'{"model": "nope"}\n'))
+    assert "Unknown model" in unknown["error"] and "crop" in unknown["models"]
+    broken = json.loads(prefork_server.handle_request(b"{not json\n"))
+    assert broken["message"] == "Prediction request failed"
+
+
+def test_recording_failures_do_not_change_the_reply(trained_registry, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("drift store unavailable")
+
+    monkeypatch.setattr(prefork_server, "track_drift", broken)
+    line = json.dumps({"model": "crop", "input": CROP_ROW}).encode("utf-8")
+    assert json.loads(prefork_server.handle_request(line)) == json.loads(
+        json.dumps(predict.predict_crop(dict(CROP_ROW))))
+
+
+def test_server_matches_the_stdin_scripts(server, trained_registry):
+    path, _, _ = server
+    crop, yield_result, stats = request(path, [
+        {"model": "crop", "input": CROP_ROW},
+        {"model": "yield", "input": {"Crop": "Rice", "State": "Punjab", "Season": "Kharif", "Year": 2020,
+                                     "Area": 10, "Rainfall": 900}},
+        {"model": "stats"},
+    ])
+    assert crop == json.loads(json.dumps(predict.predict_crop(dict(CROP_ROW))))
+    assert yield_result["model_used"] == "Random_Forest_Regressor"
+    # Every model came loaded from the master; serving them loaded nothing more
+    assert {m["name"] for m in stats["registry"]["resident"]} == {"crop", "yield", "labour"}
+    assert stats["registry"]["loads"] == 3
+
+
+def test_dead_worker_is_replaced_and_log_is_finalised(server):
+    path, process, log_dir = server
+    pid = request(path, [{"model": "stats"}])[0]["pid"]
+    os.kill(pid, signal.SIGKILL)
+    deadline = time.monotonic() + 20
+    pids = set()
+    while time.monotonic() < deadline and (not pids or pid in pids or len(pids) < 2):
+        pids |= {request(path, [{"model": "stats"}])[0]["pid"] for _ in range(4)}
+        pids.discard(pid)
+    assert pids and pid not in pids
+
+    request(path, [{"model": "crop", "input": CROP_ROW}] * 3)
+    process.send_signal(signal.SIGTERM)
+    process.wait(timeout=20)
+    files = os.listdir(log_dir)
+    assert files and all(name.endswith(".parquet") for name in files)
+
+
+def test_stop_during_restart_backoff(server):
+    path, process, _ = server
+    # A worker that dies young is restarted after MIN_WORKER_LIFETIME_S; a
+    # SIGTERM during that pause must not leave the replacement running
+    pid = request(path, [{"model": "stats"}])[0]["pid"]
+    os.kill(pid, signal.SIGKILL)
+    time.sleep(prefork_server.MIN_WORKER_LIFETIME_S / 4)
+    process.send_signal(signal.SIGTERM)
+    assert process.wait(timeout=20) == 0
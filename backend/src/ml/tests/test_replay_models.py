@@ -0,0 +1,58 @@
+import json
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import replay_models
+
+CROP_ROW = {"N": 80, "P": 40, "K": 40, "temperature": 25, "humidity": 80, "ph": 6.5, "rainfall": 200}
+YIELD_ROW = {"Crop": "Rice", "State": "Punjab", "Season": "Kharif", "Year": 2020, "Area": 10,
+             "Rainfall": 900, "Temperature": 27, "Fertilizer": 120, "Pesticide": 1.5}
+
+
+def write_requests(path, rows):
+    with open(path, "w") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+    return str(path)
+
+
+def test_timing_pass_is_not_traced(model_dir, monkeypatch):
+    tracing = []
+    predict_batch = replay_models.predict_batch
+
+    def spy(model, rows, artifacts):
+        tracing.append(tracemalloc.is_tracing())
+        return predict_batch(model, rows, artifacts)
+
+    monkeypatch.setattr(replay_models, "predict_batch", spy)
+    side = replay_models.ReplaySide("current", "crop", model_dir)
+    labels, _ = side.run("crop", [CROP_ROW] * 8)
+    assert tracing == [False, True]
+    assert len(labels) == 8
+    assert side.rows == 8 and len(side.batch_ms) == 1
+    assert side.peak_alloc > 0
+    assert not tracemalloc.is_tracing()
+
+
+@pytest.mark.parametrize("model, row", [("crop", CROP_ROW), ("yield", YIELD_ROW)])
+def test_identical_models_agree(model_dir, tmp_path, model, row):
+    rng = np.random.default_rng(1)
+    rows = [dict(row, **{k: float(v) * rng.uniform(0.8, 1.2) for k, v in row.items()
+                         if isinstance(v, (int, float)) and k != "Year"}) for _ in range(50)]
+    requests = write_requests(tmp_path / "requests.jsonl", rows)
+    report = replay_models.replay(model, requests, model_dir, current_dir=model_dir, batch_size=16)
+    assert report["rows"] == 50
+    assert report["current"]["batches"] == report["candidate"]["batches"] == 4
+    if model == "crop":
+        assert report["classification"]["disagreement_rate"] == 0
+    else:
+        assert report["regression"]["max_abs_delta"] == 0
+
+
+def test_latency_gate():
+    report = {"current": {"batch_latency_ms": {"p95": 10.0}},
+              "candidate": {"batch_latency_ms": {"p95": 13.0}}}
+    assert replay_models.apply_gates(report, max_latency_regression=0.5) == []
+    assert len(replay_models.apply_gates(report, max_latency_regression=0.2)) == 1
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+import smart_labour_recommendation as labour
+
+CROPS = ["Rice", "Wheat", "Cotton", "Tomato", None, "Maize"]
+AREAS = [10.0, 2.5, 0.0, 7.0, 3.0, 120.0]
+SEASONS = ["Kharif", "Rabi", "Zaid", None, "Summer", "Kharif"]
+FEATURES = {"Region": "Punjab", "Soil_Type": "Loamy", "Irrigation_Type": "Canal",
+            "Mechanization_Level": "Medium", "Labour_Availability": "High", "Gender_Split": "Mixed",
+            "Task": "General", "Prev_Yield_q_per_acre": 20.0, "Weather_Index": 0.8}
+
+
+@pytest.fixture
+def ml_model(trained_registry, monkeypatch):
+    monkeypatch.setattr(labour, "HAS_ML_MODEL", True)
+    return trained_registry
+
+
+@pytest.fixture
+def heuristic(monkeypatch):
+    monkeypatch.setattr(labour, "HAS_ML_MODEL", False)
+
+
+def test_ml_feature_frame_has_every_training_column():
+    from train_labour_model_v2 import FEATURE_COLUMNS
+
+    frame = labour.ml_feature_frame(["Rice"], [10.0], [None], [FEATURES])
+    assert set(FEATURE_COLUMNS) <= set(frame.columns)
+    assert frame.loc[0, "Season"] == "Kharif"
+    assert frame.loc[0, "Farm_Size_Acre"] == pytest.approx(10.0 * labour.ACRES_PER_HECTARE)
+
+
+def test_scalar_uses_ml_model_with_every_feature(ml_model, capsys):
+    result = labour.calculate_labour_requirement("Rice", 10.0, "Kharif", FEATURES)
+    assert result["method"] == "ml_model"
+    assert result["confidence"] == labour.ML_CONFIDENCE
+    assert capsys.readouterr().err == ""
+
+
+@pytest.mark.parametrize("features", [None, {}, dict(FEATURES, Soil_Type=None)])
+def test_scalar_without_every_feature_keeps_the_heuristic(ml_model, monkeypatch, features):
+    result = labour.calculate_labour_requirement("Rice", 10.0, "Kharif", features)
+    monkeypatch.setattr(labour, "HAS_ML_MODEL", False)
+    assert result == labour.calculate_labour_requirement("Rice", 10.0, "Kharif")
+    assert result == {"labour_required": 42, "demand_level": "High", "confidence": 0.7, "method": "heuristic"}
+
+
+def test_batch_matches_scalar_with_and_without_features(ml_model, capsys):
+    crops, areas, seasons = ["Rice", "Wheat", "Maize", "Cotton"], [10.0, 2.5, 40.0, 6.0], ["Kharif", "Rabi", None, "Zaid"]
+    features = [FEATURES, None, FEATURES, dict(FEATURES, Task=None)]
+    batch = labour.batch_rows(labour.calculate_labour_requirement_batch(crops, areas, seasons, features))
+    scalar = [labour.calculate_labour_requirement(c, a, s, f) for c, a, s, f in zip(crops, areas, seasons, features)]
+    assert [r["method"] for r in batch] == ["ml_model", "heuristic", "ml_model", "heuristic"]
+    assert batch == scalar
+    assert capsys.readouterr().err == ""
+
+
+def test_heuristic_batch_matches_scalar(heuristic):
+    batch = labour.batch_rows(labour.calculate_labour_requirement_batch(CROPS, AREAS, SEASONS))
+    scalar = [labour.calculate_labour_requirement(c, a, s) for c, a, s in zip(CROPS, AREAS, SEASONS)]
+    assert batch == scalar
+
+
+def test_heuristic_batch_matches_scalar_on_random_farms(heuristic):
+    rng = np.random.default_rng(0)
+    crops = rng.choice(list(labour.LABOUR_PER_HECTARE) + ["Barley"], 2000)
+    seasons = rng.choice(list(labour.SEASON_FACTOR) + ["Summer"], 2000)
+    areas = np.round(rng.uniform(0, 50, 2000), 2)
+    batch = labour.batch_rows(labour.heuristic_labour_requirement_batch(crops, areas, seasons))
+    scalar = [labour.calculate_labour_requirement(c, a, s) for c, a, s in zip(crops, areas, seasons)]
+    assert batch == scalar
+
+
+def test_heuristic_batch_without_seasons(heuristic):
+    batch = labour.batch_rows(labour.calculate_labour_requirement_batch(CROPS, AREAS))
+    assert batch == [labour.calculate_labour_requirement(c, a) for c, a in zip(CROPS, AREAS)]
+
+
+def test_recommend_list_matches_single_requests(ml_model):
+    rows = [{"crop_type": "Rice", "area": 10}, dict(FEATURES, crop_type="Wheat", area=3, season="Rabi")]
+    results = labour.recommend(rows)
+    assert results == [labour.recommend(row) for row in rows]
+    assert [r["method"] for r in results] == ["heuristic", "ml_model"]
@@ -0,0 +1,76 @@
+from contextlib import redirect_stdout
+from io import StringIO
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+import train_labour_model_v2 as trainer
+
+
+@pytest.fixture(scope="module")
+def matrices(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("labour") / "labour.csv")
+    trainer.create_labour_dataset(400, seed=11).to_csv(path, index=False)
+    with redirect_stdout(StringIO()):
+        arrays, _ = trainer.prepare_matrices(path, use_cache=False)
+    return arrays
+
+
+@pytest.mark.parametrize("n_cores, expected", [(1, (1, 1)), (2, (1, 1)), (3, (1, 2)), (8, (4, 4))])
+def test_split_core_budget(n_cores, expected):
+    assert trainer.split_core_budget(n_cores) == expected
+
+
+@pytest.mark.parametrize("n_cores", [1, 2, 4])
+def test_concurrent_fit_matches_sequential(matrices, n_cores):
+    def forests():
+        return (RandomForestRegressor(n_estimators=20, max_depth=8, random_state=42),
+                RandomForestClassifier(n_estimators=20, max_depth=8, random_state=42))
+
+    X, X_test = matrices["X_train"], matrices["X_test"]
+    reference = forests()
+    reference[0].fit(X, matrices["y_train_reg"])
+    reference[1].fit(X, matrices["y_train_cls"])
+
+    regressor, classifier = forests()
+    with redirect_stdout(StringIO()):
+        trainer.fit_forests(regressor, classifier, X, matrices["y_train_reg"], matrices["y_train_cls"], n_cores)
+    assert (regressor.n_jobs, classifier.n_jobs) == trainer.split_core_budget(n_cores)
+    # Same trees; only the order the tree outputs are summed in may differ
+    np.testing.assert_allclose(regressor.predict(X_test), reference[0].predict(X_test), rtol=1e-12)
+    np.testing.assert_array_equal(classifier.predict(X_test), reference[1].predict(X_test))
+
+
+def test_sparse_and_dense_layouts_give_the_same_model(tmp_path):
+    path = str(tmp_path / "labour.csv")
+    trainer.create_labour_dataset(400, seed=12, cardinality=30).to_csv(path, index=False)
+    with redirect_stdout(StringIO()):
+        dense, _ = trainer.prepare_matrices(path, use_cache=False, sparse=False)
+        csr, _ = trainer.prepare_matrices(path, use_cache=False, sparse=True)
+    assert sp.issparse(csr["X_train"]) and not sp.issparse(dense["X_train"])
+    np.testing.assert_array_equal(csr["X_train"].toarray(), dense["X_train"])
+    np.testing.assert_array_equal(csr["X_test"].toarray(), dense["X_test"])
+
+    predictions = []
+    for arrays in (dense, csr):
+        regressor = RandomForestRegressor(n_estimators=10, max_depth=8, random_state=42)
+        classifier = RandomForestClassifier(n_estimators=10, max_depth=8, random_state=42)
+        regressor.fit(arrays["X_train"], arrays["y_train_reg"])
+        classifier.fit(arrays["X_train"], arrays["y_train_cls"])
+        predictions.append((regressor.predict(arrays["X_test"]), classifier.predict(arrays["X_test"])))
+    np.testing.assert_allclose(predictions[0][0], predictions[1][0], rtol=1e-12)
+    np.testing.assert_array_equal(predictions[0][1], predictions[1][1])
+
+
+def test_wide_one_hot_picks_the_sparse_layout(tmp_path, monkeypatch):
+    path = str(tmp_path / "labour.csv")
+    trainer.create_labour_dataset(300, seed=13, cardinality=40).to_csv(path, index=False)
+    monkeypatch.setattr(trainer, "SPARSE_ONE_HOT_THRESHOLD", 100)
+    with redirect_stdout(StringIO()):
+        wide, _ = trainer.prepare_matrices(path, use_cache=False)
+        monkeypatch.setattr(trainer, "SPARSE_ONE_HOT_THRESHOLD", 10_000)
+        narrow, _ = trainer.prepare_matrices(path, use_cache=False)
+    assert sp.issparse(wide["X_train"])
+    assert not sp.issparse(narrow["X_train"])
@@ -6,15 +6,22 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, accuracy_score
 import joblib
 import os
+import cpu_budget
+import dataset_cache
+import drift_monitor
+from forest_explain import ForestExplainer
+from stage_timer import StageTimer
+
+FEATURE_NAMES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
 
 # Create synthetic dataset based on real crop requirements
-def create_crop_dataset():
-    np.random.seed(42)
+def create_crop_dataset(samples_per_crop=200, seed=42):
+    np.random.seed(seed)
     
     crops_data = []
     
     # Rice - High water, moderate NPK
-    for _ in range(200):
+    for _ in range(samples_per_crop):
         crops_data.append([
             np.random.normal(80, 15),   # N
             np.random.normal(40, 10),   # P  
@@ -27,7 +34,7 @@ def create_crop_dataset():
         ])
     
     # Wheat - Cool weather, moderate NPK
-    for _ in range(200):
+    for _ in range(samples_per_crop):
         crops_data.append([
             np.random.normal(50, 10),   # N
             np.random.normal(20, 5),    # P
@@ -40,7 +47,7 @@ def create_crop_dataset():
         ])
     
     # Maize - High N, warm weather
-    for _ in range(200):
+    for _ in range(samples_per_crop):
         crops_data.append([
             np.random.normal(120, 20),  # N
             np.random.normal(60, 15),   # P
@@ -53,7 +60,7 @@ def create_crop_dataset():
         ])
     
     # Cotton - Hot, dry conditions
-    for _ in range(200):
+    for _ in range(samples_per_crop):
         crops_data.append([
             np.random.normal(90, 15),   # N
             np.random.normal(30, 8),    # P
@@ -66,7 +73,7 @@ def create_crop_dataset():
         ])
     
     # Sugarcane - High NPK, hot humid
-    for _ in range(200):
+    for _ in range(samples_per_crop):
         crops_data.append([
             np.random.normal(150, 25),  # N
             np.random.normal(80, 20),   # P
@@ -79,7 +86,7 @@ def create_crop_dataset():
         ])
     
     # Soybean - Moderate conditions
-    for _ in range(200):
+    for _ in range(samples_per_crop):
         crops_data.append([
             np.random.normal(70, 12),   # N
             np.random.normal(45, 10),   # P
@@ -92,7 +99,7 @@ def create_crop_dataset():
         ])
     
     # Tomato - High NPK, controlled conditions
-    for _ in range(200):
+    for _ in range(samples_per_crop):
         crops_data.append([
             np.random.normal(200, 30),  # N
             np.random.normal(100, 20),  # P
@@ -110,57 +117,123 @@ def create_crop_dataset():
     
     return df
 
-def train_model():
-    print("Creating synthetic crop dataset...")
-    df = create_crop_dataset()
-    
-    print(f"Dataset created with {len(df)} samples")
-    print(f"Crops: {df['crop'].unique()}")
-    print(f"Class distribution:\n{df['crop'].value_counts()}")
-    
-    # Prepare features and target
-    X = df[['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']]
-    y = df['crop']
-    
-    # Split the data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    # Scale the features
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+def prepare_matrices(samples_per_crop=200, seed=42, test_size=0.2, use_cache=None, timer=None):
+    """
+    Generate, split and scale the crop dataset, reusing a cached copy when the
+    generator, its parameters and the preprocessing config are unchanged.
+    Building a fresh copy records "generate" and "scale" stages on timer.
+
+    Returns:
+        (arrays, artifacts) - X_train/X_test/y_train/y_test and the fitted scaler
+    """
+    config = {
+        "generator": dataset_cache.source_fingerprint(create_crop_dataset),
+        "helpers": dataset_cache.source_fingerprint(drift_monitor.capture_baseline),
+        "samples_per_crop": samples_per_crop,
+        "seed": seed,
+        "features": FEATURE_NAMES,
+        "test_size": test_size,
+        "split_random_state": 42,
+        "scaler": "StandardScaler",
+        "artifacts": ["scaler", "drift_baseline"],
+    }
+
+    timer = timer or StageTimer(verbose=False)
+
+    def build():
+        print("Creating synthetic crop dataset...")
+        with timer.stage("generate"):
+            df = create_crop_dataset(samples_per_crop, seed)
+
+        print(f"Dataset created with {len(df)} samples")
+        print(f"Crops: {df['crop'].unique()}")
+        print(f"Class distribution:\n{df['crop'].value_counts()}")
+
+        # Prepare features and target
+        X = df[FEATURE_NAMES]
+        y = df['crop']
+
+        with timer.stage("scale"):
+            # Split the data
+            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+
+            # Scale the features
+            scaler = StandardScaler()
+            X_train_scaled = scaler.fit_transform(X_train)
+            X_test_scaled = scaler.transform(X_test)
+
+        arrays = {
+            "X_train": X_train_scaled,
+            "X_test": X_test_scaled,
+            "y_train": y_train.to_numpy(),
+            "y_test": y_test.to_numpy(),
+        }
+        baseline = drift_monitor.capture_baseline(X_train, numeric_cols=FEATURE_NAMES)
+        return arrays, {"scaler": scaler, "drift_baseline": baseline}
+
+    return dataset_cache.cached_matrices("crop", config, build, use_cache=use_cache)
+
+def train_model(model_dir=None, samples_per_crop=200, use_cache=None, timer=None):
+    """
+    Train and save the crop model
+
+    Args:
+        model_dir: where to write the artifacts (defaults to this directory)
+        samples_per_crop: synthetic rows per crop
+        use_cache: force the dataset cache on/off (see dataset_cache)
+        timer: StageTimer to record stages on (benchmarks pass their own)
+    """
+    timer = timer or StageTimer()
+    arrays, artifacts = prepare_matrices(samples_per_crop, use_cache=use_cache, timer=timer)
+    X_train_scaled, X_test_scaled = arrays["X_train"], arrays["X_test"]
+    y_train, y_test = arrays["y_train"], arrays["y_test"]
+    scaler = artifacts["scaler"]
     
     # Train Random Forest model
     print("Training Random Forest model...")
-    model = RandomForestClassifier(n_estimators=100, random_state=42, max_depth=10)
-    model.fit(X_train_scaled, y_train)
+    model = RandomForestClassifier(n_estimators=100, random_state=42, max_depth=10,
+                                   n_jobs=cpu_budget.n_jobs())
+    with timer.stage("fit"):
+        model.fit(X_train_scaled, y_train)
     
     # Evaluate the model
-    y_pred = model.predict(X_test_scaled)
-    accuracy = accuracy_score(y_test, y_pred)
+    with timer.stage("evaluate"):
+        y_pred = model.predict(X_test_scaled)
+        accuracy = accuracy_score(y_test, y_pred)
     
     print(f"Model Accuracy: {accuracy:.3f}")
     print("\nClassification Report:")
     print(classification_report(y_test, y_pred))
     
     # Save the model and scaler
-    model_dir = os.path.dirname(__file__)
+    model_dir = model_dir or os.path.dirname(__file__)
     model_path = os.path.join(model_dir, "crop_model.pkl")
     scaler_path = os.path.join(model_dir, "scaler.pkl")
+    explainer_path = os.path.join(model_dir, "crop_explainer.pkl")
     
-    joblib.dump(model, model_path)
-    joblib.dump(scaler, scaler_path)
+    with timer.stage("explainer"):
+        explainer = ForestExplainer.from_forest(model, FEATURE_NAMES)
+    
+    with timer.stage("dump"):
+        joblib.dump(model, model_path)
+        joblib.dump(scaler, scaler_path)
+        joblib.dump(explainer, explainer_path)
+        baseline_path = drift_monitor.save_baseline("crop", artifacts["drift_baseline"], model_dir)
     
     print(f"Model saved to: {model_path}")
     print(f"Scaler saved to: {scaler_path}")
+    print(f"Explainer saved to: {explainer_path}")
+    print(f"Drift baseline saved to: {baseline_path}")
     
     # Feature importance
-    feature_names = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
     importance = model.feature_importances_
     
     print("\nFeature Importance:")
-    for name, imp in zip(feature_names, importance):
+    for name, imp in zip(FEATURE_NAMES, importance):
         print(f"{name}: {imp:.3f}")
+    
+    timer.report()
+    return model
 
 if __name__ == "__main__":
     train_model()
\ No newline at end of file
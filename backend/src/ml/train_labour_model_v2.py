@@ -12,128 +12,328 @@ from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.metrics import mean_squared_error, accuracy_score, classification_report
 import joblib
+import os
+import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+import cpu_budget
+import dataset_cache
+import drift_monitor
+from forest_explain import ForestExplainer, column_groups
 from labour_recommender import LabourRecommender
+from stage_timer import StageTimer
 warnings.filterwarnings('ignore')
 
-def train_labour_model(dataset_path="indian_agri_labour_full_dataset.csv"):
-    """Train the labour prediction model"""
-    
-    print("Loading dataset...")
-    df = pd.read_csv(dataset_path)
-    print(f"Dataset loaded: {df.shape}")
-    
-    # Define targets
-    TARGET_REG = "Labour_Required"
-    TARGET_CLS = "Labour_Demand_Level"
-    
-    # Prepare features (exclude target columns and derived/cost columns)
-    feature_columns = [
-        'Crop', 'Season', 'Region', 'Soil_Type', 'Irrigation_Type',
-        'Mechanization_Level', 'Labour_Availability', 'Gender_Split',
-        'Farm_Size_Acre', 'Task', 'Prev_Yield_q_per_acre', 'Weather_Index'
-    ]
-    
-    # Handle missing values in Mechanization_Level
-    df['Mechanization_Level'] = df['Mechanization_Level'].fillna('Unknown')
-    
-    # Prepare feature matrix
-    X = df[feature_columns].copy()
-    y_reg = df[TARGET_REG]
-    y_cls = df[TARGET_CLS]
-    
-    print(f"Features: {X.columns.tolist()}")
-    print(f"Feature matrix shape: {X.shape}")
-    print(f"Target classes: {y_cls.unique()}")
-    
-    # Identify categorical and numerical columns
-    cat_cols = X.select_dtypes(include=['object']).columns.tolist()
-    num_cols = X.select_dtypes(include=[np.number]).columns.tolist()
-    
-    print(f"Categorical columns: {cat_cols}")
-    print(f"Numerical columns: {num_cols}")
-    
-    # Create preprocessor
-    preprocessor = ColumnTransformer(
+TARGET_REG = "Labour_Required"
+TARGET_CLS = "Labour_Demand_Level"
+
+# Features used by the model (exclude target columns and derived/cost columns)
+FEATURE_COLUMNS = [
+    'Crop', 'Season', 'Region', 'Soil_Type', 'Irrigation_Type',
+    'Mechanization_Level', 'Labour_Availability', 'Gender_Split',
+    'Farm_Size_Acre', 'Task', 'Prev_Yield_q_per_acre', 'Weather_Index'
+]
+
+# Missing values filled before preprocessing (scoring code applies the same)
+FILLNA = {'Mechanization_Level': 'Unknown'}
+
+# One-hot width above which the design matrix is kept sparse (CSR) end to end
+SPARSE_ONE_HOT_THRESHOLD = int(os.environ.get("ML_LABOUR_SPARSE_THRESHOLD", 500))
+
+def create_labour_dataset(n_rows=3000, seed=42, cardinality=None):
+    """
+    Synthetic labour dataset with the columns of indian_agri_labour_full_dataset.csv
+
+    Labour per acre follows crop, task, mechanization, season and weather with
+    multiplicative noise; the demand level bins it as labour_model.py does.
+
+    Args:
+        n_rows: number of rows
+        seed: random seed
+        cardinality: if set, Crop, Region, Soil_Type and Task each take this
+                     many distinct values (extra crops and tasks get their
+                     own labour factors), to exercise high-cardinality one-hot
+    """
+    np.random.seed(seed)
+
+    crop_base = {"Rice": 3.0, "Wheat": 2.2, "Maize": 2.0, "Cotton": 3.5, "Sugarcane": 4.0}
+    task_factor = {"Sowing": 1.0, "Harvesting": 1.4, "Weeding": 0.9, "General": 0.8}
+    mech_factor = {"Low": 1.3, "Medium": 1.0, "High": 0.6}
+    season_factor = {"Kharif": 1.1, "Rabi": 1.0, "Zaid": 0.9}
+    regions = ["Punjab", "Bihar", "Maharashtra", "Uttar_Pradesh"]
+    soils = ["Alluvial", "Black", "Red", "Loamy"]
+
+    if cardinality:
+        def extra(prefix, values):
+            return [f"{prefix}_{i}" for i in range(max(0, cardinality - len(values)))]
+        crop_base.update({c: f for c, f in zip(extra("Crop", crop_base),
+                                               np.random.uniform(1.5, 4.5, cardinality))})
+        task_factor.update({t: f for t, f in zip(extra("Task", task_factor),
+                                                 np.random.uniform(0.7, 1.5, cardinality))})
+        regions += extra("Region", regions)
+        soils += extra("Soil", soils)
+
+    df = pd.DataFrame({
+        "Crop": np.random.choice(list(crop_base), n_rows),
+        "Season": np.random.choice(list(season_factor), n_rows),
+        "Region": np.random.choice(regions, n_rows),
+        "Soil_Type": np.random.choice(soils, n_rows),
+        "Irrigation_Type": np.random.choice(["Canal", "Drip", "Rainfed"], n_rows),
+        "Mechanization_Level": np.random.choice(list(mech_factor), n_rows).astype(object),
+        "Labour_Availability": np.random.choice(["Low", "Medium", "High"], n_rows),
+        "Gender_Split": np.random.choice(["Male", "Female", "Mixed"], n_rows),
+        "Task": np.random.choice(list(task_factor), n_rows),
+        "Farm_Size_Acre": np.clip(np.random.lognormal(1.0, 0.6, n_rows), 0.5, 50),
+        "Prev_Yield_q_per_acre": np.clip(np.random.normal(25, 6, n_rows), 5, None),
+        "Weather_Index": np.random.uniform(0.4, 1.0, n_rows),
+    })
+
+    per_acre = (df["Crop"].map(crop_base) * df["Task"].map(task_factor)
+                * df["Mechanization_Level"].map(mech_factor) * df["Season"].map(season_factor)
+                * (1.2 - 0.3 * df["Weather_Index"]) * np.random.lognormal(0, 0.15, n_rows))
+    df["Labour_Per_Acre_est"] = per_acre
+    df[TARGET_REG] = np.ceil(per_acre * df["Farm_Size_Acre"])
+    df[TARGET_CLS] = pd.cut(per_acre, bins=[-1, 1.5, 2.5, 4.0, np.inf],
+                            labels=["Very_Low", "Low", "Medium", "High"]).astype(str)
+
+    # The real dataset has some unrecorded mechanization levels
+    df.loc[np.random.rand(n_rows) < 0.05, "Mechanization_Level"] = np.nan
+    return df
+
+def one_hot_width(X, cat_cols):
+    """Number of columns one-hot encoding the categorical features produces"""
+    return int(sum(X[col].nunique(dropna=False) for col in cat_cols))
+
+def build_preprocessor(cat_cols, num_cols, sparse):
+    """
+    One-hot + scaling preprocessor, producing a dense array or a CSR matrix
+
+    In the sparse path the forests fit on and predict from CSR directly, so
+    the one-hot block is never expanded to a dense matrix.
+    """
+    return ColumnTransformer(
         transformers=[
-            ('cat', OneHotEncoder(handle_unknown='ignore', sparse_output=False), cat_cols),
+            ('cat', OneHotEncoder(handle_unknown='ignore', sparse_output=sparse), cat_cols),
             ('num', StandardScaler(), num_cols)
         ],
-        remainder='drop'
+        remainder='drop',
+        sparse_threshold=1.0 if sparse else 0.0
     )
+
+def prepare_matrices(dataset_path, test_size=0.2, use_cache=None, sparse=None, timer=None):
+    """
+    Load, split and preprocess the labour dataset, reusing a cached copy when
+    the CSV contents and the preprocessing config are unchanged
+
+    Args:
+        sparse: True/False to force a CSR or dense design matrix; None picks
+                CSR when the one-hot width exceeds SPARSE_ONE_HOT_THRESHOLD
+        timer: StageTimer for the "load" and "encode + scale" stages of a
+               fresh build
+
+    Returns:
+        (arrays, artifacts) - transformed train/test matrices and targets, plus
+        the fitted ColumnTransformer and a few raw test rows for smoke checks
+    """
+    config = {
+        "source_sha256": dataset_cache.file_checksum(dataset_path),
+        "features": FEATURE_COLUMNS,
+        "targets": [TARGET_REG, TARGET_CLS],
+        "fillna": FILLNA,
+        "helpers": dataset_cache.source_fingerprint(
+            one_hot_width, build_preprocessor, drift_monitor.capture_baseline),
+        "preprocessor": {
+            "cat": "OneHotEncoder(handle_unknown='ignore')",
+            "num": "StandardScaler()",
+            "sparse": "auto" if sparse is None else sparse,
+            "sparse_threshold": SPARSE_ONE_HOT_THRESHOLD,
+        },
+        "test_size": test_size,
+        "split_random_state": 42,
+        "stratify": TARGET_CLS,
+        "artifacts": ["preprocessor", "sample_rows", "drift_baseline"],
+    }
+
+    timer = timer or StageTimer(verbose=False)
+
+    def build():
+        print("Loading dataset...")
+        with timer.stage("load"):
+            df = pd.read_csv(dataset_path)
+        print(f"Dataset loaded: {df.shape}")
+
+        # Handle missing values in Mechanization_Level
+        df = df.fillna(FILLNA)
+
+        # Prepare feature matrix
+        X = df[FEATURE_COLUMNS].copy()
+        y_reg = df[TARGET_REG]
+        y_cls = df[TARGET_CLS]
+
+        print(f"Features: {X.columns.tolist()}")
+        print(f"Feature matrix shape: {X.shape}")
+        print(f"Target classes: {y_cls.unique()}")
+
+        # Identify categorical and numerical columns
+        cat_cols = X.select_dtypes(include=['object']).columns.tolist()
+        num_cols = X.select_dtypes(include=[np.number]).columns.tolist()
+
+        print(f"Categorical columns: {cat_cols}")
+        print(f"Numerical columns: {num_cols}")
+
+        # Create preprocessor; wide one-hot blocks stay sparse
+        width = one_hot_width(X, cat_cols)
+        use_sparse = width > SPARSE_ONE_HOT_THRESHOLD if sparse is None else sparse
+        print(f"One-hot width: {width} -> {'sparse CSR' if use_sparse else 'dense'} design matrix "
+              f"(threshold {SPARSE_ONE_HOT_THRESHOLD})")
+        preprocessor = build_preprocessor(cat_cols, num_cols, use_sparse)
+
+        with timer.stage("encode + scale"):
+            # Split data
+            X_train, X_test, y_train_reg, y_test_reg, y_train_cls, y_test_cls = train_test_split(
+                X, y_reg, y_cls, test_size=test_size, random_state=42, stratify=y_cls
+            )
+            M_train = preprocessor.fit_transform(X_train)
+            M_test = preprocessor.transform(X_test)
+
+        arrays = {
+            "X_train": M_train,
+            "X_test": M_test,
+            "y_train_reg": y_train_reg.to_numpy(),
+            "y_test_reg": y_test_reg.to_numpy(),
+            "y_train_cls": y_train_cls.to_numpy(),
+            "y_test_cls": y_test_cls.to_numpy(),
+        }
+        artifacts = {
+            "preprocessor": preprocessor,
+            "sample_rows": X_test.iloc[:3],
+            "drift_baseline": drift_monitor.capture_baseline(
+                X_train, numeric_cols=num_cols, categorical_cols=cat_cols),
+        }
+        return arrays, artifacts
+
+    return dataset_cache.cached_matrices("labour", config, build, use_cache=use_cache)
+
+def split_core_budget(n_cores):
+    """Divide the core budget between the regressor and the classifier"""
+    reg_jobs = max(1, n_cores // 2)
+    cls_jobs = max(1, n_cores - reg_jobs)
+    return reg_jobs, cls_jobs
+
+def fit_forests(regressor, classifier, X_train, y_train_reg, y_train_cls, n_cores):
+    """
+    Fit the regressor and classifier on the same transformed matrix
+
+    With two or more cores the forests train concurrently on disjoint shares
+    of the core budget (tree building releases the GIL), instead of one after
+    the other with both asking joblib for every core.
+    """
+    reg_jobs, cls_jobs = split_core_budget(n_cores)
+
+    def fit(name, model, y):
+        start = time.perf_counter()
+        model.fit(X_train, y)
+        print(f"  {name} fitted in {time.perf_counter() - start:.2f}s (n_jobs={model.n_jobs})")
+
+    if n_cores < 2:
+        regressor.set_params(n_jobs=1)
+        classifier.set_params(n_jobs=1)
+        fit("Regressor", regressor, y_train_reg)
+        fit("Classifier", classifier, y_train_cls)
+        return
+
+    regressor.set_params(n_jobs=reg_jobs)
+    classifier.set_params(n_jobs=cls_jobs)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(fit, "Regressor", regressor, y_train_reg),
+            executor.submit(fit, "Classifier", classifier, y_train_cls),
+        ]
+        for future in futures:
+            future.result()
+
+def train_labour_model(dataset_path="indian_agri_labour_full_dataset.csv", n_cores=None,
+                       model_path="labour_model.joblib", sparse=None, use_cache=None, timer=None):
+    """Train the labour prediction model (sparse, use_cache: see prepare_matrices)"""
+    timer = timer or StageTimer()
     
-    # Create regression pipeline
-    reg_pipeline = Pipeline([
-        ('preprocessor', preprocessor),
-        ('regressor', RandomForestRegressor(
-            n_estimators=100,
-            random_state=42,
-            max_depth=15,
-            min_samples_split=5,
-            min_samples_leaf=2,
-            n_jobs=-1
-        ))
-    ])
-    
-    # Create classification pipeline
-    cls_pipeline = Pipeline([
-        ('preprocessor', preprocessor),
-        ('classifier', RandomForestClassifier(
-            n_estimators=100,
-            random_state=42,
-            max_depth=15,
-            min_samples_split=5,
-            min_samples_leaf=2,
-            n_jobs=-1
-        ))
-    ])
-    
-    # Split data
-    X_train, X_test, y_train_reg, y_test_reg, y_train_cls, y_test_cls = train_test_split(
-        X, y_reg, y_cls, test_size=0.2, random_state=42, stratify=y_cls
-    )
+    arrays, artifacts = prepare_matrices(dataset_path, use_cache=use_cache, sparse=sparse, timer=timer)
+    X_train, X_test = arrays["X_train"], arrays["X_test"]
+    y_train_reg, y_test_reg = arrays["y_train_reg"], arrays["y_test_reg"]
+    y_train_cls, y_test_cls = arrays["y_train_cls"], arrays["y_test_cls"]
+    preprocessor = artifacts["preprocessor"]
     
     print(f"Training set size: {X_train.shape[0]}")
     print(f"Test set size: {X_test.shape[0]}")
     
-    # Train models
-    print("Training regression model...")
-    reg_pipeline.fit(X_train, y_train_reg)
-    
-    print("Training classification model...")
-    cls_pipeline.fit(X_train, y_train_cls)
+    # Train models on the already-transformed matrices
+    regressor = RandomForestRegressor(
+        n_estimators=100,
+        random_state=42,
+        max_depth=15,
+        min_samples_split=5,
+        min_samples_leaf=2
+    )
+    classifier = RandomForestClassifier(
+        n_estimators=100,
+        random_state=42,
+        max_depth=15,
+        min_samples_split=5,
+        min_samples_leaf=2
+    )
     
-    # Evaluate models
-    print("\nModel Evaluation:")
-    print("=" * 40)
+    n_cores = n_cores or cpu_budget.n_jobs()
+    print(f"Training regression and classification models ({n_cores} cores)...")
+    with timer.stage("fit"):
+        fit_forests(regressor, classifier, X_train, y_train_reg, y_train_cls, n_cores)
     
-    # Regression evaluation
-    reg_pred = reg_pipeline.predict(X_test)
-    rmse = np.sqrt(mean_squared_error(y_test_reg, reg_pred))
-    print(f"Regression RMSE: {rmse:.3f}")
+    # Both pipelines share the one fitted preprocessor
+    reg_pipeline = Pipeline([('preprocessor', preprocessor), ('regressor', regressor)])
+    cls_pipeline = Pipeline([('preprocessor', preprocessor), ('classifier', classifier)])
     
-    # Classification evaluation
-    cls_pred = cls_pipeline.predict(X_test)
-    accuracy = accuracy_score(y_test_cls, cls_pred)
-    print(f"Classification Accuracy: {accuracy:.3f}")
-    print("\nClassification Report:")
-    print(classification_report(y_test_cls, cls_pred))
+    # Evaluate models
+    with timer.stage("evaluate"):
+        print("\nModel Evaluation:")
+        print("=" * 40)
+        
+        # Regression evaluation
+        reg_pred = regressor.predict(X_test)
+        rmse = np.sqrt(mean_squared_error(y_test_reg, reg_pred))
+        print(f"Regression RMSE: {rmse:.3f}")
+        
+        # Classification evaluation
+        cls_pred = classifier.predict(X_test)
+        accuracy = accuracy_score(y_test_cls, cls_pred)
+        print(f"Classification Accuracy: {accuracy:.3f}")
+        print("\nClassification Report:")
+        print(classification_report(y_test_cls, cls_pred))
     
-    # Create unified model
-    labour_model = LabourRecommender(reg_pipeline, cls_pipeline, feature_columns)
+    # Create unified model, with contribution weights precomputed for explanations
+    with timer.stage("explainer"):
+        groups = column_groups(preprocessor)
+        explainers = {
+            "reg": ForestExplainer.from_forest(regressor, FEATURE_COLUMNS, groups),
+            "cls": ForestExplainer.from_forest(classifier, FEATURE_COLUMNS, groups),
+        }
+    labour_model = LabourRecommender(reg_pipeline, cls_pipeline, FEATURE_COLUMNS, explainers)
     
     # Test the unified model
     print("\nTesting unified model...")
-    test_sample = X_test.iloc[:3]
+    test_sample = artifacts["sample_rows"]
     predictions = labour_model.predict(test_sample)
     print("Sample predictions:")
     for i, pred in enumerate(predictions):
         print(f"  Sample {i+1}: {pred}")
     
     # Save the model
-    model_path = "labour_model.joblib"
-    joblib.dump(labour_model, model_path)
+    baseline_dir = os.path.dirname(os.path.abspath(model_path))
+    with timer.stage("dump"):
+        joblib.dump(labour_model, model_path)
+        baseline_path = drift_monitor.save_baseline('labour', artifacts['drift_baseline'], baseline_dir)
     print(f"\nModel saved as: {model_path}")
+    print(f"Drift baseline saved to: {baseline_path}")
+    
+    timer.report()
     
     return labour_model
 
@@ -6,10 +6,18 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import os
+import cpu_budget
+import dataset_cache
+import drift_monitor
+import forest_intervals
+from stage_timer import StageTimer
 
-def create_yield_dataset():
+CATEGORICAL_FEATURES = ["State", "Season", "Crop"]
+FEATURE_NAMES = ["State", "Year", "Season", "Crop", "Area", "Rainfall", "Temperature", "Fertilizer", "Pesticide"]
+
+def create_yield_dataset(n_samples=2000, seed=42):
     """Create comprehensive synthetic yield dataset"""
-    np.random.seed(42)
+    np.random.seed(seed)
     
     states = ["Punjab", "Haryana", "UP", "MP", "Maharashtra", "Karnataka", "Tamil Nadu", "AP"]
     seasons = ["Kharif", "Rabi", "Zaid"]
@@ -19,7 +27,7 @@ def create_yield_dataset():
     data = []
     
     # Generate realistic yield data
-    for _ in range(2000):
+    for _ in range(n_samples):
         state = np.random.choice(states)
         season = np.random.choice(seasons)
         crop = np.random.choice(crops)
@@ -87,34 +95,96 @@ def create_yield_dataset():
     
     return df
 
-def train_model():
-    print("Creating synthetic yield dataset...")
-    df = create_yield_dataset()
-    
-    print(f"Dataset created with {len(df)} samples")
-    print(f"\nDataset statistics:")
-    print(df.describe())
-    
-    # Save label encoders for later use
-    label_encoders = {}
-    
-    # Encode categorical features
-    for col in ["State", "Season", "Crop"]:
-        le = LabelEncoder()
-        df[col] = le.fit_transform(df[col])
-        label_encoders[col] = le
-    
-    # Prepare features and target
-    X = df[["State", "Year", "Season", "Crop", "Area", "Rainfall", "Temperature", "Fertilizer", "Pesticide"]]
-    y = df["Production"]
-    
-    # Split the data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    # Scale features
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+def prepare_matrices(n_samples=2000, seed=42, test_size=0.2, use_cache=None, timer=None):
+    """
+    Generate, encode, split and scale the yield dataset, reusing a cached copy
+    when the generator, its parameters and the preprocessing config are unchanged.
+    Building a fresh copy records "generate", "encode" and "scale" stages on timer.
+
+    Returns:
+        (arrays, artifacts) - X_train/X_test/y_train/y_test plus the fitted
+        scaler and label encoders
+    """
+    config = {
+        "generator": dataset_cache.source_fingerprint(create_yield_dataset),
+        "helpers": dataset_cache.source_fingerprint(drift_monitor.capture_baseline),
+        "n_samples": n_samples,
+        "seed": seed,
+        "features": FEATURE_NAMES,
+        "encoders": {col: "LabelEncoder" for col in CATEGORICAL_FEATURES},
+        "test_size": test_size,
+        "split_random_state": 42,
+        "scaler": "StandardScaler",
+        "artifacts": ["scaler", "label_encoders", "drift_baseline"],
+    }
+
+    timer = timer or StageTimer(verbose=False)
+
+    def build():
+        print("Creating synthetic yield dataset...")
+        with timer.stage("generate"):
+            df = create_yield_dataset(n_samples, seed)
+
+        print(f"Dataset created with {len(df)} samples")
+        print(f"\nDataset statistics:")
+        print(df.describe())
+
+        with timer.stage("encode"):
+            # Baseline of the raw inputs for drift monitoring
+            baseline = drift_monitor.capture_baseline(
+                df,
+                numeric_cols=[c for c in FEATURE_NAMES if c not in CATEGORICAL_FEATURES],
+                categorical_cols=CATEGORICAL_FEATURES,
+            )
+
+            # Save label encoders for later use
+            label_encoders = {}
+
+            # Encode categorical features
+            for col in CATEGORICAL_FEATURES:
+                le = LabelEncoder()
+                df[col] = le.fit_transform(df[col])
+                label_encoders[col] = le
+
+        # Prepare features and target
+        X = df[FEATURE_NAMES]
+        y = df["Production"]
+
+        with timer.stage("scale"):
+            # Split the data
+            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+
+            # Scale features
+            scaler = StandardScaler()
+            X_train_scaled = scaler.fit_transform(X_train)
+            X_test_scaled = scaler.transform(X_test)
+
+        arrays = {
+            "X_train": X_train_scaled,
+            "X_test": X_test_scaled,
+            "y_train": y_train.to_numpy(),
+            "y_test": y_test.to_numpy(),
+        }
+        return arrays, {"scaler": scaler, "label_encoders": label_encoders, "drift_baseline": baseline}
+
+    return dataset_cache.cached_matrices("yield", config, build, use_cache=use_cache)
+
+def train_model(model_dir=None, n_samples=2000, use_cache=None, timer=None):
+    """
+    Train and save the yield model
+
+    Args:
+        model_dir: where to write the artifacts (defaults to this directory)
+        n_samples: synthetic dataset rows
+        use_cache: force the dataset cache on/off (see dataset_cache)
+        timer: StageTimer to record stages on (benchmarks pass their own)
+    """
+    timer = timer or StageTimer()
+    arrays, artifacts = prepare_matrices(n_samples, use_cache=use_cache, timer=timer)
+    X_train_scaled, X_test_scaled = arrays["X_train"], arrays["X_test"]
+    y_train, y_test = arrays["y_train"], arrays["y_test"]
+    scaler = artifacts["scaler"]
+    label_encoders = artifacts["label_encoders"]
     
     # Train Random Forest model
     print("\nTraining Random Forest Regressor...")
@@ -123,40 +193,63 @@ def train_model():
         max_depth=15,
         min_samples_split=5,
         random_state=42,
-        n_jobs=-1
+        n_jobs=cpu_budget.n_jobs()
     )
-    model.fit(X_train_scaled, y_train)
+    with timer.stage("fit"):
+        model.fit(X_train_scaled, y_train)
     
     # Evaluate the model
-    y_pred = model.predict(X_test_scaled)
-    
-    mae = mean_absolute_error(y_test, y_pred)
-    rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-    r2 = r2_score(y_test, y_pred)
+    with timer.stage("evaluate"):
+        y_pred = model.predict(X_test_scaled)
+        
+        mae = mean_absolute_error(y_test, y_pred)
+        rmse = np.sqrt(mean_squared_error(y_test, y_pred))
+        r2 = r2_score(y_test, y_pred)
     
     print(f"\nModel Performance:")
     print(f"MAE: {mae:.2f}")
     print(f"RMSE: {rmse:.2f}")
     print(f"R² Score: {r2:.3f}")
     
+    # Calibrate prediction intervals on one half of the held-out rows and
+    # check their coverage on the other
+    with timer.stage("calibrate"):
+        half = len(y_test) // 2
+        calibration = forest_intervals.calibrate(model, X_test_scaled[:half], y_test[:half])
+        mean, std = forest_intervals.forest_mean_std(model, X_test_scaled[half:])
+        bounds = forest_intervals.prediction_intervals(mean, std, calibration)
+        inside = (y_test[half:] >= bounds["lower"]) & (y_test[half:] <= bounds["upper"])
+        calibration["holdout_coverage"] = float(inside.mean())
+    
+    print(f"\nPrediction intervals: {calibration['coverage']:.0%} target, "
+          f"{calibration['holdout_coverage']:.1%} held-out coverage, "
+          f"mean half-width {calibration['mean_relative_half_width']:.1%} of the prediction")
+    
     # Save the model, scaler, and encoders
-    model_dir = os.path.dirname(__file__)
+    model_dir = model_dir or os.path.dirname(__file__)
     
-    joblib.dump(model, os.path.join(model_dir, "yield_model.pkl"))
-    joblib.dump(scaler, os.path.join(model_dir, "yield_scaler.pkl"))
-    joblib.dump(label_encoders, os.path.join(model_dir, "yield_encoders.pkl"))
+    with timer.stage("dump"):
+        joblib.dump(model, os.path.join(model_dir, "yield_model.pkl"))
+        joblib.dump(scaler, os.path.join(model_dir, "yield_scaler.pkl"))
+        joblib.dump(label_encoders, os.path.join(model_dir, "yield_encoders.pkl"))
+        joblib.dump(calibration, os.path.join(model_dir, "yield_calibration.pkl"))
+        baseline_path = drift_monitor.save_baseline('yield', artifacts['drift_baseline'], model_dir)
     
     print(f"\nModel saved to: {os.path.join(model_dir, 'yield_model.pkl')}")
     print(f"Scaler saved to: {os.path.join(model_dir, 'yield_scaler.pkl')}")
     print(f"Encoders saved to: {os.path.join(model_dir, 'yield_encoders.pkl')}")
+    print(f"Interval calibration saved to: {os.path.join(model_dir, 'yield_calibration.pkl')}")
+    print(f"Drift baseline saved to: {baseline_path}")
     
     # Feature importance
-    feature_names = ["State", "Year", "Season", "Crop", "Area", "Rainfall", "Temperature", "Fertilizer", "Pesticide"]
     importance = model.feature_importances_
     
     print("\nFeature Importance:")
-    for name, imp in sorted(zip(feature_names, importance), key=lambda x: x[1], reverse=True):
+    for name, imp in sorted(zip(FEATURE_NAMES, importance), key=lambda x: x[1], reverse=True):
         print(f"{name}: {imp:.3f}")
+    
+    timer.report()
+    return model
 
 if __name__ == "__main__":
     train_model()
@@ -1,7 +1,8 @@
 const express = require("express");
-const { predictCrop } = require("../controllers/cropController");
+const { predictCrop, planFarm } = require("../controllers/cropController");
 const router = express.Router();
 
 router.post("/predict", predictCrop);
+router.post("/plan", planFarm);
 
 module.exports = router;
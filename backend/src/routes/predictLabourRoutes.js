@@ -1,9 +1,12 @@
 const express = require('express');
 const router = express.Router();
-const { recommendLabour } = require('../controllers/labourController');
-const { protect } = require('../middlewares/authMiddleware');
+const { recommendLabour, assignLabourBatch } = require('../controllers/labourController');
+const { protect, authorizeRoles } = require('../middlewares/authMiddleware');
 
 // Route to get smart labour recommendations (protected route for farmers)
 router.post('/recommend', protect, recommendLabour);
 
+// Proposed labour assignment across the calling farmer's open jobs
+router.post('/assign', protect, authorizeRoles('farmer'), assignLabourBatch);
+
 module.exports = router;
\ No newline at end of file
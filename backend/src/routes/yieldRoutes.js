@@ -1,7 +1,8 @@
 const express = require("express");
-const { predictYield } = require("../controllers/yieldController");
+const { predictYield, sweepYield } = require("../controllers/yieldController");
 const router = express.Router();
 
 router.post("/predict", predictYield);
+router.post("/sweep", sweepYield);
 
 module.exports = router;
@@ -64,6 +64,14 @@ resource "aws_ecs_task_definition" "backend" {
       {
         name  = "PAYMENT_MODE"
         value = var.payment_mode
+      },
+      {
+        # Thread budget for the Python ML scripts (1024 CPU units = 1 vCPU).
+        # Rounded down with a floor of 1, so the default backend_cpu of 512
+        # (half a vCPU) gives 1 thread on purpose: a second thread on a
+        # fractional vCPU only adds context switches under the CFS quota.
+        name  = "ML_CPU_BUDGET"
+        value = tostring(max(1, floor(var.backend_cpu / 1024)))
       }
     ]
 